@@ -1,6 +1,9 @@
+import os
+
 import numpy as np
-import matplotlib.pyplot as plt
+from instrumentation import count, timed
 from outils import call, calcul_delta
+from plotting import add_paths, new_figure, show_or_save
 
 class MonteCarloHedging:
     def __init__(self, S0, K, r, sigma, T, num_paths, num_steps):
@@ -14,26 +17,92 @@ class MonteCarloHedging:
         self.dt = T / num_steps
         self.time_grid = np.linspace(0, T, num_steps + 1)
 
-    def simulate_paths(self):
-        paths = []
-        for _ in range(self.num_paths):
-            path = [self.S0]
-            for _ in range(self.num_steps):
-                Z = np.random.normal()
-                S_next = path[-1] * np.exp((self.r - 0.5 * self.sigma**2) * self.dt + self.sigma * np.sqrt(self.dt) * Z)
-                path.append(S_next)
-            paths.append(path)
-        return paths
+    @timed("MonteCarloHedging.simulate_paths", "paths")
+    def simulate_paths(self, num_paths=None, rng=None):
+        # toutes les trajectoires d'un coup : matrice (num_paths, num_steps + 1),
+        # tirées depuis rng (np.random.Generator, ou quasi_monte_carlo.SobolGenerator
+        # pour des trajectoires quasi-aléatoires) ou à défaut l'état global np.random
+        if num_paths is None:
+            num_paths = self.num_paths
+        Z = (np.random if rng is None else rng).normal(size=(num_paths, self.num_steps))
+        log_paths = np.empty((num_paths, self.num_steps + 1))
+        count("paths_generated", num_paths)
+        count("bytes_allocated", 2 * log_paths.nbytes)
+        log_paths[:, 0] = 0.0
+        log_paths[:, 1:] = (self.r - 0.5 * self.sigma**2) * self.dt + self.sigma * np.sqrt(self.dt) * Z
+        np.cumsum(log_paths, axis=1, out=log_paths)
+        return self.S0 * np.exp(log_paths)
+
+    def iter_path_chunks(self, chunk_size, rng=None):
+        # trajectoires par blocs d'au plus chunk_size lignes : la mémoire ne dépend
+        # que de la taille du bloc
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        for start in range(0, self.num_paths, chunk_size):
+            yield self.simulate_paths(min(chunk_size, self.num_paths - start), rng)
 
     def compute_average_path(self, paths):
-        return [np.mean([path[i] for path in paths]) for i in range(len(paths[0]))]
+        return np.mean(paths, axis=0)
 
     def compute_option_prices(self, prices):
-        return [call(S, self.K, self.r, self.sigma, self.T) for S in prices]
+        return call(np.asarray(prices), self.K, self.r, self.sigma, self.T)
 
     def compute_deltas(self, stock_path):
         return [calcul_delta(stock_path[i], self.K, self.r, self.sigma, self.T - i * self.dt) for i in range(len(stock_path))]
 
+    @timed("MonteCarloHedging.compute_delta_matrix", "pricing")
+    def compute_delta_matrix(self, paths, block_size=4096):
+        # deltas de toutes les trajectoires sur la grille (num_paths, num_steps + 1),
+        # calculés par blocs de lignes pour borner les temporaires
+        paths = np.asarray(paths)
+        tau = self.T - self.time_grid[:-1]
+        deltas = np.empty(paths.shape)
+        for start in range(0, paths.shape[0], block_size):
+            rows = slice(start, start + block_size)
+            deltas[rows, :-1] = calcul_delta(paths[rows, :-1], self.K, self.r, self.sigma, tau)
+        # à maturité le delta vaut l'indicatrice d'exercice
+        deltas[:, -1] = paths[:, -1] > self.K
+        return deltas
+
+    @timed("MonteCarloHedging.simulate_hedging_book", "hedging")
+    def simulate_hedging_book(self, paths, initial_option_price=None, quantiles=(0.01, 0.05, 0.5, 0.95, 0.99)):
+        """Delta-hedge every simulated path at once.
+
+        Returns a dict with the (num_paths, num_steps + 1) portfolio-value matrix,
+        the terminal hedging error (portfolio minus call payoff) of each path and
+        its summary statistics.
+        """
+        paths = np.asarray(paths)
+        if initial_option_price is None:
+            initial_option_price = call(self.S0, self.K, self.r, self.sigma, self.T)
+        deltas = self.compute_delta_matrix(paths)
+
+        # cash_i = g^i * (cash_0 - sum_{j<=i} g^-j * S_j * (delta_j - delta_j-1)), g = exp(r dt)
+        steps = np.arange(paths.shape[1])
+        growth = np.exp(self.r * self.dt * steps)
+        cash = np.empty(paths.shape)
+        cash[:, 0] = initial_option_price - deltas[:, 0] * paths[:, 0]
+        np.subtract(deltas[:, 1:], deltas[:, :-1], out=cash[:, 1:])
+        cash[:, 1:] *= paths[:, 1:]
+        cash[:, 1:] /= growth[1:]
+        np.cumsum(cash[:, 1:], axis=1, out=cash[:, 1:])
+        np.subtract(cash[:, :1], cash[:, 1:], out=cash[:, 1:])
+        cash[:, 1:] *= growth[1:]
+
+        # valeur du portefeuille : delta * S + cash (calcul en place dans deltas)
+        portfolio_values = deltas
+        portfolio_values *= paths
+        portfolio_values += cash
+        del cash
+
+        hedging_error = portfolio_values[:, -1] - np.maximum(paths[:, -1] - self.K, 0.0)
+        count("rebalances", paths.shape[0] * (paths.shape[1] - 1))
+        return {
+            "portfolio_values": portfolio_values,
+            "hedging_error": hedging_error,
+            "stats": summarize_hedging_error(hedging_error, quantiles),
+        }
+
     def simulate_hedging_portfolio(self, stock_path, deltas, initial_option_price):
         cash_account = initial_option_price - deltas[0] * stock_path[0]
         portfolio_values = [deltas[0] * stock_path[0] + cash_account]
@@ -47,36 +116,58 @@ class MonteCarloHedging:
 
         return portfolio_values
 
-    def plot_paths(self, paths, avg_path, call_prices):
-        for path in paths:
-            plt.plot(self.time_grid, path, alpha=0.2, color='gray')
-        plt.plot(self.time_grid, avg_path, color='red', label='Average Stock Price')
-        plt.plot(self.time_grid, call_prices, color='blue', label='Call Option Price')
-        plt.title('Monte Carlo Simulation of Stock Price Paths')
-        plt.xlabel('Time')
-        plt.ylabel('Price')
-        plt.grid(True)
-        plt.legend()
-        plt.show()
-
-    def plot_portfolio(self, portfolio_values):
-        plt.plot(self.time_grid, portfolio_values, color='green')
-        plt.title('Delta-Hedged Portfolio Value Over Time')
-        plt.xlabel('Time')
-        plt.ylabel('Portfolio Value')
-        plt.grid(True)
-        plt.show()
-
-
-def main():
+    @timed("MonteCarloHedging.plot_paths", "plot")
+    def plot_paths(self, paths, avg_path, call_prices, mode="collection", max_paths=500, output=None, rng=None):
+        # mode "collection" : au plus max_paths trajectoires tirées au hasard, en un seul
+        # LineCollection ; "fan" : bandes de quantiles ; "lines" : un tracé par trajectoire.
+        # Avec output (fichier .png/.svg), rendu hors écran (Agg) au lieu de plt.show()
+        figure = new_figure(output)
+        ax = figure.add_subplot()
+        add_paths(ax, self.time_grid, paths if mode == "fan" else np.asarray(paths), mode, max_paths, rng)
+        ax.plot(self.time_grid, avg_path, color='red', label='Average Stock Price')
+        ax.plot(self.time_grid, call_prices, color='blue', label='Call Option Price')
+        ax.set_title('Monte Carlo Simulation of Stock Price Paths')
+        ax.set_xlabel('Time')
+        ax.set_ylabel('Price')
+        ax.grid(True)
+        ax.legend()
+        show_or_save(figure, output)
+
+    @timed("MonteCarloHedging.plot_portfolio", "plot")
+    def plot_portfolio(self, portfolio_values, output=None):
+        figure = new_figure(output)
+        ax = figure.add_subplot()
+        ax.plot(self.time_grid, portfolio_values, color='green')
+        ax.set_title('Delta-Hedged Portfolio Value Over Time')
+        ax.set_xlabel('Time')
+        ax.set_ylabel('Portfolio Value')
+        ax.grid(True)
+        show_or_save(figure, output)
+
+
+def summarize_hedging_error(hedging_error, quantiles=(0.01, 0.05, 0.5, 0.95, 0.99)):
+    hedging_error = np.asarray(hedging_error)
+    return {
+        "mean": float(np.mean(hedging_error)),
+        "std": float(np.std(hedging_error)),
+        "quantiles": dict(zip(quantiles, np.quantile(hedging_error, quantiles).tolist())),
+    }
+
+
+def main(num_paths=50, num_steps=1000, output=None):
+    # output : nom de fichier ("hedge.png") -> figures écrites dans "<nom>_paths.png" et "<nom>_portfolio.png"
+    outputs = [None, None]
+    if output is not None:
+        stem, extension = os.path.splitext(output)
+        outputs = [stem + "_paths" + extension, stem + "_portfolio" + extension]
     model = MonteCarloHedging(
         S0=50,
         K=50,
         r=0.05,
         sigma=0.3,
         T=1,
-        num_paths=50,
-        num_steps=1000
+        num_paths=num_paths,
+        num_steps=num_steps
     )
 
     paths = model.simulate_paths()
@@ -86,12 +177,18 @@ def main():
     stock_path = paths[0]
     deltas = model.compute_deltas(stock_path)
 
-    model.plot_paths(paths, avg_path, call_prices)
+    model.plot_paths(paths, avg_path, call_prices, output=outputs[0])
 
     initial_call_price = call(model.S0, model.K, model.r, model.sigma, model.T)
     portfolio_values = model.simulate_hedging_portfolio(stock_path, deltas, initial_call_price)
 
-    model.plot_portfolio(portfolio_values)
+    model.plot_portfolio(portfolio_values, output=outputs[1])
+
+    book = model.simulate_hedging_book(paths, initial_call_price)
+    stats = book["stats"]
+    print(f"Erreur de couverture terminale : moyenne={stats['mean']:.4f}, écart-type={stats['std']:.4f}")
+    for q, value in stats["quantiles"].items():
+        print(f"  quantile {q:.0%} : {value:.4f}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,289 @@
+"""
+Offline throughput benchmarks for the simulation, pricing and hedging engines.
+
+Run from the repository root:
+
+    python -m benchmarks.run                              # default sizes, compare to baseline
+    python -m benchmarks.run --sizes 1000 10000 --output bench.json
+    python -m benchmarks.run --update-baseline            # store the results as the new baseline
+
+Every benchmark runs at several sizes and reports the best wall time over a
+few repeats, the corresponding throughput and the peak memory traced during
+one run. Results are written as JSON and compared against
+benchmarks/baseline.json; the exit status is 1 when a throughput drops, or a
+peak memory grows, by more than the threshold.
+
+Throughputs only compare on the same machine and software: the baseline
+records its environment (Python, NumPy, platform, CPU) under "meta", and a
+run in another environment warns about every difference before comparing. The
+committed baseline is a reference from one development machine, not from
+the versions pinned in requirements.txt; regenerate it with
+--update-baseline on the machine that runs the comparison.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from aleatoire import MonteCarloHedging
+from hedging_engine import DeltaBand, EveryKSteps, run_backtest, sweep_configs
+from heston import HestonSimulator
+from monte_carlo_simu import AssetPriceSimulator
+from option_book import OptionBook
+from online_pricer import BS_Call_Put_Option_Price, GeneratePathsGBM, HedgingSimulation, OptionType
+from outils import calcul_delta, call, put
+from scenario_risk import ScenarioEngine, scenario_grid
+from tick_service import FileReplaySource, TickService, write_replay_file
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+NUM_STEPS = 252
+
+
+def _pricing_inputs(size: int):
+    rng = np.random.default_rng(0)
+    return rng.uniform(50, 150, size), rng.uniform(60, 140, size), 0.02, rng.uniform(0.1, 0.5, size), \
+        rng.uniform(0.1, 2.0, size)
+
+
+def bench_asset_price_simulator(size: int) -> Callable[[], None]:
+    simulator = AssetPriceSimulator(100.0, 0.05, 0.2, 1.0, NUM_STEPS)
+    rng = np.random.default_rng(0)
+    return lambda: simulator.generate_trajectories(size, rng=rng)
+
+
+def bench_heston_simulator(size: int) -> Callable[[], None]:
+    simulator = HestonSimulator(100.0, 0.05, 0.04, 1.5, 0.04, 0.6, -0.7, 1.0, NUM_STEPS)
+    rng = np.random.default_rng(0)
+    return lambda: simulator.generate_trajectories(size, rng=rng)
+
+
+def bench_monte_carlo_hedging_paths(size: int) -> Callable[[], None]:
+    model = MonteCarloHedging(100.0, 100.0, 0.05, 0.2, 1.0, size, NUM_STEPS)
+    rng = np.random.default_rng(0)
+    return lambda: model.simulate_paths(rng=rng)
+
+
+def bench_generate_paths_gbm(size: int) -> Callable[[], None]:
+    rng = np.random.default_rng(0)
+    return lambda: GeneratePathsGBM(size, NUM_STEPS, 1.0, 0.05, 0.2, 100.0, rng=rng)
+
+
+def bench_outils(function: Callable) -> Callable[[int], Callable[[], None]]:
+    def bench(size: int) -> Callable[[], None]:
+        S, K, r, sigma, T = _pricing_inputs(size)
+        return lambda: function(S, K, r, sigma, T)
+    return bench
+
+
+def bench_bs_call_put_option_price(size: int) -> Callable[[], None]:
+    S, _, r, _, _ = _pricing_inputs(size)
+    return lambda: BS_Call_Put_Option_Price(OptionType.CALL, S, [100.0], 0.2, 0.0, 1.0, r)
+
+
+def bench_main_calculation_hedging(size: int) -> Callable[[], None]:
+    rng = np.random.default_rng(0)
+    return lambda: HedgingSimulation(size, 250, 1.0, 0.1, 0.2, 1.0, [0.95], OptionType.CALL, rng=rng)
+
+
+def bench_hedging_sweep(size: int) -> Callable[[], None]:
+    # 50 configurations: 5 policies x 5 proportional costs x 2 fixed costs
+    paths = GeneratePathsGBM(size, NUM_STEPS, 1.0, 0.1, 0.2, 1.0, rng=np.random.default_rng(0))
+    configs = sweep_configs([EveryKSteps(1), EveryKSteps(5), DeltaBand(0.02), DeltaBand(0.05), DeltaBand(0.1)],
+                            [0.0, 0.001, 0.002, 0.005, 0.01], [0.0, 1e-4])
+    return lambda: run_backtest(paths["S"], paths["time"], 0.95, 0.1, 0.2, configs)
+
+
+def bench_option_book_tick(size: int) -> Callable[[], None]:
+    # book of `size` positions on 50 underlyings; one spot tick then the book-wide risk
+    rng = np.random.default_rng(0)
+    names = [f"U{k:02d}" for k in range(50)]
+    book = OptionBook(np.array(names)[rng.integers(0, 50, size)], np.where(rng.random(size) < 0.5, "call", "put"),
+                      rng.uniform(80.0, 120.0, size), rng.choice([0.25, 0.5, 1.0, 2.0], size),
+                      rng.integers(-10, 11, size), 0.2, 0.02, spots=dict.fromkeys(names, 100.0))
+
+    def tick():
+        book.update_spot("U07", 100.0 + rng.normal())
+        book.risk()
+    return tick
+
+
+def bench_tick_service_replay(size: int) -> Callable[[], None]:
+    # `size` ticks on 50 underlyings replayed from disk through the coalescing pricer
+    rng = np.random.default_rng(0)
+    names = np.array([f"U{k:02d}" for k in range(50)])
+    # removed when the benchmark closure that holds it is released
+    directory = tempfile.TemporaryDirectory()
+    path = os.path.join(directory.name, "ticks.csv")
+    write_replay_file(path, np.arange(size) * 1e-6, names[rng.integers(0, 50, size)],
+                      np.round(rng.uniform(90.0, 110.0, size), 2))
+    book = OptionBook(np.repeat(names, 100), "call", np.tile(np.linspace(80.0, 120.0, 100), 50), 1.0, 1.0, 0.2,
+                      0.01)
+
+    def replay():
+        asyncio.run(TickService(book, FileReplaySource(path)).run())
+    replay.directory = directory
+    return replay
+
+
+def bench_tick_service_burst(size: int) -> Callable[[], None]:
+    # `size` ticks 1 us apart on 50 underlyings, one option each: the cost of reading and coalescing
+    rng = np.random.default_rng(1)
+    names = np.array([f"U{k:02d}" for k in range(50)])
+    directory = tempfile.TemporaryDirectory()
+    path = os.path.join(directory.name, "burst.csv")
+    write_replay_file(path, np.arange(size) * 1e-6, names[rng.integers(0, 50, size)],
+                      np.round(rng.uniform(90.0, 110.0, size), 2))
+    book = OptionBook(names, "call", 100.0, 1.0, 1.0, 0.2, 0.01)
+
+    def replay():
+        asyncio.run(TickService(book, FileReplaySource(path)).run())
+    replay.directory = directory
+    return replay
+
+
+def bench_scenario_grid(size: int) -> Callable[[], None]:
+    # 10k distinct positions on 20 underlyings, `size` spot x vol x time scenarios
+    rng = np.random.default_rng(0)
+    names = np.array([f"U{k:02d}" for k in range(20)])
+    n = 10_000
+    book = OptionBook(names[rng.integers(0, 20, n)], np.where(rng.random(n) < 0.5, "call", "put"),
+                      rng.uniform(80.0, 120.0, n), rng.choice([0.1, 0.25, 0.5, 1.0, 2.0], n),
+                      rng.integers(-10, 11, n), rng.uniform(0.1, 0.4, n), 0.02,
+                      spots=dict(zip(names, rng.uniform(90.0, 110.0, 20))))
+    engine = ScenarioEngine(book)
+    grid = scenario_grid(np.linspace(-0.2, 0.2, max(size // 50, 1)), np.linspace(-0.05, 0.05, 10),
+                         np.linspace(0.0, 0.1, 5))
+    return lambda: engine.revalue(grid)
+
+
+# name -> (factory, throughput unit, scale applied to the requested size)
+BENCHMARKS = {
+    "AssetPriceSimulator.generate_trajectories": (bench_asset_price_simulator, "paths/s", 1.0),
+    "HestonSimulator.generate_trajectories": (bench_heston_simulator, "paths/s", 0.1),
+    "MonteCarloHedging.simulate_paths": (bench_monte_carlo_hedging_paths, "paths/s", 1.0),
+    "GeneratePathsGBM": (bench_generate_paths_gbm, "paths/s", 1.0),
+    "outils.call": (bench_outils(call), "evals/s", 10.0),
+    "outils.put": (bench_outils(put), "evals/s", 10.0),
+    "outils.calcul_delta": (bench_outils(calcul_delta), "evals/s", 10.0),
+    "BS_Call_Put_Option_Price": (bench_bs_call_put_option_price, "evals/s", 10.0),
+    "online_pricer.HedgingSimulation": (bench_main_calculation_hedging, "paths/s", 0.1),
+    "hedging_engine.run_backtest[50 configs]": (bench_hedging_sweep, "paths/s", 0.01),
+    "OptionBook.update_spot+risk": (bench_option_book_tick, "book positions/s", 0.5),
+    "TickService[file replay]": (bench_tick_service_replay, "ticks/s", 1.0),
+    "TickService[burst replay]": (bench_tick_service_burst, "ticks/s", 3.0),
+    "ScenarioEngine.revalue[10k positions]": (bench_scenario_grid, "scenarios/s", 0.05),
+}
+
+
+def measure(run: Callable[[], None], repeats: int) -> Dict[str, float]:
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return {"seconds": min(timings), "peak_bytes": peak}
+
+
+def run_benchmarks(sizes: List[int], repeats: int = 3, names: List[str] = None) -> Dict:
+    results = {}
+    for name, (factory, unit, scale) in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        for size in sizes:
+            work = max(int(size * scale), 1)
+            measured = measure(factory(work), repeats)
+            key = f"{name}[{work}]"
+            results[key] = {"size": work, "unit": unit, "rate": work / measured["seconds"], **measured}
+            print(f"{key:55s} {measured['seconds'] * 1e3:10.2f} ms {work / measured['seconds']:14.0f} {unit}"
+                  f" {measured['peak_bytes'] / 2 ** 20:9.1f} MiB")
+    return {"meta": dict(environment(), timestamp=datetime.datetime.now().isoformat(timespec="seconds")),
+            "results": results}
+
+
+def environment() -> Dict[str, object]:
+    """What the throughputs depend on besides the code."""
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def environment_changes(current: Dict, baseline: Dict) -> List[str]:
+    """Environment entries that differ between two result files (or are missing from the baseline)."""
+    recorded = baseline.get("meta", {})
+    return [f"{name}: baseline {recorded.get(name)!r}, now {value!r}"
+            for name, value in current["meta"].items()
+            if name != "timestamp" and recorded.get(name) != value]
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Return a description of every regression beyond threshold (e.g. 0.2 = 20%)."""
+    regressions = []
+    for key, result in current["results"].items():
+        reference = baseline["results"].get(key)
+        if reference is None:
+            continue
+        if result["rate"] < reference["rate"] * (1.0 - threshold):
+            regressions.append(f"{key}: throughput {result['rate']:.0f} < baseline {reference['rate']:.0f} "
+                               f"{result['unit']} ({result['rate'] / reference['rate'] - 1:+.0%})")
+        if result["peak_bytes"] > reference["peak_bytes"] * (1.0 + threshold):
+            regressions.append(f"{key}: peak memory {result['peak_bytes']} > baseline {reference['peak_bytes']} "
+                               f"bytes ({result['peak_bytes'] / reference['peak_bytes'] - 1:+.0%})")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="run only these benchmarks")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative regression")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    current = run_benchmarks(args.sizes, args.repeats, args.only)
+    with open(args.output, "w") as f:
+        json.dump(current, f, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"baseline written to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}, run with --update-baseline to create one")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    changes = environment_changes(current, baseline)
+    if changes:
+        print("WARNING baseline recorded in another environment, regenerate it here with --update-baseline:")
+        for change in changes:
+            print("   ", change)
+    regressions = compare(current, baseline, args.threshold)
+    for regression in regressions:
+        print("REGRESSION", regression)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Command-line entry point for the scenarios of the repository.
+
+    python cli.py simulate --paths 10000 --steps 252 --output paths.png
+    python cli.py simulate --paths 1000000 --steps 252 --store paths_cache --seed 7 --output paths.png
+    python cli.py hedge --paths 5000 --steps 250                  # online_pricer.mainCalculation
+    python cli.py mc-hedge --paths 50 --steps 1000 --output hedge.svg
+    python cli.py bs-curve --steps 1000
+    python cli.py price --S 100 --K 95 --r 0.05 --sigma 0.2 --T 0.5
+    python cli.py --report run.json --trace run.trace.json --profile run.folded hedge --paths 20000
+
+Without --output the figures are shown interactively; with it they are
+rendered off screen (Agg) to the given file, so the scenarios run on a
+headless server. Every scenario module is imported only when its command
+runs. simulate --store keeps the paths in a path_store.PathStore directory.
+
+--report and --trace record the instrumentation spans and counters of the
+run (instrumentation.py) as a JSON summary and a Chrome trace; --profile
+also samples the Python stack and writes it in collapsed-stack format
+(flame graphs). The slowest spans and functions are printed on stderr.
+"""
+import argparse
+import json
+import sys
+from typing import List, Optional
+
+
+def _simulate(args):
+    from monte_carlo_simu import main
+    main(num_trajectories=args.paths, num_steps=args.steps, output=args.output, store=args.store, seed=args.seed)
+
+
+def _hedge(args):
+    from online_pricer import mainCalculation
+    mainCalculation(output=args.output, NoOfPaths=args.paths, NoOfSteps=args.steps)
+
+
+def _mc_hedge(args):
+    from aleatoire import main
+    main(num_paths=args.paths, num_steps=args.steps, output=args.output)
+
+
+def _bs_curve(args):
+    from BS_pricer import main
+    main(n_steps=args.steps, output=args.output)
+
+
+def _price(args):
+    from outils import GREEKS, bs_greeks
+    values = bs_greeks(args.S, args.K, args.r, args.sigma, args.T, args.type, GREEKS)
+    for greek in GREEKS:
+        print(f"{greek:>6} = {float(values[greek]):.6f}")
+
+
+# command -> (handler, help, default paths, default steps); None when the scenario has no such size
+SCENARIOS = {
+    "simulate": (_simulate, "GBM trajectories and their mean (monte_carlo_simu)", 50, 100),
+    "hedge": (_hedge, "daily delta hedging backtest with P&L plots (online_pricer)", 5000, 250),
+    "mc-hedge": (_mc_hedge, "Monte Carlo delta hedging of one call (aleatoire)", 50, 1000),
+    "bs-curve": (_bs_curve, "Black-Scholes call price along time (BS_pricer)", None, 1000),
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--report", default=None, help="write the spans and counters of the run to this JSON file")
+    parser.add_argument("--trace", default=None, help="write a Chrome trace of the run (chrome://tracing, Perfetto)")
+    parser.add_argument("--profile", default=None, help="sample the Python stack, write collapsed stacks to this file")
+    parser.add_argument("--profile-interval", type=float, default=0.001, help="sampling interval in seconds")
+    parser.add_argument("--trace-memory", action="store_true", help="add the tracemalloc peak to the report (slower)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, (handler, help_text, paths, steps) in SCENARIOS.items():
+        command = commands.add_parser(name, help=help_text)
+        if paths is not None:
+            command.add_argument("--paths", type=int, default=paths, help=f"number of paths (default {paths})")
+        command.add_argument("--steps", type=int, default=steps, help=f"number of time steps (default {steps})")
+        command.add_argument("--output", default=None,
+                             help="write the figures to this file (.png, .svg, .pdf) instead of showing them")
+        if name == "simulate":
+            command.add_argument("--store", default=None,
+                                 help="path_store directory: the paths of an identical run are reopened, not simulated")
+            command.add_argument("--seed", type=int, default=None, help="random seed (required with --store)")
+        command.set_defaults(handler=handler)
+
+    price = commands.add_parser("price", help="Black-Scholes price and Greeks of a European option")
+    price.add_argument("--S", type=float, required=True)
+    price.add_argument("--K", type=float, required=True)
+    price.add_argument("--r", type=float, default=0.0)
+    price.add_argument("--sigma", type=float, required=True)
+    price.add_argument("--T", type=float, required=True)
+    price.add_argument("--type", choices=("call", "put"), default="call")
+    price.set_defaults(handler=_price)
+    return parser
+
+
+def _print_summary(report, profiler, limit=10):
+    print(f"wall time {report['wall_time']:.3f} s", file=sys.stderr)
+    for name, stats in list(report["spans"].items())[:limit]:
+        print(f"  {stats['self']:9.4f} s self {stats['total']:9.4f} s total {stats['count']:8d} x  {name}",
+              file=sys.stderr)
+    for name, value in sorted(report["counters"].items()):
+        print(f"  {name} = {value}", file=sys.stderr)
+    if profiler is not None:
+        for row in profiler.top(limit):
+            print(f"  {row['self']:6.1%} self {row['total']:6.1%} total  {row['function']}", file=sys.stderr)
+
+
+def _run_instrumented(args) -> None:
+    from instrumentation import SamplingProfiler, recording, span
+    profiler = SamplingProfiler(args.profile_interval) if args.profile else None
+    with recording(trace_memory=args.trace_memory) as recorder:
+        if profiler is not None:
+            profiler.start()
+        try:
+            with span(args.command):
+                args.handler(args)
+        finally:
+            if profiler is not None:
+                profiler.stop()
+    report = recorder.report()
+    if profiler is not None:
+        report["profile"] = profiler.top(20)
+        profiler.write_collapsed(args.profile)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.trace:
+        recorder.write_chrome_trace(args.trace)
+    _print_summary(report, profiler)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, "store", None) is not None and args.seed is None:
+        parser.error("--store needs --seed: unseeded paths can never be reused")
+    if args.report or args.trace or args.profile:
+        _run_instrumented(args)
+    else:
+        args.handler(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
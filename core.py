@@ -0,0 +1,41 @@
+"""
+Numerical core in one import: pricing, Greeks, path generation and hedging.
+
+    from core import bs_greeks, GeneratePathsGBM, run_backtest
+
+Importing it has no side effect (no simulation, no figure, no GUI) and only
+loads numpy and the pure-numpy modules of the repository. matplotlib,
+seaborn and tkinter are imported by the plotting functions when they are
+called, and scipy by the first function that needs it (normal CDF,
+Fourier integral), so the cold import stays well under 100 ms
+(tests/test_core.py). The scenarios with plots are run through cli.py.
+"""
+from aleatoire import MonteCarloHedging, summarize_hedging_error
+from hedging_engine import DeltaBand, EveryKSteps, FixedSchedule, HedgeConfig, RebalancingPolicy, run_backtest, \
+    sweep_configs
+from heston import HestonSimulator, heston_call_price
+from implied_vol import implied_volatility
+from longstaff_schwartz import exercise_value, longstaff_schwartz
+from mc_pricer import EuropeanPayoff, european_payoff, greek_samples, price_monte_carlo
+from monte_carlo_simu import AssetPriceSimulator, QuantileSketch, TrajectoryAccumulator, TrajectoryAnalyzer
+from online_pricer import BS_Call_Put_Option_Price, BS_Delta, GeneratePathsGBM, GeneratePathsGBMChunks, \
+    GeneratePathsGBMSteps, GeneratePathsHeston, HedgingSimulation, OptionType
+from option_book import OptionBook
+from outils import GREEKS, bs_greeks, bs_time_terms, calcul_delta, call, ndtr, option_sign, put
+from path_store import PathStore, StoredPaths, path_key
+from payoffs import AsianArithmetic, AsianGeometric, Barrier, Lookback, PathPayoff, evaluate_chunks, \
+    evaluate_streaming, geometric_asian_price
+from scenario_risk import ScenarioEngine, historical_returns, historical_scenarios, scenario_grid, var_es
+
+__all__ = [
+    "AsianArithmetic", "AsianGeometric", "AssetPriceSimulator", "BS_Call_Put_Option_Price", "BS_Delta", "Barrier",
+    "DeltaBand", "EuropeanPayoff", "EveryKSteps", "FixedSchedule", "GREEKS", "GeneratePathsGBM",
+    "GeneratePathsGBMChunks", "GeneratePathsGBMSteps", "GeneratePathsHeston", "HedgeConfig", "HedgingSimulation",
+    "HestonSimulator", "Lookback", "MonteCarloHedging", "OptionBook", "OptionType", "PathPayoff", "PathStore",
+    "QuantileSketch", "RebalancingPolicy", "ScenarioEngine", "StoredPaths", "TrajectoryAccumulator",
+    "TrajectoryAnalyzer", "bs_greeks", "bs_time_terms", "calcul_delta", "call", "european_payoff", "evaluate_chunks",
+    "evaluate_streaming", "exercise_value", "geometric_asian_price", "greek_samples", "heston_call_price",
+    "historical_returns", "historical_scenarios", "implied_volatility", "longstaff_schwartz", "ndtr", "option_sign",
+    "path_key", "price_monte_carlo", "put", "run_backtest", "scenario_grid", "summarize_hedging_error", "sweep_configs",
+    "var_es",
+]
@@ -1,7 +1,3 @@
-import tkinter as tk
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.pyplot as plt
 import numpy as np
-from scipy.stats import norm
 from outils import call
 from outils import put
\ No newline at end of file
@@ -0,0 +1,262 @@
+"""
+Vectorized delta-hedging backtests with rebalancing policies and transaction costs.
+
+A book of paths (matrix of shape (num_paths, num_steps + 1) or an iterable of
+such blocks) is hedged for a short European option under several
+configurations at once. Each configuration combines a rebalancing policy with
+proportional and fixed transaction costs. The Black-Scholes delta of each step
+is computed once and shared by all the configurations, and paths are processed
+in row blocks. Per-step matrices are therefore never built for the whole book:
+only the terminal hedging error of each path is kept, and the full history is
+recorded only for the few paths asked for.
+
+Policies:
+    EveryKSteps(k)        rebalance every k grid steps
+    FixedSchedule(times)  rebalance at the grid dates closest to `times`
+    DeltaBand(band)       rebalance when |target delta - holding| > band
+
+Convention (same as online_pricer.HedgingSimulation): the option is sold at its
+Black-Scholes price, the premium goes into a cash account earning r, the hedge
+is traded at the grid prices and valued at S_T at maturity. The hedging error
+is cash + holding * S_T - payoff.
+"""
+import itertools
+from typing import Dict, Iterable, List, NamedTuple, Sequence, Union
+
+import numpy as np
+
+from aleatoire import summarize_hedging_error
+from instrumentation import count, timed
+from outils import bs_greeks, bs_time_terms, option_sign
+
+
+class RebalancingPolicy:
+    """Decides, at every grid step, on which paths the hedge is rebalanced to
+    the target delta."""
+
+    def scheduled(self, time: np.ndarray) -> np.ndarray:
+        """Boolean array over the num_steps trading dates (time[:-1]): dates at
+        which a rebalance is considered. The first date is always included."""
+        return np.ones(len(time) - 1, dtype=bool)
+
+    def trigger(self, holding: np.ndarray, target: np.ndarray):
+        """Paths (boolean array, or True for all) to rebalance at a scheduled date."""
+        return True
+
+
+class EveryKSteps(RebalancingPolicy):
+    def __init__(self, k: int = 1):
+        if k < 1:
+            raise ValueError("k must be at least 1")
+        self.k = k
+
+    def scheduled(self, time):
+        return np.arange(len(time) - 1) % self.k == 0
+
+    def __repr__(self):
+        return f"EveryKSteps({self.k})"
+
+
+class FixedSchedule(RebalancingPolicy):
+    def __init__(self, times: Sequence[float]):
+        self.times = np.asarray(times, dtype=np.float64)
+
+    def scheduled(self, time):
+        dates = np.asarray(time[:-1])
+        mask = np.zeros(len(dates), dtype=bool)
+        mask[0] = True
+        # index of the closest trading date for every requested time
+        right = np.clip(np.searchsorted(dates, self.times), 1, len(dates) - 1) if len(dates) > 1 else \
+            np.zeros(len(self.times), dtype=int)
+        left = np.maximum(right - 1, 0)
+        closest = np.where(np.abs(dates[left] - self.times) <= np.abs(dates[right] - self.times), left, right)
+        mask[closest[(self.times >= 0.0) & (self.times < time[-1])]] = True
+        return mask
+
+    def __repr__(self):
+        return f"FixedSchedule({len(self.times)} dates)"
+
+
+class DeltaBand(RebalancingPolicy):
+    def __init__(self, band: float):
+        if band < 0.0:
+            raise ValueError("band must be non-negative")
+        self.band = band
+
+    def trigger(self, holding, target):
+        return np.abs(target - holding) > self.band
+
+    def __repr__(self):
+        return f"DeltaBand({self.band})"
+
+
+class HedgeConfig(NamedTuple):
+    policy: RebalancingPolicy
+    proportional_cost: float = 0.0  # fraction of the traded notional |trade| * S
+    fixed_cost: float = 0.0         # per rebalance of a path
+
+
+def sweep_configs(policies: Iterable[RebalancingPolicy], proportional_costs: Iterable[float] = (0.0,),
+                  fixed_costs: Iterable[float] = (0.0,)) -> List[HedgeConfig]:
+    """Cartesian product of policies and cost levels."""
+    return [HedgeConfig(*combination)
+            for combination in itertools.product(policies, proportional_costs, fixed_costs)]
+
+
+class _Setup(NamedTuple):
+    time: np.ndarray
+    growth: np.ndarray        # exp(r dt) of every step
+    terms: List[Dict]         # bs_time_terms of every trading date
+    scheduled: np.ndarray     # (num_configs, num_steps)
+    proportional: np.ndarray  # (num_configs, 1)
+    fixed: np.ndarray         # (num_configs, 1)
+
+
+@timed("hedging_engine._hedge_block", "hedging")
+def _hedge_block(S, K, r, sigma, sign, configs, setup, record=False):
+    num_configs, num_paths, num_steps = len(configs), S.shape[0], S.shape[1] - 1
+    with_costs = bool(np.any(setup.proportional) or np.any(setup.fixed))
+    holding = np.zeros((num_configs, num_paths))
+    cash = np.empty((num_configs, num_paths))
+    trades = np.empty((num_configs, num_paths))
+    mask = np.empty((num_configs, num_paths), dtype=bool)
+    rebalances = np.zeros((num_configs, num_paths), dtype=np.int64)
+    costs = np.zeros((num_configs, num_paths))
+    cost = np.empty((num_configs, num_paths)) if with_costs else None
+    if record:
+        history = {name: np.empty((num_configs, num_paths, num_steps + 1)) for name in ("delta", "pnl")}
+        history["option"] = np.empty((num_paths, num_steps + 1))
+
+    greeks = ("price", "delta") if record else ("delta",)
+    for i in range(num_steps):
+        S_i = S[:, i]
+        values = bs_greeks(S_i, K, r, sigma, setup.terms[i]["tau"], sign, greeks, setup.terms[i])
+        target = values["delta"]
+        if i == 0:
+            premium = values["price"] if record else \
+                bs_greeks(S_i, K, r, sigma, setup.terms[0]["tau"], sign, ("price",), setup.terms[0])["price"]
+            cash[...] = premium
+        else:
+            cash *= setup.growth[i - 1]
+
+        for c, config in enumerate(configs):
+            mask[c] = config.policy.trigger(holding[c], target) if setup.scheduled[c, i] else False
+        np.subtract(target, holding, out=trades)
+        trades *= mask
+        holding += trades
+        trades *= S_i
+        cash -= trades
+        rebalances += mask
+        if with_costs:
+            np.abs(trades, out=cost)
+            cost *= setup.proportional
+            cost += setup.fixed * mask
+            cash -= cost
+            costs += cost
+
+        if record:
+            history["option"][:, i] = values["price"]
+            history["delta"][:, :, i] = holding
+            history["pnl"][:, :, i] = cash
+
+    S_T = S[:, -1]
+    cash *= setup.growth[-1]
+    payoff = np.maximum(sign * (S_T - K), 0.0)
+    holding *= S_T
+    cash += holding
+    cash -= payoff
+    result = {"hedging_error": cash, "rebalances": rebalances, "costs": costs}
+    if record:
+        history["option"][:, -1] = payoff
+        history["delta"][:, :, -1] = history["delta"][:, :, -2]
+        history["pnl"][:, :, -1] = cash
+        result["history"] = history
+    return result
+
+
+@timed("run_backtest", "hedging")
+def run_backtest(paths: Union[np.ndarray, Iterable[np.ndarray]], time: np.ndarray, K: float, r: float,
+                 sigma: float, configs: Sequence[HedgeConfig], option_type="call", block_size: int = 8192,
+                 record_paths: Sequence[int] = (), return_errors: bool = False,
+                 quantiles=(0.01, 0.05, 0.5, 0.95, 0.99)) -> Dict:
+    """
+    Hedge a short option on every path under every configuration.
+
+    `paths` is a (num_paths, num_steps + 1) matrix on the grid `time` or an
+    iterable of such row blocks (e.g. GeneratePathsGBMChunks output). Returns a
+    dict with, for every configuration, the summary statistics of the terminal
+    hedging error plus the mean number of rebalances and mean transaction cost
+    per path ("stats"). The (num_configs, num_paths) terminal errors are
+    returned under "hedging_error" only with return_errors=True. For the
+    global path indices in record_paths, "recorded" holds the path ("S"), the
+    option value ("option"), the hedge held after each rebalance ("delta",
+    per configuration) and the cash account ("pnl", per configuration, equal
+    to the hedging error at maturity).
+    """
+    configs = list(configs)
+    if not configs:
+        raise ValueError("at least one configuration is required")
+    time = np.asarray(time, dtype=np.float64)
+    T = time[-1]
+    terms = []
+    for t in time[:-1]:
+        term = bs_time_terms(r, sigma, T - t)
+        term["tau"] = T - t
+        terms.append(term)
+    setup = _Setup(
+        time=time,
+        growth=np.exp(r * np.diff(time)),
+        terms=terms,
+        scheduled=np.array([config.policy.scheduled(time) for config in configs]),
+        proportional=np.array([[config.proportional_cost] for config in configs], dtype=np.float64),
+        fixed=np.array([[config.fixed_cost] for config in configs], dtype=np.float64),
+    )
+    setup.scheduled[:, 0] = True
+    sign = option_sign(option_type)
+
+    if isinstance(paths, np.ndarray):
+        blocks = (paths[start:start + block_size] for start in range(0, paths.shape[0], block_size))
+    else:
+        blocks = (block["S"] if isinstance(block, dict) else block for block in paths)
+
+    record_paths = np.unique(np.asarray(record_paths, dtype=np.int64))
+    errors, rebalances, costs, recorded_S, recorded_history = [], [], [], [], []
+    offset = 0
+    for block in blocks:
+        block = np.asarray(block, dtype=np.float64)
+        if block.shape[1] != len(time):
+            raise ValueError(f"paths have {block.shape[1]} dates, time grid has {len(time)}")
+        part = _hedge_block(block, K, r, sigma, sign, configs, setup)
+        errors.append(part["hedging_error"])
+        rebalances.append(part["rebalances"].sum(axis=1))
+        count("rebalances", int(rebalances[-1].sum()))
+        costs.append(part["costs"].sum(axis=1))
+        local = record_paths[(record_paths >= offset) & (record_paths < offset + block.shape[0])] - offset
+        if len(local):
+            recorded_S.append(block[local])
+            recorded_history.append(_hedge_block(block[local], K, r, sigma, sign, configs, setup, True)["history"])
+        offset += block.shape[0]
+
+    hedging_error = np.concatenate(errors, axis=1)
+    mean_rebalances = np.sum(rebalances, axis=0) / offset
+    mean_costs = np.sum(costs, axis=0) / offset
+    stats = []
+    for c in range(len(configs)):
+        summary = summarize_hedging_error(hedging_error[c], quantiles)
+        summary["mean_rebalances"] = float(mean_rebalances[c])
+        summary["mean_cost"] = float(mean_costs[c])
+        stats.append(summary)
+
+    result = {"configs": configs, "stats": stats, "num_paths": offset}
+    if return_errors:
+        result["hedging_error"] = hedging_error
+    if len(record_paths):
+        result["recorded"] = {
+            "time": time,
+            "path_ids": record_paths,
+            "S": np.concatenate(recorded_S),
+            "option": np.concatenate([history["option"] for history in recorded_history]),
+            "delta": np.concatenate([history["delta"] for history in recorded_history], axis=1),
+            "pnl": np.concatenate([history["pnl"] for history in recorded_history], axis=1),
+        }
+    return result
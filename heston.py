@@ -0,0 +1,197 @@
+"""
+Heston stochastic-volatility paths, next to the constant-volatility GBM of
+monte_carlo_simu.AssetPriceSimulator.
+
+    dS = mu S dt + sqrt(v) S dW_S
+    dv = kappa (theta - v) dt + xi sqrt(v) dW_v,   d<W_S, W_v> = rho dt
+
+The variance uses the quadratic-exponential (QE) scheme of Andersen (2008),
+which stays non-negative and matches the first two conditional moments of
+v. The log-spot uses the matching central discretization with correlated
+shocks. Every time step is one vectorized update over all paths.
+
+HestonSimulator has the same array and chunk API as AssetPriceSimulator:
+trajectories come back as (num_trajectories, num_steps + 1) price matrices,
+so TrajectoryAnalyzer, TrajectoryPlotter and hedging_engine.run_backtest
+consume them unchanged. heston_call_price is the semi-closed-form price
+used to check the simulation.
+"""
+from typing import Iterator, Optional, Tuple, Union
+
+import numpy as np
+from instrumentation import count, timed
+from outils import ndtr
+
+_PSI_CRITICAL = 1.5  # QE switching level between the quadratic and exponential branches
+
+
+class HestonSimulator:
+    """
+    Heston paths with the QE scheme on a uniform grid of num_steps steps.
+    # (FR) Trajectoires de Heston (schéma QE d'Andersen) sur une grille uniforme.
+    """
+
+    def __init__(self, initial_price: float, mu: float, v0: float, kappa: float, theta: float, xi: float,
+                 rho: float, total_time: float, num_steps: int):
+        if v0 < 0 or kappa <= 0 or theta < 0 or xi <= 0 or not -1.0 <= rho <= 1.0:
+            raise ValueError("need v0 >= 0, kappa > 0, theta >= 0, xi > 0 and -1 <= rho <= 1")
+        self.initial_price = initial_price
+        self.mu = mu
+        self.v0 = v0
+        self.kappa = kappa
+        self.theta = theta
+        self.xi = xi
+        self.rho = rho
+        self.total_time = total_time
+        self.num_steps = num_steps
+        self.dt = total_time / num_steps
+        self.time_grid = np.linspace(0, total_time, num_steps + 1)
+
+        # constants of the QE variance step and of the log-spot step (gamma1 = gamma2 = 1/2)
+        dt = self.dt
+        decay = np.exp(-kappa * dt)
+        self._decay = decay
+        self._s2_v = xi ** 2 * decay * (1.0 - decay) / kappa
+        self._s2_const = theta * xi ** 2 * (1.0 - decay) ** 2 / (2.0 * kappa)
+        self._K0 = -rho * kappa * theta * dt / xi
+        self._K1 = 0.5 * dt * (kappa * rho / xi - 0.5) - rho / xi
+        self._K2 = 0.5 * dt * (kappa * rho / xi - 0.5) + rho / xi
+        self._K3 = 0.5 * dt * (1.0 - rho ** 2)
+
+    def _variance_step(self, v: np.ndarray, Z: np.ndarray, out: np.ndarray, work: np.ndarray) -> np.ndarray:
+        # one QE step from v to out; work is a (3, len(v)) scratch buffer so that
+        # no temporary array is allocated on the quadratic branch
+        m, psi, tmp = work
+        np.multiply(v, self._decay, out=m)
+        m += self.theta * (1.0 - self._decay)
+        np.multiply(v, self._s2_v, out=psi)
+        psi += self._s2_const
+        np.multiply(m, m, out=tmp)
+        np.maximum(tmp, 1e-300, out=tmp)
+        psi /= tmp
+        exponential = psi > _PSI_CRITICAL
+
+        # quadratic branch: v' = a (b + Z)^2 with b^2 = 2/psi - 1 + sqrt(2/psi (2/psi - 1)), a = m / (1 + b^2)
+        np.divide(2.0, psi, out=tmp)
+        np.subtract(tmp, 1.0, out=out)
+        np.maximum(out, 0.0, out=out)
+        out *= tmp
+        np.sqrt(out, out=out)
+        out += tmp
+        out -= 1.0
+        np.maximum(out, 0.0, out=out)  # only matters on the exponential branch, overwritten below
+        np.add(out, 1.0, out=tmp)
+        np.divide(m, tmp, out=tmp)
+        np.sqrt(out, out=out)
+        out += Z
+        out *= out
+        out *= tmp
+
+        # exponential branch: mass p at 0, exponential tail of rate beta
+        if exponential.any():
+            psi_e, m_e = psi[exponential], m[exponential]
+            p = (psi_e - 1.0) / (psi_e + 1.0)
+            beta = (1.0 - p) / m_e
+            U = ndtr(Z[exponential])
+            out[exponential] = np.where(U <= p, 0.0, np.log((1.0 - p) / np.maximum(1.0 - U, 1e-300)) / beta)
+        return out
+
+    @timed("HestonSimulator.generate_trajectories", "paths")
+    def generate_trajectories(self, num_trajectories: int, dtype=np.float64, out: Optional[np.ndarray] = None,
+                              rng: Optional[np.random.Generator] = None,
+                              return_variance: bool = False) -> Union[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
+        """
+        Generate all trajectories as a (num_trajectories, num_steps + 1) price
+        array, like AssetPriceSimulator.generate_trajectories. With
+        return_variance=True, also return the variance paths (same shape).
+        Shocks come from `rng` when given, otherwise from the global np.random
+        state.
+        # (FR) Générer toutes les trajectoires de prix (et, si demandé, de variance).
+        """
+        shape = (num_trajectories, self.num_steps + 1)
+        if out is None:
+            out = np.empty(shape, dtype=dtype)
+            count("bytes_allocated", out.nbytes)
+        elif out.shape != shape:
+            raise ValueError(f"out must have shape {shape}, got {out.shape}")
+        variance_paths = np.empty(shape, dtype=out.dtype) if return_variance else None
+        if return_variance:
+            count("bytes_allocated", variance_paths.nbytes)
+        count("paths_generated", num_trajectories)
+        sampler = np.random if rng is None else rng
+        if getattr(sampler, "draws_whole_paths", False):
+            # the (2, num_trajectories) draw of every step would be taken for 2 quasi-random paths
+            raise ValueError("HestonSimulator draws its shocks step by step: use a np.random.Generator")
+
+        log_S = np.full(num_trajectories, np.log(self.initial_price))
+        v = np.full(num_trajectories, float(self.v0))
+        v_next = np.empty(num_trajectories)
+        work = np.empty((3, num_trajectories))
+        step = work[2]
+        out[:, 0] = log_S
+        if return_variance:
+            variance_paths[:, 0] = v
+        drift = self.mu * self.dt
+        for i in range(1, self.num_steps + 1):
+            Z_v, Z_s = sampler.standard_normal((2, num_trajectories))
+            self._variance_step(v, Z_v, v_next, work)
+            # log S' = log S + mu dt + K0 + K1 v + K2 v' + sqrt(K3 (v + v')) Z_s
+            np.add(v, v_next, out=step)
+            step *= self._K3
+            np.sqrt(step, out=step)
+            step *= Z_s
+            log_S += step
+            np.multiply(v, self._K1, out=step)
+            log_S += step
+            np.multiply(v_next, self._K2, out=step)
+            log_S += step
+            log_S += drift + self._K0
+            out[:, i] = log_S
+            v, v_next = v_next, v
+            if return_variance:
+                variance_paths[:, i] = v
+        np.exp(out, out=out)
+        out[:, 0] = self.initial_price
+        return (out, variance_paths) if return_variance else out
+
+    def iter_trajectory_chunks(self, num_trajectories: int, chunk_size: int, dtype=np.float64,
+                               rng: Optional[np.random.Generator] = None) -> Iterator[np.ndarray]:
+        """
+        Yield the trajectories in blocks of at most chunk_size rows.
+        # (FR) Produire les trajectoires par blocs d'au plus chunk_size lignes.
+        """
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        for start in range(0, num_trajectories, chunk_size):
+            yield self.generate_trajectories(min(chunk_size, num_trajectories - start), dtype=dtype, rng=rng)
+
+
+@timed("heston_call_price", "pricing")
+def heston_call_price(S0: float, K: float, r: float, T: float, v0: float, kappa: float, theta: float, xi: float,
+                      rho: float) -> float:
+    """European call under Heston by Fourier inversion (characteristic function
+    in the "little trap" form of Albrecher et al.)."""
+    from scipy.integrate import quad
+    log_S0, log_K = np.log(S0), np.log(K)
+
+    def characteristic(u):
+        iu = 1j * u
+        beta = kappa - rho * xi * iu
+        d = np.sqrt(beta ** 2 + xi ** 2 * (iu + u ** 2))
+        g = (beta - d) / (beta + d)
+        exp_dT = np.exp(-d * T)
+        C = r * iu * T + kappa * theta / xi ** 2 * ((beta - d) * T - 2.0 * np.log((1.0 - g * exp_dT) / (1.0 - g)))
+        D = (beta - d) / xi ** 2 * (1.0 - exp_dT) / (1.0 - g * exp_dT)
+        return np.exp(C + D * v0 + iu * log_S0)
+
+    forward = S0 * np.exp(r * T)
+
+    def integrand(u, shift):
+        value = characteristic(u - shift * 1j) / (1j * u)
+        if shift:
+            value /= forward
+        return (np.exp(-1j * u * log_K) * value).real
+
+    P1 = 0.5 + quad(integrand, 1e-10, 200.0, args=(1,), limit=400)[0] / np.pi
+    P2 = 0.5 + quad(integrand, 1e-10, 200.0, args=(0,), limit=400)[0] / np.pi
+    return float(S0 * P1 - K * np.exp(-r * T) * P2)
@@ -0,0 +1,122 @@
+"""
+Vectorized Black-Scholes implied volatility for whole option chains.
+
+Every quote is first mapped to its out-of-the-money counterpart by put-call
+parity, so that the solver only sees time value. Each quote is then solved by
+a safeguarded Newton iteration on log-price with a vega step: the root stays
+bracketed, and any Newton step that leaves the bracket (or stalls on a tiny
+vega) is replaced by a bisection step. The iteration starts from the
+Corrado-Miller closed-form approximation. Every quote of the chain is iterated
+simultaneously, only still-active quotes being repriced at each step.
+"""
+from typing import Dict
+
+import numpy as np
+
+from outils import bs_greeks, option_sign
+
+CONVERGED = 0
+MAX_ITERATIONS = 1
+OUT_OF_BOUNDS = 2
+SIGMA_BOUND = 3
+
+
+def _initial_guess(call_price, S, K_discount, T):
+    # Corrado-Miller approximation, Brenner-Subrahmanyam where it breaks down
+    excess = call_price - 0.5 * (S - K_discount)
+    discriminant = excess ** 2 - (S - K_discount) ** 2 / np.pi
+    guess = np.sqrt(2.0 * np.pi) / (S + K_discount) * (excess + np.sqrt(np.maximum(discriminant, 0.0)))
+    guess /= np.sqrt(T)
+    fallback = np.sqrt(2.0 * np.pi / T) * call_price / S
+    return np.where(np.isfinite(guess) & (guess > 0), guess, fallback)
+
+
+def implied_volatility(price, S, K, r, T, option_type="call", tol=1e-10, max_iter=50,
+                       sigma_min=1e-6, sigma_max=10.0) -> Dict[str, np.ndarray]:
+    """Implied volatilities of a chain of option quotes.
+
+    All inputs broadcast together (e.g. strikes of shape (n,) against maturities
+    of shape (m, 1)); option_type is "call"/"put" or an array of +1/-1.
+    `tol` is the relative tolerance on the time value of the option.
+    Returns a dict of arrays with the broadcast shape: "sigma" (NaN where no
+    solution exists), "converged", "iterations" and "status" (CONVERGED,
+    MAX_ITERATIONS, OUT_OF_BOUNDS when the price violates no-arbitrage bounds,
+    or SIGMA_BOUND when the root lies outside [sigma_min, sigma_max]: "sigma"
+    is then the bound it is pinned to).
+    """
+    cp = option_sign(option_type)
+    price, S, K, r, T, cp = np.broadcast_arrays(*(np.asarray(x, dtype=np.float64)
+                                                  for x in (price, S, K, r, T, cp)))
+    shape = price.shape
+    price, S, K, r, T, cp = (x.ravel() for x in (price, S, K, r, T, cp))
+
+    # In-the-money quotes become the out-of-the-money option of the other type
+    K_discount = K * np.exp(-r * T)
+    forward_value = cp * (S - K_discount)
+    in_the_money = forward_value > 0
+    time_value = price - np.maximum(forward_value, 0.0)
+    otm_cp = np.where(in_the_money, -cp, cp)
+    upper = np.where(otm_cp > 0, S, K_discount)
+    valid = (time_value > 0) & (time_value < upper) & (T > 0)
+
+    n = price.size
+    sigma = np.full(n, np.nan)
+    iterations = np.zeros(n, dtype=np.int64)
+    status = np.full(n, OUT_OF_BOUNDS, dtype=np.int64)
+
+    active = np.flatnonzero(valid)
+    lo = np.full(active.size, sigma_min)
+    hi = np.full(active.size, sigma_max)
+    target = time_value[active]
+    log_target = np.log(target)
+    call_price = np.where(otm_cp[active] > 0, target, target + S[active] - K_discount[active])
+
+    # the price is increasing in sigma: a target outside the prices of the two bounds has no root in between
+    bounds = np.concatenate((lo, hi))
+    bound_prices = bs_greeks(np.tile(S[active], 2), np.tile(K[active], 2), np.tile(r[active], 2), bounds,
+                             np.tile(T[active], 2), np.tile(otm_cp[active], 2), ("price",))["price"]
+    below, beyond = bound_prices[:active.size] > target, bound_prices[active.size:] < target
+    pinned = below | beyond
+    sigma[active[pinned]] = np.where(below[pinned], sigma_min, sigma_max)
+    status[active[pinned]] = SIGMA_BOUND
+    keep = ~pinned
+    active, lo, hi, target, log_target, call_price = (x[keep] for x in (active, lo, hi, target, log_target,
+                                                                        call_price))
+    guess = np.clip(_initial_guess(call_price, S[active], K_discount[active], T[active]), sigma_min, sigma_max)
+
+    for iteration in range(1, max_iter + 1):
+        if active.size == 0:
+            break
+        greeks = bs_greeks(S[active], K[active], r[active], guess, T[active], otm_cp[active], ("price", "vega"))
+        model = greeks["price"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            log_diff = np.log(model) - log_target
+        iterations[active] = iteration
+
+        # only the price residual means convergence: the root is bracketed, so the bracket
+        # cannot collapse away from it
+        done = np.abs(log_diff) <= tol
+        sigma[active[done]] = guess[done]
+        status[active[done]] = CONVERGED
+
+        # Keep the root bracketed: the price is increasing in sigma
+        above = model > target
+        hi = np.where(above, guess, hi)
+        lo = np.where(above, lo, guess)
+        # Newton step on log(price), whose derivative is vega / price
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            newton = guess - log_diff * model / greeks["vega"]
+        inside = np.isfinite(newton) & (newton > lo) & (newton < hi)
+        guess = np.where(inside, newton, 0.5 * (lo + hi))
+
+        keep = ~done
+        active, lo, hi, guess, target, log_target = (x[keep] for x in (active, lo, hi, guess, target, log_target))
+
+    sigma[active] = guess
+    status[active] = MAX_ITERATIONS
+    return {
+        "sigma": sigma.reshape(shape),
+        "converged": (status == CONVERGED).reshape(shape),
+        "iterations": iterations.reshape(shape),
+        "status": status.reshape(shape),
+    }
@@ -0,0 +1,171 @@
+"""
+American options by Longstaff-Schwartz least-squares Monte Carlo.
+
+Exercise is allowed on the dates T / num_exercise, 2 T / num_exercise, ..., T.
+The backward induction keeps one discounted cash flow per path. At each date
+it regresses that cash flow on a basis of the in-the-money spots, and
+exercises where the immediate payoff beats the fitted continuation value.
+
+Paths are streamed backwards: by default, the GBM is built from its terminal
+value towards t = 0 with a Brownian bridge, one date at a time. Only the
+current spots are held in memory, never the (paths, dates) matrix. A path
+matrix from the GBM generators (GeneratePathsGBM, AssetPriceSimulator, ...)
+can also be passed and is read column by column.
+
+The in-sample price reuses the paths that fitted the exercise rule, so it is
+slightly biased upwards. When lower_bound_paths is given, the fitted rule is
+applied forward to an independent path set
+(online_pricer.GeneratePathsGBMSteps). That gives an unbiased estimate of a
+feasible strategy, i.e. a lower bound on the price.
+"""
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+from instrumentation import timed
+from online_pricer import GeneratePathsGBMSteps
+from outils import option_sign
+
+BASES = ("polynomial", "laguerre")
+
+
+def basis_functions(x: np.ndarray, basis: str = "laguerre", degree: int = 3) -> np.ndarray:
+    """Regression matrix (len(x), degree + 1) of the moneyness x = S / K.
+
+    "polynomial": 1, x, ..., x^degree.
+    "laguerre": exp(-x / 2) L_k(x) for k = 0..degree (Longstaff-Schwartz).
+    """
+    X = np.empty((len(x), degree + 1))
+    if basis == "polynomial":
+        X[:, 0] = 1.0
+        for k in range(1, degree + 1):
+            np.multiply(X[:, k - 1], x, out=X[:, k])
+    elif basis == "laguerre":
+        # recurrence (k + 1) L_(k+1) = (2k + 1 - x) L_k - k L_(k-1)
+        X[:, 0] = 1.0
+        if degree >= 1:
+            X[:, 1] = 1.0 - x
+        for k in range(1, degree):
+            X[:, k + 1] = ((2 * k + 1 - x) * X[:, k] - k * X[:, k - 1]) / (k + 1)
+        X *= np.exp(-0.5 * x)[:, None]
+    else:
+        raise ValueError(f"unknown basis {basis!r}, expected one of {BASES}")
+    return X
+
+
+def backward_gbm_steps(num_paths: int, num_steps: int, T: float, r: float, sigma: float, S_0: float,
+                       rng=None) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Yield (i, S[:, i]) for i = num_steps, ..., 1 on the uniform grid of
+    [0, T], building the Brownian motion backwards with a Brownian bridge:
+    W_T ~ N(0, T), then W_(t_i) | W_(t_(i+1)) ~ N(W_(t_(i+1)) t_i / t_(i+1), dt t_i / t_(i+1)).
+    """
+    sampler = np.random if rng is None else rng
+    dt = T / num_steps
+    W = np.sqrt(T) * sampler.normal(0.0, 1.0, num_paths)
+    for i in range(num_steps, 0, -1):
+        if i < num_steps:
+            ratio = i / (i + 1)
+            W *= ratio
+            W += np.sqrt(dt * ratio) * sampler.normal(0.0, 1.0, num_paths)
+        yield i, S_0 * np.exp((r - 0.5 * sigma ** 2) * i * dt + sigma * W)
+
+
+def _fit_continuation(S: np.ndarray, payoff: np.ndarray, cash_flow: np.ndarray, K: float, basis: str,
+                      degree: int) -> Optional[np.ndarray]:
+    itm = payoff > 0.0
+    if np.count_nonzero(itm) <= degree + 1:
+        return None
+    X = basis_functions(S[itm] / K, basis, degree)
+    return np.linalg.lstsq(X, cash_flow[itm], rcond=None)[0]
+
+
+@timed("longstaff_schwartz", "pricing")
+def longstaff_schwartz(S0: float, K: float, r: float, sigma: float, T: float, num_paths: int = 100_000,
+                       num_exercise: int = 50, option_type="put", basis: str = "laguerre", degree: int = 3,
+                       lower_bound_paths: Optional[int] = None, paths: Optional[np.ndarray] = None,
+                       rng=None) -> Dict[str, object]:
+    """
+    Price an American option (Bermudan on num_exercise dates) under GBM.
+
+    `paths`, when given, is a (num_paths, num_exercise + 1) matrix on the
+    uniform grid of [0, T] and replaces the streamed Brownian-bridge paths.
+    Returns a dict with price and stderr (in sample), european (discounted
+    terminal payoff on the same paths), the regression coefficients of every
+    exercise date (None when too few paths are in the money), and, with
+    lower_bound_paths, lower_bound and lower_bound_stderr.
+    """
+    if basis not in BASES:
+        raise ValueError(f"unknown basis {basis!r}, expected one of {BASES}")
+    sign = option_sign(option_type)
+    dt = T / num_exercise
+    discount = np.exp(-r * dt)
+    if paths is not None:
+        if paths.shape[1] != num_exercise + 1:
+            raise ValueError(f"paths must have num_exercise + 1 = {num_exercise + 1} columns")
+        steps = ((i, paths[:, i]) for i in range(num_exercise, 0, -1))
+    else:
+        steps = backward_gbm_steps(num_paths, num_exercise, T, r, sigma, S0, rng)
+
+    coefficients = [None] * (num_exercise + 1)
+    cash_flow = None
+    for i, S in steps:
+        payoff = np.maximum(sign * (S - K), 0.0)
+        if cash_flow is None:
+            # maturity: exercise whenever in the money
+            cash_flow = payoff
+            european = payoff.copy()
+            continue
+        cash_flow *= discount
+        beta = _fit_continuation(S, payoff, cash_flow, K, basis, degree)
+        coefficients[i] = beta
+        if beta is None:
+            continue
+        itm = np.flatnonzero(payoff > 0.0)
+        continuation = basis_functions(S[itm] / K, basis, degree) @ beta
+        exercise = itm[payoff[itm] > continuation]
+        cash_flow[exercise] = payoff[exercise]
+
+    # from t_1 to 0; exercising at t = 0 is worth the intrinsic value
+    cash_flow *= discount
+    n = len(cash_flow)
+    price = float(cash_flow.mean())
+    result = {
+        "price": max(price, float(max(sign * (S0 - K), 0.0))),
+        "stderr": float(cash_flow.std(ddof=1) / np.sqrt(n)),
+        "european": float(np.exp(-r * T) * european.mean()),
+        "num_paths": n,
+        "coefficients": coefficients,
+    }
+    if lower_bound_paths:
+        lower = exercise_value(coefficients, S0, K, r, sigma, T, lower_bound_paths, option_type, basis, degree, rng)
+        result["lower_bound"] = float(lower.mean())
+        result["lower_bound_stderr"] = float(lower.std(ddof=1) / np.sqrt(lower_bound_paths))
+    return result
+
+
+def exercise_value(coefficients, S0: float, K: float, r: float, sigma: float, T: float, num_paths: int,
+                   option_type="put", basis: str = "laguerre", degree: int = 3, rng=None) -> np.ndarray:
+    """
+    Discounted value of following the fitted exercise rule on num_paths
+    fresh forward paths (exercise at the first date where the payoff beats
+    the fitted continuation value, or at maturity when in the money).
+    """
+    sign = option_sign(option_type)
+    num_exercise = len(coefficients) - 1
+    value = np.zeros(num_paths)
+    alive = np.ones(num_paths, dtype=bool)
+    for _, t, _, S in GeneratePathsGBMSteps(num_paths, num_exercise, T, r, sigma, S0, MomentMatching=False, rng=rng):
+        i = int(round(t * num_exercise / T))
+        payoff = np.maximum(sign * (S - K), 0.0)
+        candidates = np.flatnonzero(alive & (payoff > 0.0))
+        if i == num_exercise:
+            stop = candidates
+        elif coefficients[i] is None or len(candidates) == 0:
+            continue
+        else:
+            continuation = basis_functions(S[candidates] / K, basis, degree) @ coefficients[i]
+            stop = candidates[payoff[candidates] > continuation]
+        value[stop] = np.exp(-r * t) * payoff[stop]
+        alive[stop] = False
+    return value
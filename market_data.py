@@ -0,0 +1,209 @@
+"""
+Local columnar market-data store.
+
+Daily bars are kept per ticker as one memory-mapped `.npy` file per column
+(date, open, high, low, close, adj_close, volume) plus a small JSON file
+recording the ticker and the date range already covered. Loading maps the
+files without copying them; refreshing only fetches the dates that are not
+covered yet.
+
+A refresh never rewrites the files of a previous load: the new columns go
+to a new version directory (<ticker>/v<N>/) and meta.json is switched to it
+with os.replace. Arrays returned by load() before a refresh stay valid and
+keep showing the old bars; reload to see the new ones. Old versions are
+removed once they can be (immediately on POSIX; on Windows, where a mapped
+file cannot be deleted, at a later refresh).
+
+Data comes from a pluggable Fetcher: YFinanceFetcher downloads from Yahoo
+Finance, CsvFetcher reads local files for tests and offline runs.
+
+Date ranges follow the yfinance convention: `start` included, `end` excluded.
+"""
+import abc
+import json
+import os
+import shutil
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+COLUMNS = ("open", "high", "low", "close", "adj_close", "volume")
+_SOURCE_NAMES = {"Open": "open", "High": "high", "Low": "low", "Close": "close",
+                 "Adj Close": "adj_close", "Volume": "volume"}
+
+
+def _day(date) -> np.datetime64:
+    return np.datetime64(date, "D")
+
+
+def _frame_to_columns(frame, ticker: str) -> Dict[str, np.ndarray]:
+    # yfinance returns (field, ticker) MultiIndex columns, CSV files plain names
+    columns = {"date": frame.index.values.astype("datetime64[D]")}
+    for source, name in _SOURCE_NAMES.items():
+        key = (source, ticker) if (source, ticker) in frame.columns else source
+        if key in frame.columns:
+            columns[name] = frame[key].to_numpy(dtype=np.float64)
+        else:
+            columns[name] = np.full(len(frame), np.nan)
+    return columns
+
+
+class Fetcher(abc.ABC):
+    """Source of daily bars: fetch(ticker, start, end) returns a dict with a
+    "date" datetime64[D] array and one float array per name in COLUMNS."""
+
+    @abc.abstractmethod
+    def fetch(self, ticker: str, start, end) -> Dict[str, np.ndarray]:
+        ...
+
+
+class YFinanceFetcher(Fetcher):
+    """Download bars from Yahoo Finance (yfinance is imported on first use)."""
+
+    def fetch(self, ticker, start, end):
+        import yfinance as yf
+        frame = yf.download(ticker, start=str(_day(start)), end=str(_day(end)), auto_adjust=False,
+                            progress=False)
+        return _frame_to_columns(frame, ticker)
+
+
+class CsvFetcher(Fetcher):
+    """Offline stand-in reading `<directory>/<ticker>.csv` files with a Date
+    column and Open/High/Low/Close/Adj Close/Volume columns."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def fetch(self, ticker, start, end):
+        import pandas as pd
+        frame = pd.read_csv(os.path.join(self.directory, f"{ticker}.csv"), index_col="Date", parse_dates=True)
+        frame = frame[(frame.index >= pd.Timestamp(_day(start))) & (frame.index < pd.Timestamp(_day(end)))]
+        return _frame_to_columns(frame, ticker)
+
+
+class MarketDataStore:
+    """Per-ticker columnar store of daily bars under a root directory."""
+
+    def __init__(self, root: str, fetcher: Optional[Fetcher] = None):
+        self.root = root
+        self.fetcher = fetcher if fetcher is not None else YFinanceFetcher()
+
+    def _directory(self, ticker: str) -> str:
+        return os.path.join(self.root, ticker.replace(os.sep, "_"))
+
+    def _meta(self, ticker: str) -> Optional[Dict]:
+        try:
+            with open(os.path.join(self._directory(ticker), "meta.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _file(self, ticker: str, column: str, version: int) -> str:
+        return os.path.join(self._directory(ticker), f"v{version}", f"{column}.npy")
+
+    def tickers(self) -> List[str]:
+        """Stored tickers, as passed to refresh() (directory names are sanitised)."""
+        if not os.path.isdir(self.root):
+            return []
+        tickers = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name, "meta.json")
+            if os.path.exists(path):
+                with open(path) as f:
+                    tickers.append(json.load(f).get("ticker", name))
+        return sorted(tickers)
+
+    def coverage(self, ticker: str) -> Optional[Tuple[np.datetime64, np.datetime64]]:
+        """Date range [start, end) already stored for ticker, or None."""
+        meta = self._meta(ticker)
+        return None if meta is None else (_day(meta["start"]), _day(meta["end"]))
+
+    def load(self, ticker: str, start=None, end=None) -> Dict[str, np.ndarray]:
+        """Stored bars in [start, end) as read-only memory-mapped column views."""
+        meta = self._meta(ticker)
+        if meta is None:
+            raise FileNotFoundError(f"no data stored for {ticker!r}")
+        columns = {name: np.load(self._file(ticker, name, meta["version"]), mmap_mode="r")
+                   for name in ("date",) + COLUMNS}
+        dates = columns["date"]
+        first = 0 if start is None else int(np.searchsorted(dates, _day(start)))
+        last = len(dates) if end is None else int(np.searchsorted(dates, _day(end)))
+        return {name: values[first:last] for name, values in columns.items()}
+
+    def load_frame(self, ticker: str, start=None, end=None):
+        """Stored bars in [start, end) as a pandas DataFrame indexed by date."""
+        import pandas as pd
+        columns = self.load(ticker, start, end)
+        dates = pd.DatetimeIndex(columns.pop("date"), name="Date")
+        return pd.DataFrame(columns, index=dates, copy=False)
+
+    def load_panel(self, tickers: Sequence[str], column: str = "close", start=None,
+                   end=None) -> Tuple[np.ndarray, np.ndarray]:
+        """One column for several tickers aligned on the union of their dates:
+        returns (dates, values) with values of shape (len(dates), len(tickers)),
+        NaN where a ticker has no bar."""
+        loaded = [self.load(ticker, start, end) for ticker in tickers]
+        dates = np.unique(np.concatenate([data["date"] for data in loaded])) if loaded else \
+            np.array([], dtype="datetime64[D]")
+        values = np.full((len(dates), len(tickers)), np.nan)
+        for j, data in enumerate(loaded):
+            values[np.searchsorted(dates, data["date"]), j] = data[column]
+        return dates, values
+
+    def refresh(self, ticker: str, start, end) -> int:
+        """Make sure [start, end) is stored, fetching only the missing dates.
+        Returns the number of new bars. Arrays already returned by load() are
+        not modified (see the module docstring)."""
+        start, end = _day(start), _day(end)
+        covered = self.coverage(ticker)
+        if covered is None:
+            missing = [(start, end)]
+        else:
+            # Fetched ranges always touch the covered one, so coverage stays contiguous
+            missing = []
+            if start < covered[0]:
+                missing.append((start, covered[0]))
+            if end > covered[1]:
+                missing.append((covered[1], end))
+        if not missing:
+            return 0
+
+        parts = [self.fetcher.fetch(ticker, a, b) for a, b in missing]
+        new_bars = sum(len(part["date"]) for part in parts)
+        if covered is not None:
+            parts.append({name: np.asarray(values) for name, values in self.load(ticker).items()})
+            start, end = min(start, covered[0]), max(end, covered[1])
+        merged = {name: np.concatenate([part[name] for part in parts]) for name in ("date",) + COLUMNS}
+        _, unique = np.unique(merged["date"], return_index=True)
+        self._write(ticker, {name: values[unique] for name, values in merged.items()}, start, end)
+        return new_bars
+
+    def get(self, ticker: str, start, end) -> Dict[str, np.ndarray]:
+        """refresh() then load() the range [start, end)."""
+        self.refresh(ticker, start, end)
+        return self.load(ticker, start, end)
+
+    def _write(self, ticker, columns, start, end):
+        directory = self._directory(ticker)
+        previous = self._meta(ticker)
+        version = 1 if previous is None else previous["version"] + 1
+        # A new version directory: the files mapped by earlier loads are never replaced, which
+        # would fail on Windows and change the data under the readers elsewhere
+        os.makedirs(os.path.join(directory, f"v{version}"), exist_ok=True)
+        for name, values in columns.items():
+            np.save(self._file(ticker, name, version), values)
+        # Switch readers to the new version in one rename, so they never see a partial write
+        tmp = os.path.join(directory, "meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"ticker": ticker, "start": str(start), "end": str(end), "rows": len(columns["date"]),
+                       "version": version}, f)
+        os.replace(tmp, os.path.join(directory, "meta.json"))
+        self._remove_old_versions(ticker, version)
+
+    def _remove_old_versions(self, ticker, version):
+        directory = self._directory(ticker)
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.startswith("v") and name[1:].isdigit() and int(name[1:]) != version:
+                # still mapped on Windows: removed at a later refresh
+                shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,311 @@
+"""
+Adaptive-precision Monte Carlo pricer with control variates.
+
+Paths are simulated in batches until the standard error of the price reaches
+`target_stderr`, the `time_budget` (seconds) is spent or `max_paths` paths
+have been used. After every batch, the number of paths still needed is
+estimated from the current standard error, so the next batch is sized to land
+on the target instead of overshooting it. Every batch is also kept short
+enough to fit in what remains of the time budget.
+
+Control variates have known risk-neutral means:
+    "terminal"  discounted terminal price S_T, mean S0
+    "vanilla"   discounted European payoff, mean outils.call / outils.put
+Their coefficients are the least-squares regression of the payoff on the
+controls. The regression uses running means and co-moments merged batch by
+batch, so memory does not grow with the number of paths.
+
+Greeks (delta, gamma, vega, rho) are estimated from the same paths as the
+price, with one sample per path like the price itself:
+    "pathwise"  derivative of the payoff along the path, for payoffs with a
+                gradient(paths) method (dpayoff/dS_t), gamma by pathwise x
+                likelihood ratio
+    "lr"        likelihood-ratio weights (score of the GBM density), for any
+                payoff; delta and gamma use the score of the first step, so
+                their variance grows on fine time grids
+    "fd"        central finite differences, the bumped paths being rebuilt
+                from the shocks of the base paths (common random numbers)
+"auto" picks pathwise when the payoff has a gradient, likelihood ratio
+otherwise.
+"""
+import time
+from typing import Callable, Dict, Optional, Sequence
+
+import numpy as np
+
+from instrumentation import timed
+from monte_carlo_simu import AssetPriceSimulator
+from outils import call, option_sign, put
+
+CONTROL_VARIATES = ("terminal", "vanilla")
+GREEKS = ("delta", "gamma", "vega", "rho")
+GREEK_METHODS = ("auto", "pathwise", "lr", "fd")
+
+
+class EuropeanPayoff:
+    """European payoff on the last column of the paths, with its gradient."""
+
+    def __init__(self, K: float, option_type="call"):
+        self.K = K
+        self.sign = option_sign(option_type)
+
+    def __call__(self, paths: np.ndarray) -> np.ndarray:
+        return np.maximum(self.sign * (paths[:, -1] - self.K), 0.0)
+
+    def gradient(self, paths: np.ndarray) -> np.ndarray:
+        gradient = np.zeros(paths.shape)
+        gradient[:, -1] = self.sign * (self.sign * (paths[:, -1] - self.K) > 0.0)
+        return gradient
+
+
+def european_payoff(K: float, option_type="call") -> EuropeanPayoff:
+    """Payoff function of a European option for price_monte_carlo."""
+    return EuropeanPayoff(K, option_type)
+
+
+def _shocks(paths: np.ndarray, r: float, sigma: float, dt: float) -> np.ndarray:
+    # standard normal shocks that generated GBM paths
+    Z = np.diff(np.log(paths), axis=1)
+    Z -= (r - 0.5 * sigma ** 2) * dt
+    Z /= sigma * np.sqrt(dt)
+    return Z
+
+
+def _rebuild_paths(Z: np.ndarray, S0: float, r: float, sigma: float, dt: float) -> np.ndarray:
+    paths = np.empty((Z.shape[0], Z.shape[1] + 1))
+    np.multiply(Z, sigma * np.sqrt(dt), out=paths[:, 1:])
+    paths[:, 1:] += (r - 0.5 * sigma ** 2) * dt
+    paths[:, 0] = np.log(S0)
+    np.cumsum(paths, axis=1, out=paths)
+    return np.exp(paths, out=paths)
+
+
+def greek_samples(payoff, paths: np.ndarray, S0: float, r: float, sigma: float, T: float,
+                  greeks: Sequence[str] = GREEKS, method: str = "auto", bump: float = 0.01,
+                  values: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Per-path samples (undiscounted, shape (num_paths, len(greeks))) whose
+    mean times exp(-r T) estimates each Greek of payoff(paths). `values` may
+    carry payoff(paths) when already computed. `bump` is the relative bump of
+    the finite-difference method.
+    """
+    unknown = set(greeks) - set(GREEKS)
+    if unknown:
+        raise ValueError(f"unknown greeks: {sorted(unknown)}")
+    if method not in GREEK_METHODS:
+        raise ValueError(f"unknown method {method!r}, expected one of {GREEK_METHODS}")
+    if method == "auto":
+        method = "pathwise" if hasattr(payoff, "gradient") else "lr"
+    num_steps = paths.shape[1] - 1
+    dt = T / num_steps
+    times = np.linspace(0.0, T, num_steps + 1)
+    if values is None:
+        values = payoff(paths)
+    Z = _shocks(paths, r, sigma, dt)
+    first = Z[:, 0] / (sigma * np.sqrt(dt))  # score of S0, times S0
+    samples = np.empty((paths.shape[0], len(greeks)))
+
+    if method == "fd":
+        def bumped(S0_, r_, sigma_):
+            # discounted at r_, expressed in units of exp(-r T) like the other samples
+            return payoff(_rebuild_paths(Z, S0_, r_, sigma_, dt)) * np.exp(-(r_ - r) * T)
+        bumps = {"S0": bump * S0, "sigma": bump * sigma, "r": bump * max(abs(r), 0.01)}
+        if "delta" in greeks or "gamma" in greeks:
+            up, down = bumped(S0 + bumps["S0"], r, sigma), bumped(S0 - bumps["S0"], r, sigma)
+        for j, name in enumerate(greeks):
+            if name == "delta":
+                samples[:, j] = (up - down) / (2 * bumps["S0"])
+            elif name == "gamma":
+                samples[:, j] = (up - 2 * values + down) / bumps["S0"] ** 2
+            elif name == "vega":
+                samples[:, j] = (bumped(S0, r, sigma + bumps["sigma"]) -
+                                 bumped(S0, r, sigma - bumps["sigma"])) / (2 * bumps["sigma"])
+            else:
+                samples[:, j] = (bumped(S0, r + bumps["r"], sigma) - bumped(S0, r - bumps["r"], sigma)) / \
+                    (2 * bumps["r"])
+        return samples
+
+    if method == "pathwise":
+        # dpayoff/dS_t * S_t, then dS_t/dtheta = S_t * (d log S_t / dtheta)
+        weighted = payoff.gradient(paths) * paths
+        path_delta = weighted.sum(axis=1) / S0
+    for j, name in enumerate(greeks):
+        if method == "pathwise":
+            if name == "delta":
+                samples[:, j] = path_delta
+            elif name == "gamma":
+                samples[:, j] = path_delta * (first - 1.0) / S0
+            elif name == "vega":
+                log_sensitivity = (np.log(paths / S0) - (r + 0.5 * sigma ** 2) * times) / sigma
+                samples[:, j] = np.einsum("ij,ij->i", weighted, log_sensitivity)
+            else:
+                samples[:, j] = weighted @ times - T * values
+        else:
+            if name == "delta":
+                samples[:, j] = values * first / S0
+            elif name == "gamma":
+                samples[:, j] = values * (first ** 2 - first - 1.0 / (sigma ** 2 * dt)) / S0 ** 2
+            elif name == "vega":
+                samples[:, j] = values * ((Z ** 2 - 1.0) / sigma - Z * np.sqrt(dt)).sum(axis=1)
+            else:
+                samples[:, j] = values * (Z.sum(axis=1) * np.sqrt(dt) / sigma - T)
+    return samples
+
+
+class _JointMoments:
+    """Running mean and co-moment matrix of the columns of (n, d) samples,
+    merged batch by batch (Chan et al. parallel update)."""
+
+    def __init__(self, dimension: int):
+        self.count = 0
+        self.mean = np.zeros(dimension)
+        self.comoment = np.zeros((dimension, dimension))
+
+    def update(self, samples: np.ndarray) -> None:
+        n = samples.shape[0]
+        if n == 0:
+            return
+        batch_mean = samples.mean(axis=0)
+        centred = samples - batch_mean
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.comoment += centred.T @ centred + np.outer(delta, delta) * (self.count * n / total)
+        self.mean += delta * (n / total)
+        self.count = total
+
+
+def _control_estimate(moments: _JointMoments, control_means: np.ndarray, k: int):
+    # column 0 is the discounted payoff, columns 1..k the controls
+    n = moments.count
+    var_y = moments.comoment[0, 0]
+    if k == 0:
+        return moments.mean[0], np.sqrt(var_y / (n - 1) / n), np.zeros(0)
+    cov_xx = moments.comoment[1:k + 1, 1:k + 1]
+    cov_xy = moments.comoment[1:k + 1, 0]
+    beta = np.linalg.lstsq(cov_xx, cov_xy, rcond=None)[0]
+    price = moments.mean[0] - beta @ (moments.mean[1:k + 1] - control_means)
+    residual = max(var_y - beta @ cov_xy, 0.0)
+    dof = max(n - 1 - k, 1)
+    return price, np.sqrt(residual / dof / n), beta
+
+
+@timed("price_monte_carlo", "pricing")
+def price_monte_carlo(payoff: Callable[[np.ndarray], np.ndarray], S0: float, r: float, sigma: float, T: float,
+                      num_steps: int = 1, target_stderr: Optional[float] = None,
+                      time_budget: Optional[float] = None, max_paths: int = 10_000_000,
+                      control_variates: Sequence[str] = CONTROL_VARIATES, control_strike: Optional[float] = None,
+                      control_type="call", min_batch: int = 2_000, max_batch: int = 200_000,
+                      greeks: Sequence[str] = (), greek_method: str = "auto", bump: float = 0.01,
+                      rng=None) -> Dict[str, object]:
+    """
+    Risk-neutral Monte Carlo price of payoff(paths), paths being GBM
+    trajectories of shape (batch, num_steps + 1) from AssetPriceSimulator.
+
+    Stops at the first of: stderr <= target_stderr, time_budget seconds
+    elapsed, max_paths used. The vanilla control variate is a European
+    `control_type` option struck at `control_strike` (S0 by default). `rng` is
+    a np.random.Generator; the standard error assumes independent paths.
+
+    Returns a dict with price, stderr, num_paths, num_batches, elapsed
+    (seconds), converged (target reached), stopped (the limit that ended the
+    run: "target_stderr", "time_budget" or "max_paths") and the
+    control-variate coefficients (beta). With `greeks` (a subset of GREEKS), "greeks" and
+    "greek_stderr" hold their estimates from the same paths (see
+    greek_samples); the stopping rule only looks at the price.
+    """
+    unknown = set(control_variates) - set(CONTROL_VARIATES)
+    if unknown:
+        raise ValueError(f"unknown control variates: {sorted(unknown)}")
+    unknown = set(greeks) - set(GREEKS)
+    if unknown:
+        raise ValueError(f"unknown greeks: {sorted(unknown)}")
+    if target_stderr is None and time_budget is None and max_paths is None:
+        raise ValueError("give at least one of target_stderr, time_budget or max_paths")
+    max_paths = np.inf if max_paths is None else max_paths
+    min_batch = max(min_batch, len(control_variates) + 2)
+    rng = np.random.default_rng() if rng is None else rng
+
+    simulator = AssetPriceSimulator(S0, r, sigma, T, num_steps)
+    discount = np.exp(-r * T)
+    if control_strike is None:
+        control_strike = S0
+    control_sign = option_sign(control_type)
+    control_means = []
+    for name in control_variates:
+        if name == "terminal":
+            control_means.append(S0)
+        else:
+            pricer = call if control_sign > 0 else put
+            control_means.append(float(pricer(S0, control_strike, r, sigma, T)))
+    control_means = np.array(control_means)
+
+    num_controls = len(control_variates)
+    moments = _JointMoments(1 + num_controls + len(greeks))
+    price, stderr, beta = np.nan, np.inf, np.zeros(len(control_variates))
+    start = time.perf_counter()
+    seconds_per_path = None
+    batch = min_batch
+    num_batches = 0
+    stopped = "max_paths"
+    while True:
+        batch = int(min(batch, max_paths - moments.count))
+        if batch <= 0:
+            break
+        batch_start = time.perf_counter()
+        paths = simulator.generate_trajectories(batch, rng=rng)
+        samples = np.empty((batch, 1 + num_controls + len(greeks)))
+        samples[:, 0] = payoff(paths)
+        if greeks:
+            samples[:, 1 + num_controls:] = greek_samples(payoff, paths, S0, r, sigma, T, greeks, greek_method,
+                                                          bump, samples[:, 0])
+        for j, name in enumerate(control_variates, start=1):
+            terminal = paths[:, -1]
+            samples[:, j] = terminal if name == "terminal" else \
+                np.maximum(control_sign * (terminal - control_strike), 0.0)
+        samples *= discount
+        del paths
+        moments.update(samples)
+        num_batches += 1
+        now = time.perf_counter()
+        seconds_per_path = (now - batch_start) / batch
+
+        price, stderr, beta = _control_estimate(moments, control_means, num_controls)
+        if target_stderr is not None and stderr <= target_stderr:
+            stopped = "target_stderr"
+            break
+        remaining_time = None if time_budget is None else time_budget - (now - start)
+        if remaining_time is not None and remaining_time <= 0:
+            stopped = "time_budget"
+            break
+
+        # size the next batch: paths still needed for the target (stderr ~ 1/sqrt(n)),
+        # within [min_batch, max_batch] and within the remaining time
+        if target_stderr is not None and np.isfinite(stderr):
+            needed = moments.count * (stderr / target_stderr) ** 2
+            batch = int(np.ceil(1.02 * needed)) - moments.count
+        else:
+            batch = max_batch
+        batch = min(max(batch, min_batch), max_batch)
+        if remaining_time is not None:
+            affordable = int(remaining_time / seconds_per_path)
+            if affordable < min_batch // 4:
+                stopped = "time_budget"
+                break
+            batch = min(batch, affordable)
+
+    result = {
+        "price": float(price),
+        "stderr": float(stderr),
+        "num_paths": moments.count,
+        "num_batches": num_batches,
+        "elapsed": time.perf_counter() - start,
+        "converged": bool(target_stderr is not None and stderr <= target_stderr),
+        "stopped": stopped,
+        "beta": dict(zip(control_variates, beta.tolist())),
+    }
+    if greeks:
+        columns = slice(1 + num_controls, None)
+        variance = np.diagonal(moments.comoment)[columns] / max(moments.count - 1, 1)
+        result["greeks"] = dict(zip(greeks, moments.mean[columns].tolist()))
+        result["greek_stderr"] = dict(zip(greeks, np.sqrt(variance / moments.count).tolist()))
+    return result
@@ -1,6 +1,7 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from typing import List
+from typing import Iterable, Iterator, List, Optional, Sequence, Union
+
+from instrumentation import count, timed
 
 
 class AssetPriceSimulator:
@@ -54,7 +55,63 @@ class AssetPriceSimulator:
         Generate multiple price trajectories.
         # (FR) Générer plusieurs trajectoires de prix.
         """
-        return [self.generate_single_trajectory() for _ in range(num_trajectories)]
+        return self.generate_trajectories(num_trajectories).tolist()
+
+    @timed("AssetPriceSimulator.generate_trajectories", "paths")
+    def generate_trajectories(self, num_trajectories: int, dtype=np.float64,
+                              out: Optional[np.ndarray] = None,
+                              rng: Optional[np.random.Generator] = None) -> np.ndarray:
+        """
+        Generate all trajectories at once as a (num_trajectories, num_steps + 1) array.
+        Shocks are drawn in a single block, log-returns are accumulated with one
+        cumulative sum and the result is exponentiated once. Pass dtype=np.float32
+        to halve memory, or `out` to reuse a preallocated buffer. Shocks come from
+        `rng` when given (a np.random.Generator, or a quasi_monte_carlo.SobolGenerator
+        for quasi-random paths), otherwise from the global np.random state.
+        # (FR) Générer toutes les trajectoires d'un coup sous forme de tableau
+        # (num_trajectories, num_steps + 1) : tirage des chocs en bloc, cumul des
+        # log-rendements puis une seule exponentielle.
+        """
+        shape = (num_trajectories, self.num_steps + 1)
+        if out is None:
+            out = np.empty(shape, dtype=dtype)
+            count("bytes_allocated", out.nbytes)
+        elif out.shape != shape:
+            raise ValueError(f"out must have shape {shape}, got {out.shape}")
+        count("paths_generated", num_trajectories)
+
+        # Log-returns: drift + diffusion * shock, computed in place in the buffer
+        # (FR) Log-rendements : drift + diffusion * choc, calculés en place dans le buffer
+        drift = (self.mu - 0.5 * self.sigma ** 2) * self.dt
+        diffusion = self.sigma * np.sqrt(self.dt)
+        increments = out[:, 1:]
+        if rng is None:
+            increments[...] = np.random.standard_normal((num_trajectories, self.num_steps))
+        else:
+            increments[...] = rng.standard_normal((num_trajectories, self.num_steps), dtype=out.dtype)
+        increments *= diffusion
+        increments += drift
+
+        # Accumulate from log(S0) and exponentiate once
+        # (FR) Cumul à partir de log(S0) puis une seule exponentielle
+        out[:, 0] = np.log(self.initial_price)
+        np.cumsum(out, axis=1, out=out)
+        np.exp(out, out=out)
+        out[:, 0] = self.initial_price
+        return out
+
+    def iter_trajectory_chunks(self, num_trajectories: int, chunk_size: int, dtype=np.float64,
+                               rng: Optional[np.random.Generator] = None) -> Iterator[np.ndarray]:
+        """
+        Yield the trajectories in blocks of at most chunk_size rows, so that peak
+        memory depends on the chunk size and not on the total number of paths.
+        # (FR) Produire les trajectoires par blocs d'au plus chunk_size lignes : la
+        # (FR) mémoire dépend de la taille du bloc et non du nombre total de trajectoires.
+        """
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        for start in range(0, num_trajectories, chunk_size):
+            yield self.generate_trajectories(min(chunk_size, num_trajectories - start), dtype=dtype, rng=rng)
 
 
 class TrajectoryAnalyzer:
@@ -64,13 +121,217 @@ class TrajectoryAnalyzer:
     """
 
     @staticmethod
-    def compute_mean_trajectory(trajectories: List[List[float]]) -> List[float]:
+    def compute_mean_trajectory(
+            trajectories: Union[np.ndarray, List[List[float]]]) -> Union[np.ndarray, List[float]]:
         """
         Compute the average trajectory across all simulations.
+        Arrays are reduced directly and an array is returned; lists give a list.
         # (FR) Calculer la trajectoire moyenne parmi toutes les simulations.
+        # (FR) Un tableau est réduit directement et renvoie un tableau ; une liste renvoie une liste.
         """
+        if isinstance(trajectories, np.ndarray):
+            return trajectories.mean(axis=0)
         return list(np.mean(trajectories, axis=0))
 
+    @staticmethod
+    def accumulate(chunks: Iterable[np.ndarray], relative_accuracy: float = 0.005) -> "TrajectoryAccumulator":
+        """
+        Merge trajectory blocks into a TrajectoryAccumulator as they arrive.
+        # (FR) Fusionner les blocs de trajectoires dans un accumulateur au fil de l'eau.
+        """
+        accumulator = TrajectoryAccumulator(relative_accuracy)
+        for chunk in chunks:
+            accumulator.update(chunk)
+        return accumulator
+
+
+class _LogBucketStore:
+    """
+    Per-column counts over logarithmic buckets sharing one key range.
+    # (FR) Comptages par colonne sur des seaux logarithmiques partageant les mêmes clés.
+    """
+
+    def __init__(self, num_columns: int, max_buckets: int):
+        self.num_columns = num_columns
+        self.max_buckets = max_buckets
+        self.offset = 0
+        self.counts = np.zeros((num_columns, 0), dtype=np.int64)
+
+    def _extend(self, key_min: int, key_max: int) -> None:
+        width = self.counts.shape[1]
+        if width:
+            key_min = min(key_min, self.offset)
+            key_max = max(key_max, self.offset + width - 1)
+        # Collapse the lowest keys when the range is too wide (DDSketch-style)
+        # (FR) Regrouper les plus petites clés si la plage devient trop large
+        key_min = max(key_min, key_max - self.max_buckets + 1)
+        if width and key_min == self.offset and key_max == self.offset + width - 1:
+            return
+        counts = np.zeros((self.num_columns, key_max - key_min + 1), dtype=np.int64)
+        if width:
+            old_keys = np.clip(np.arange(self.offset, self.offset + width), key_min, None) - key_min
+            np.add.at(counts, (slice(None), old_keys), self.counts)
+        self.offset = key_min
+        self.counts = counts
+
+    def add(self, keys: np.ndarray, columns: np.ndarray) -> None:
+        if keys.size == 0:
+            return
+        self._extend(int(keys.min()), int(keys.max()))
+        width = self.counts.shape[1]
+        index = columns * width + (np.maximum(keys, self.offset) - self.offset)
+        self.counts += np.bincount(index, minlength=self.num_columns * width).reshape(self.num_columns, width)
+
+    def merge(self, other: "_LogBucketStore") -> None:
+        width = other.counts.shape[1]
+        if not width:
+            return
+        keys = np.arange(other.offset, other.offset + width)
+        self._extend(int(keys[0]), int(keys[-1]))
+        np.add.at(self.counts, (slice(None), np.maximum(keys, self.offset) - self.offset), other.counts)
+
+    def keys(self) -> np.ndarray:
+        return np.arange(self.offset, self.offset + self.counts.shape[1])
+
+
+class QuantileSketch:
+    """
+    Mergeable per-column quantile sketch with relative accuracy guarantees
+    (logarithmic buckets, as in DDSketch). Updates are linear in the block size.
+    # (FR) Esquisse de quantiles par colonne, fusionnable, à précision relative garantie.
+    """
+
+    def __init__(self, num_columns: int, relative_accuracy: float = 0.005, max_buckets: int = 4096):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be in (0, 1)")
+        self.num_columns = num_columns
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = np.log(self.gamma)
+        self._min_indexable = np.finfo(np.float64).tiny * self.gamma
+        self.positive = _LogBucketStore(num_columns, max_buckets)
+        self.negative = _LogBucketStore(num_columns, max_buckets)
+        self.zeros = np.zeros(num_columns, dtype=np.int64)
+
+    def _keys(self, magnitudes: np.ndarray) -> np.ndarray:
+        return np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64)
+
+    def update(self, block: np.ndarray) -> None:
+        block = np.asarray(block, dtype=np.float64)
+        columns = np.broadcast_to(np.arange(self.num_columns), block.shape)
+        if np.all(block > self._min_indexable):
+            # Fast path for prices: everything goes to the positive store
+            # (FR) Cas rapide des prix : tout va dans les seaux positifs
+            self.positive.add(self._keys(block).ravel(), columns.ravel())
+            return
+        positive = block > self._min_indexable
+        negative = block < -self._min_indexable
+        self.positive.add(self._keys(block[positive]), columns[positive])
+        self.negative.add(self._keys(-block[negative]), columns[negative])
+        self.zeros += block.shape[0] - positive.sum(axis=0) - negative.sum(axis=0)
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if other.gamma != self.gamma or other.num_columns != self.num_columns:
+            raise ValueError("can only merge sketches with the same accuracy and number of columns")
+        self.positive.merge(other.positive)
+        self.negative.merge(other.negative)
+        self.zeros += other.zeros
+
+    def _bucket_value(self, keys: np.ndarray) -> np.ndarray:
+        return 2.0 * np.power(self.gamma, keys.astype(np.float64)) / (self.gamma + 1.0)
+
+    def quantiles(self, qs: Sequence[float]) -> np.ndarray:
+        """Return an array of shape (len(qs), num_columns)."""
+        # Buckets ordered from the most negative value to the largest positive one
+        values = np.concatenate((-self._bucket_value(self.negative.keys())[::-1], [0.0],
+                                 self._bucket_value(self.positive.keys())))
+        counts = np.concatenate((self.negative.counts[:, ::-1], self.zeros[:, None], self.positive.counts),
+                                axis=1)
+        cumulative = np.cumsum(counts, axis=1)
+        total = cumulative[:, -1]
+        result = np.empty((len(qs), self.num_columns))
+        for i, q in enumerate(qs):
+            rank = np.floor(q * (total - 1))
+            result[i] = values[(cumulative <= rank[:, None]).sum(axis=1)]
+        return result
+
+
+class TrajectoryAccumulator:
+    """
+    Online per-time-step statistics merged block by block: count, mean and
+    variance (Welford/Chan parallel update), min/max and approximate quantiles.
+    Memory depends on the number of time steps, not on the number of paths.
+    # (FR) Statistiques par pas de temps mises à jour bloc par bloc : moyenne et
+    # (FR) variance (mise à jour de Welford/Chan), min/max et quantiles approchés.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.005):
+        self.relative_accuracy = relative_accuracy
+        self.count = 0
+        self.mean: Optional[np.ndarray] = None
+        self.m2: Optional[np.ndarray] = None
+        self.min: Optional[np.ndarray] = None
+        self.max: Optional[np.ndarray] = None
+        self.sketch: Optional[QuantileSketch] = None
+
+    def _merge_moments(self, count: int, mean: np.ndarray, m2: np.ndarray,
+                       minimum: np.ndarray, maximum: np.ndarray) -> None:
+        if self.count == 0:
+            self.count, self.mean, self.m2 = count, mean.copy(), m2.copy()
+            self.min, self.max = minimum.copy(), maximum.copy()
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * (count / total)
+        self.m2 += m2 + delta ** 2 * (self.count * count / total)
+        np.minimum(self.min, minimum, out=self.min)
+        np.maximum(self.max, maximum, out=self.max)
+        self.count = total
+
+    def update(self, block: np.ndarray) -> "TrajectoryAccumulator":
+        """
+        Add a (num_paths, num_steps + 1) block of trajectories.
+        # (FR) Ajouter un bloc de trajectoires (num_paths, num_steps + 1).
+        """
+        block = np.asarray(block, dtype=np.float64)
+        if block.ndim != 2 or block.shape[0] == 0:
+            raise ValueError("block must be a non-empty 2D array")
+        if self.sketch is None:
+            self.sketch = QuantileSketch(block.shape[1], self.relative_accuracy)
+        mean = block.mean(axis=0)
+        m2 = ((block - mean) ** 2).sum(axis=0)
+        self._merge_moments(block.shape[0], mean, m2, block.min(axis=0), block.max(axis=0))
+        self.sketch.update(block)
+        return self
+
+    def merge(self, other: "TrajectoryAccumulator") -> "TrajectoryAccumulator":
+        """
+        Merge another accumulator (e.g. computed on another worker) into this one.
+        # (FR) Fusionner un autre accumulateur dans celui-ci.
+        """
+        if other.count == 0:
+            return self
+        if self.sketch is None:
+            self.sketch = QuantileSketch(other.sketch.num_columns, other.relative_accuracy)
+            self.relative_accuracy = other.relative_accuracy
+        self._merge_moments(other.count, other.mean, other.m2, other.min, other.max)
+        self.sketch.merge(other.sketch)
+        return self
+
+    def variance(self, ddof: int = 0) -> np.ndarray:
+        return self.m2 / (self.count - ddof)
+
+    def std(self, ddof: int = 0) -> np.ndarray:
+        return np.sqrt(self.variance(ddof))
+
+    def quantiles(self, qs: Sequence[float]) -> np.ndarray:
+        """
+        Approximate quantiles, shape (len(qs), num_steps + 1), within the
+        relative accuracy of the exact order statistics.
+        # (FR) Quantiles approchés, à la précision relative près.
+        """
+        return self.sketch.quantiles(qs)
+
 
 class TrajectoryPlotter:
     """
@@ -79,34 +340,52 @@ class TrajectoryPlotter:
     """
 
     @staticmethod
-    def plot_trajectories(time_grid: np.ndarray, trajectories: List[List[float]], mean_trajectory: List[float]) -> None:
+    @timed("TrajectoryPlotter.plot_trajectories", "plot")
+    def plot_trajectories(time_grid: np.ndarray, trajectories: Union[np.ndarray, List[List[float]]],
+                          mean_trajectory: Union[np.ndarray, List[float]], mode: str = "collection",
+                          max_paths: Optional[int] = 500, output: Optional[str] = None,
+                          rng: Optional[np.random.Generator] = None) -> None:
         """
-        Plot all trajectories and the mean trajectory.
-        # (FR) Tracer toutes les trajectoires ainsi que la trajectoire moyenne.
+        Plot the trajectories and the mean trajectory.
+        mode="collection" draws at most max_paths randomly chosen trajectories as a
+        single LineCollection, mode="fan" draws quantile bands instead (trajectories
+        may then be a TrajectoryAccumulator), mode="lines" draws every trajectory.
+        With `output` (e.g. "paths.png" or "paths.svg") the figure is rendered off
+        screen to that file instead of being shown.
+        # (FR) Tracer les trajectoires ainsi que la trajectoire moyenne.
+        # (FR) "collection" : au plus max_paths trajectoires tirées au hasard en un seul
+        # (FR) LineCollection ; "fan" : bandes de quantiles ; "lines" : toutes les trajectoires.
+        # (FR) Avec `output`, la figure est écrite dans ce fichier sans affichage.
         """
-        for traj in trajectories:
-            plt.plot(time_grid, traj, alpha=0.2, color='gray')  # light gray for individual paths
-            # (FR) gris clair pour les trajectoires individuelles
-        plt.plot(time_grid, mean_trajectory, color='red', label='Mean Trajectory')
+        from plotting import add_paths, new_figure, show_or_save
+
+        figure = new_figure(output)
+        ax = figure.add_subplot()
+        if mode != "fan":
+            trajectories = np.asarray(trajectories)
+        add_paths(ax, time_grid, trajectories, mode, max_paths, rng)  # light gray for individual paths
+        # (FR) gris clair pour les trajectoires individuelles
+        ax.plot(time_grid, mean_trajectory, color='red', label='Mean Trajectory')
         # (FR) en rouge : la trajectoire moyenne
-        plt.title('Asset Price Simulation (Monte Carlo with Constant Volatility)')
+        ax.set_title('Asset Price Simulation (Monte Carlo with Constant Volatility)')
         # (FR) Simulation du prix d’un actif (Monte Carlo avec volatilité constante)
-        plt.xlabel('Time')
-        plt.ylabel('Asset Price')
-        plt.grid(True)
-        plt.legend()
-        plt.show()
+        ax.set_xlabel('Time')
+        ax.set_ylabel('Asset Price')
+        ax.grid(True)
+        ax.legend()
+        show_or_save(figure, output)
 
 
-def main():
-    # Simulation parameters
-    # (FR) Paramètres de simulation
+def main(num_trajectories: int = 50, num_steps: int = 100, output: Optional[str] = None,
+         store: Optional[str] = None, seed: Optional[int] = None):
+    # Simulation parameters (sizes can be set from cli.py; output renders the plot to a file;
+    # store: path_store directory where identical runs find their paths, needs a seed)
+    # (FR) Paramètres de simulation (tailles réglables depuis cli.py ; output : rendu dans un fichier ;
+    # store : répertoire path_store où une même simulation est relue au lieu d'être recalculée, avec seed)
     initial_price = 50.0
     mu = 0.05
     sigma = 0.5
     total_time = 1.0
-    num_steps = 100
-    num_trajectories = 50
 
     # Create simulator object
     # (FR) Créer un objet simulateur
@@ -114,7 +393,13 @@ def main():
 
     # Generate asset price trajectories
     # (FR) Générer les trajectoires du prix de l’actif
-    trajectories = simulator.generate_multiple_trajectories(num_trajectories)
+    if store is None:
+        trajectories = simulator.generate_trajectories(num_trajectories)
+    else:
+        from path_store import PathStore
+        trajectories = PathStore(store).get_or_simulate(
+            "gbm", num_trajectories, num_steps, seed=seed, initial_price=initial_price, mu=mu, sigma=sigma,
+            total_time=total_time).prices()
 
     # Compute average trajectory
     # (FR) Calculer la trajectoire moyenne
@@ -122,7 +407,7 @@ def main():
 
     # Plot the results
     # (FR) Afficher les résultats
-    TrajectoryPlotter.plot_trajectories(simulator.time_grid, trajectories, mean_trajectory)
+    TrajectoryPlotter.plot_trajectories(simulator.time_grid, trajectories, mean_trajectory, output=output)
 
 
 if __name__ == '__main__':
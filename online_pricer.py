@@ -1,9 +1,12 @@
+import os
 import numpy as np
-import matplotlib.pyplot as plt
-import scipy.stats as stats
 import enum
 
-import seaborn as sns
+from hedging_engine import EveryKSteps, HedgeConfig, run_backtest
+from heston import HestonSimulator
+from instrumentation import count, span, timed
+from outils import ndtr
+from plotting import new_figure, show_or_save
 
 
 class OptionType(enum.Enum):
@@ -11,37 +14,100 @@ class OptionType(enum.Enum):
     PUT = -1.0
 
 
-def GeneratePathsGBM(NoOfPaths, NoOfSteps, T, r, sigma, S_0):
-    Z = np.random.normal(0.0, 1.0, [NoOfPaths, NoOfSteps])
-    X = np.zeros([NoOfPaths, NoOfSteps + 1])
-    W = np.zeros([NoOfPaths, NoOfSteps + 1])
-    time = np.zeros([NoOfSteps + 1])
-    X[:, 0] = np.log(S_0)
+@timed("GeneratePathsGBM", "paths")
+def GeneratePathsGBM(NoOfPaths, NoOfSteps, T, r, sigma, S_0, MomentMatching=True, Antithetic=False, rng=None):
+    # log-paths are built with a single cumulative sum and exponentiated once,
+    # in place in one (NoOfPaths, NoOfSteps + 1) buffer; shocks come from rng
+    # (a np.random.Generator, or a quasi_monte_carlo.SobolGenerator for Sobol
+    # paths) when given, otherwise from the global np.random state
+    sampler = np.random if rng is None else rng
     dt = T / float(NoOfSteps)
-    for i in range(0, NoOfSteps):
-        if NoOfPaths > 1:
-            Z[:, i] = (Z[:, i] - np.mean(Z[:, i])) / np.std(Z[:, i])
-        W[:, i + 1] = W[:, i] + np.power(dt, 0.5) * Z[:, i]
-        X[:, i + 1] = X[:, i] + (r - 0.5 * sigma * sigma) * dt + sigma * (W[:, i + 1] - W[:, i])
-        time[i + 1] = time[i] + dt
-        S = np.exp(X)
+    time = np.linspace(0.0, T, NoOfSteps + 1)
+    X = np.empty([NoOfPaths, NoOfSteps + 1])
+    count("paths_generated", NoOfPaths)
+    count("bytes_allocated", X.nbytes)
+    Z = X[:, 1:]
+    if Antithetic:
+        # pair each draw with its mirror image -Z
+        half = (NoOfPaths + 1) // 2
+        Z[:half] = sampler.normal(0.0, 1.0, [half, NoOfSteps])
+        np.negative(Z[:NoOfPaths - half], out=Z[half:])
+    else:
+        Z[...] = sampler.normal(0.0, 1.0, [NoOfPaths, NoOfSteps])
+    if MomentMatching and NoOfPaths > 1:
+        # per-step moment matching: zero mean and unit variance across paths
+        Z -= np.mean(Z, axis=0)
+        Z /= np.std(Z, axis=0)
+    Z *= sigma * np.power(dt, 0.5)
+    Z += (r - 0.5 * sigma * sigma) * dt
+    X[:, 0] = np.log(S_0)
+    np.cumsum(X, axis=1, out=X)
+    S = np.exp(X, out=X)
+    S[:, 0] = S_0
     paths = {"time": time, "S": S}
     return paths
 
 
+def GeneratePathsGBMChunks(NoOfPaths, NoOfSteps, T, r, sigma, S_0, ChunkSize, MomentMatching=True,
+                           Antithetic=False, rng=None):
+    # yields {"time", "S"} blocks of at most ChunkSize paths so that peak memory
+    # depends on ChunkSize only; moment matching is applied within each block
+    if ChunkSize <= 0:
+        raise ValueError("ChunkSize must be positive")
+    for start in range(0, NoOfPaths, ChunkSize):
+        yield GeneratePathsGBM(min(ChunkSize, NoOfPaths - start), NoOfSteps, T, r, sigma, S_0,
+                               MomentMatching, Antithetic, rng)
+
+
+def GeneratePathsGBMSteps(NoOfPaths, NoOfSteps, T, r, sigma, S_0, MomentMatching=True, Antithetic=False, rng=None):
+    # yields (time[i-1], time[i], S[:, i-1], S[:, i]) one step at a time, keeping
+    # only the current prices in memory (O(NoOfPaths)); meant for the streaming
+    # payoffs of payoffs.py. The yielded arrays must not be modified.
+    sampler = np.random if rng is None else rng
+    dt = T / float(NoOfSteps)
+    time = np.linspace(0.0, T, NoOfSteps + 1)
+    half = (NoOfPaths + 1) // 2
+    S_prev = np.full(NoOfPaths, float(S_0))
+    count("paths_generated", NoOfPaths)
+    for i in range(1, NoOfSteps + 1):
+        # a generator cannot be @timed: one span per step, closed before the consumer runs
+        with span("GeneratePathsGBMSteps", "paths"):
+            if Antithetic:
+                Z = np.empty(NoOfPaths)
+                Z[:half] = sampler.normal(0.0, 1.0, half)
+                np.negative(Z[:NoOfPaths - half], out=Z[half:])
+            else:
+                Z = sampler.normal(0.0, 1.0, NoOfPaths)
+            if MomentMatching and NoOfPaths > 1:
+                Z = (Z - np.mean(Z)) / np.std(Z)
+            S = S_prev * np.exp((r - 0.5 * sigma * sigma) * dt + sigma * np.power(dt, 0.5) * Z)
+        yield time[i - 1], time[i], S_prev, S
+        S_prev = S
+
+
+def GeneratePathsHeston(NoOfPaths, NoOfSteps, T, r, S_0, v0, kappa, theta, xi, rho, rng=None):
+    # risk-neutral Heston paths (QE scheme, see heston.py) in the same
+    # {"time", "S"} format as GeneratePathsGBM, plus the variance paths "V"
+    simulator = HestonSimulator(S_0, r, v0, kappa, theta, xi, rho, T, NoOfSteps)
+    S, V = simulator.generate_trajectories(NoOfPaths, rng=rng, return_variance=True)
+    return {"time": simulator.time_grid, "S": S, "V": V}
+
+
 # Black-Scholes Call option price
+@timed("BS_Call_Put_Option_Price", "pricing")
 def BS_Call_Put_Option_Price(CP, S_0, K, sigma, t, T, r):
     K = np.array(K).reshape([len(K), 1])
     d1 = (np.log(S_0 / K) + (r + 0.5 * np.power(sigma, 2.0))
           * (T - t)) / (sigma * np.sqrt(T - t))
     d2 = d1 - sigma * np.sqrt(T - t)
     if CP == OptionType.CALL:
-        value = stats.norm.cdf(d1) * S_0 - stats.norm.cdf(d2) * K * np.exp(-r * (T - t))
+        value = ndtr(d1) * S_0 - ndtr(d2) * K * np.exp(-r * (T - t))
     elif CP == OptionType.PUT:
-        value = stats.norm.cdf(-d2) * K * np.exp(-r * (T - t)) - stats.norm.cdf(-d1) * S_0
+        value = ndtr(-d2) * K * np.exp(-r * (T - t)) - ndtr(-d1) * S_0
     return value
 
 
+@timed("BS_Delta", "pricing")
 def BS_Delta(CP, S_0, K, sigma, t, T, r):
     # when defining a time-grid it may happen that the last grid point
     # is slightly after the maturity
@@ -51,60 +117,62 @@ def BS_Delta(CP, S_0, K, sigma, t, T, r):
     d1 = (np.log(S_0 / K) + (r + 0.5 * np.power(sigma, 2.0)) * \
           (T - t)) / (sigma * np.sqrt(T - t))
     if CP == OptionType.CALL:
-        value = stats.norm.cdf(d1)
+        value = ndtr(d1)
     elif CP == OptionType.PUT:
-        value = stats.norm.cdf(d1) - 1.0
+        value = ndtr(d1) - 1.0
     return value
 
 
-def enhanced_plotting(time, S, CallM, DeltaM, PnL, path_id=13):
+@timed("enhanced_plotting", "plot")
+def enhanced_plotting(time, S, CallM, DeltaM, PnL, path_id=13, FinalPnL=None, output=None):
+    # FinalPnL: terminal PnL of every path for the histogram (defaults to PnL[:, -1])
+    # output: file name such as "hedge.png" / "hedge.svg"; the figures are then rendered
+    # off screen (Agg) to "<name>_path.<ext>" and "<name>_pnl.<ext>" instead of shown
+    import seaborn as sns
     sns.set(style="darkgrid")
+    outputs = [None, None]
+    if output is not None:
+        stem, extension = os.path.splitext(output)
+        outputs = [stem + "_path" + extension, stem + "_pnl" + extension]
 
     # Figure 1: Stock, Call Price, Delta, PnL
-    plt.figure(figsize=(14, 7))
-    plt.plot(time, S[path_id, :], label="Stock Price", color="blue", linewidth=2)
-    plt.plot(time, CallM[path_id, :], label="Call Option Price", color="green", linestyle="dashed", linewidth=2)
-    plt.plot(time, DeltaM[path_id, :], label="Delta Hedging", color="red", linestyle="dotted", linewidth=2)
-    plt.plot(time, PnL[path_id, :], label="PnL", color="purple", linestyle="dashdot", linewidth=2)
+    figure = new_figure(outputs[0], figsize=(14, 7))
+    ax = figure.add_subplot()
+    ax.plot(time, S[path_id, :], label="Stock Price", color="blue", linewidth=2)
+    ax.plot(time, CallM[path_id, :], label="Call Option Price", color="green", linestyle="dashed", linewidth=2)
+    ax.plot(time, DeltaM[path_id, :], label="Delta Hedging", color="red", linestyle="dotted", linewidth=2)
+    ax.plot(time, PnL[path_id, :], label="PnL", color="purple", linestyle="dashdot", linewidth=2)
 
     # Mark key buy/sell decisions (example logic)
-    buy_sell_points = [i for i in range(1, len(time)) if DeltaM[path_id, i] != DeltaM[path_id, i - 1]]
-    plt.scatter([time[i] for i in buy_sell_points], [PnL[path_id, i] for i in buy_sell_points],
-                color='black', marker='o', label="Buy/Sell Adjustments", zorder=3)
-
-    plt.axhline(0, color='black', linestyle='--', linewidth=1)  # Zero Profit Line
-    plt.xlabel("Time (Years)", fontsize=12)
-    plt.ylabel("Value", fontsize=12)
-    plt.title("Stock Price, Call Option, Delta Hedging & PnL", fontsize=14)
-    plt.legend(fontsize=11)
-    plt.grid(True, linestyle="--", alpha=0.7)
-    plt.show()
+    buy_sell_points = np.flatnonzero(np.diff(DeltaM[path_id, :])) + 1
+    ax.scatter(np.asarray(time)[buy_sell_points], PnL[path_id, buy_sell_points],
+               color='black', marker='o', label="Buy/Sell Adjustments", zorder=3)
+
+    ax.axhline(0, color='black', linestyle='--', linewidth=1)  # Zero Profit Line
+    ax.set_xlabel("Time (Years)", fontsize=12)
+    ax.set_ylabel("Value", fontsize=12)
+    ax.set_title("Stock Price, Call Option, Delta Hedging & PnL", fontsize=14)
+    ax.legend(fontsize=11)
+    ax.grid(True, linestyle="--", alpha=0.7)
+    show_or_save(figure, outputs[0])
 
     # Figure 2: Histogram of P&L
-    plt.figure(figsize=(12, 6))
-    plt.hist(PnL[:, -1], bins=50, color="skyblue", edgecolor="black", alpha=0.75)
-    plt.axvline(0, color='red', linestyle='dashed', linewidth=2, label="Break-even")
-    plt.xlim([-0.1, 0.1])
-    plt.xlabel("Final PnL", fontsize=12)
-    plt.ylabel("Frequency", fontsize=12)
-    plt.title("Distribution of P&L at Expiry", fontsize=14)
-    plt.legend()
-    plt.grid(True, linestyle="--", alpha=0.7)
-    plt.show()
-
-
-def mainCalculation():
-    NoOfPaths = 5000
-    NoOfSteps = 250
-
-    T = 1.0
-    r = 0.1
-    sigma = 0.2
-    s0 = 1.0
-    K = [0.95]
-    CP = OptionType.CALL
-    np.random.seed(2)
-    Paths = GeneratePathsGBM(NoOfPaths, NoOfSteps, T, r, sigma, s0)
+    figure = new_figure(outputs[1], figsize=(12, 6))
+    ax = figure.add_subplot()
+    ax.hist(PnL[:, -1] if FinalPnL is None else FinalPnL, bins=50, color="skyblue", edgecolor="black", alpha=0.75)
+    ax.axvline(0, color='red', linestyle='dashed', linewidth=2, label="Break-even")
+    ax.set_xlim([-0.1, 0.1])
+    ax.set_xlabel("Final PnL", fontsize=12)
+    ax.set_ylabel("Frequency", fontsize=12)
+    ax.set_title("Distribution of P&L at Expiry", fontsize=14)
+    ax.legend()
+    ax.grid(True, linestyle="--", alpha=0.7)
+    show_or_save(figure, outputs[1])
+
+
+@timed("HedgingSimulation", "hedging")
+def HedgingSimulation(NoOfPaths, NoOfSteps, T, r, sigma, s0, K, CP, rng=None):
+    Paths = GeneratePathsGBM(NoOfPaths, NoOfSteps, T, r, sigma, s0, rng=rng)
     time = Paths["time"]
     S = Paths["S"]
     # handy lambda function
@@ -120,28 +188,46 @@ def mainCalculation():
     DeltaM = np.zeros([NoOfPaths, NoOfSteps + 1])
     DeltaM[:, 0] = Delta(0, K, s0)
 
+    delta_old = DeltaM[:, 0]
     for i in range(1, NoOfSteps + 1):
         dt = time[i] - time[i - 1]
-        delta_old = Delta(time[i - 1], K, S[:, i - 1])
+        # the previous step's delta is reused instead of being recomputed
         delta_curr = Delta(time[i], K, S[:, i])
 
         PnL[:, i] = PnL[:, i - 1] * np.exp(r * dt) - (delta_curr - delta_old) * S[:, i]
         CallM[:, i] = C(time[i], K, S[:, i])
         DeltaM[:, i] = delta_curr
+        delta_old = delta_curr
         # final payment of in the money option
     PnL[:, -1] = PnL[:, -1] - np.maximum(S[:, -1] - K, 0) + DeltaM[:, -1] * S[:, -1]
+    count("rebalances", NoOfPaths * NoOfSteps)
+    return {"time": time, "S": S, "CallM": CallM, "DeltaM": DeltaM, "PnL": PnL}
 
-    path_id = 13
-    enhanced_plotting(time, S, CallM, DeltaM, PnL, path_id)
 
-    # Analysis for each path
-    for i in range(0, NoOfPaths):
-        print(
+def mainCalculation(output=None, NoOfPaths=5000, NoOfSteps=250):
+    T = 1.0
+    r = 0.1
+    sigma = 0.2
+    s0 = 1.0
+    K = [0.95]
+    CP = OptionType.CALL
+    rng = np.random.default_rng(2)
+    Paths = GeneratePathsGBM(NoOfPaths, NoOfSteps, T, r, sigma, s0, rng=rng)
 
-            'path_id = {0:2d}, PnL(t_0)={1:0.4f}, PnL(Tm-1) ={2:0.4f},S(t_m) = {3:0.4f}, max(S(tm)-K,0)= {4:0.4f}, PnL(t_m) = {5:0.4f}'.format(
-                i, PnL[0, 0],
+    # daily delta hedging without costs; only the plotted path is recorded step by step
+    path_id = 13
+    Result = run_backtest(Paths["S"], Paths["time"], K[0], r, sigma, [HedgeConfig(EveryKSteps(1))], CP,
+                          record_paths=[path_id], return_errors=True)
+    Recorded = Result["recorded"]
+    enhanced_plotting(Recorded["time"], Recorded["S"], Recorded["option"], Recorded["delta"][0],
+                      Recorded["pnl"][0], 0, FinalPnL=Result["hedging_error"][0], output=output)
 
-                PnL[i, -2], S[i, -1], np.max(S[i, -1] - K, 0), PnL[i, -1]))
+    # Analysis over all paths
+    Stats = Result["stats"][0]
+    print('PnL(t_m) over {0} paths: mean = {1:0.4f}, std = {2:0.4f}'.format(NoOfPaths, Stats["mean"], Stats["std"]))
+    for q, value in Stats["quantiles"].items():
+        print('  quantile {0:.0%} = {1:0.4f}'.format(q, value))
 
 
-mainCalculation()
\ No newline at end of file
+if __name__ == "__main__":
+    mainCalculation()
@@ -0,0 +1,173 @@
+"""
+Book of European option positions, stored column-wise and repriced per underlying.
+
+Positions are held as contiguous NumPy columns (underlying, sign, strike,
+expiry, quantity, volatility), sorted by underlying so that the positions of
+one underlying form a single slice. Prices and Greeks of every position go
+through outils.bs_greeks in one vectorized pass, and are aggregated
+(quantity-weighted) per underlying.
+
+The terms that only depend on the time to expiry (sqrt(T), discount factor)
+are computed once per distinct expiry and cached with the volatility terms.
+They only change with set_time / set_volatility. A spot tick on one
+underlying,
+
+    book = OptionBook(underlyings, option_types, strikes, expiries, quantities, sigma=0.2, r=0.02,
+                      spots={"AAPL": 190.0, "MSFT": 410.0})
+    book.update_spot("AAPL", 190.5)
+    book.risk()["total"]["delta"]
+
+reprices that slice only and refreshes its aggregate row; the book totals are
+sums over the (few) underlyings.
+"""
+from typing import Dict, Hashable, Mapping, Optional, Sequence
+
+import numpy as np
+
+from instrumentation import timed
+from outils import GREEKS, bs_greeks, option_sign
+
+
+def _option_signs(option_types) -> np.ndarray:
+    # "call"/"put" (one for the whole book or one per position) or +-1, as in bs_greeks
+    if isinstance(option_types, str):
+        return option_sign(option_types)
+    option_types = np.asarray(option_types)
+    if option_types.dtype.kind in "US":
+        names, index = np.unique(option_types, return_inverse=True)
+        return np.array([option_sign(str(name)) for name in names])[index]
+    return option_sign(option_types)
+
+
+class OptionBook:
+    """
+    European options on several underlyings, priced under Black-Scholes.
+
+    `expiries` are absolute dates in years on the same axis as `time` (the
+    valuation date). `sigma` is a scalar or one volatility per position.
+    Spots that are not given yet leave the positions of their underlying
+    unpriced (NaN) until set_spots / update_spot.
+    """
+
+    def __init__(self, underlyings: Sequence[Hashable], option_types, strikes, expiries, quantities,
+                 sigma=0.2, r: float = 0.0, spots: Optional[Mapping[Hashable, float]] = None,
+                 time: float = 0.0):
+        underlyings = np.asarray(underlyings)
+        names, underlying_index = np.unique(underlyings, return_inverse=True)
+        n = len(underlyings)
+        signs = _option_signs(option_types)
+        columns = [np.broadcast_to(np.asarray(c, dtype=np.float64), (n,))
+                   for c in (signs, strikes, expiries, quantities, sigma)]
+
+        # stable sort by underlying, then expiry: each underlying is one contiguous slice
+        self.order = np.lexsort((columns[2], underlying_index))
+        self.underlyings = names.tolist()
+        self.underlying_index = underlying_index[self.order]
+        self.sign, self.strike, self.expiry, self.quantity, self.sigma = (np.ascontiguousarray(c[self.order])
+                                                                          for c in columns)
+        bounds = np.searchsorted(self.underlying_index, np.arange(len(names) + 1))
+        self._slices = {name: slice(bounds[k], bounds[k + 1]) for k, name in enumerate(self.underlyings)}
+        self._rows = {name: k for k, name in enumerate(self.underlyings)}
+        self.r = r
+
+        self.spots = np.full(len(names), np.nan)
+        self.position_greeks = np.full((len(GREEKS), n), np.nan)  # rows in GREEKS order, book order
+        self._by_underlying = np.full((len(names), len(GREEKS)), np.nan)
+        self._terms_cache(time, self.sigma)
+        if spots:
+            self.set_spots(spots)
+
+    def __len__(self) -> int:
+        return len(self.strike)
+
+    def _terms_cache(self, time: float, sigma: np.ndarray) -> None:
+        """Cache the expiry terms for a valuation time and volatilities, then adopt them.
+        Nothing is changed if they are invalid."""
+        if np.any(self.expiry - time <= 0.0):
+            raise ValueError("every position must expire after the valuation time")
+        # per distinct expiry, then spread to the positions
+        expiries, expiry_index = np.unique(self.expiry, return_inverse=True)
+        T = expiries - time
+        sqrt_T = np.sqrt(T)[expiry_index]
+        T_positions = T[expiry_index]
+        terms = {
+            "sqrt_T": sqrt_T,
+            "vol_sqrt_T": sigma * sqrt_T,
+            "discount": np.exp(-self.r * T)[expiry_index],
+            "drift_T": (self.r + 0.5 * sigma ** 2) * T_positions,
+        }
+        # views of every column per underlying, so that a tick does no fancy indexing
+        views = {}
+        for name, rows in self._slices.items():
+            views[name] = (self.sign[rows], self.strike[rows], sigma[rows], T_positions[rows],
+                           {key: value[rows] for key, value in terms.items()}, self.quantity[rows])
+        self.time, self.sigma, self._T, self._terms, self._views = time, sigma, T_positions, terms, views
+
+    def _reprice(self, name: Hashable) -> None:
+        sign, strike, sigma, T, terms, quantity = self._views[name]
+        row = self._rows[name]
+        values = bs_greeks(self.spots[row], strike, self.r, sigma, T, sign, GREEKS, terms)
+        greeks = self.position_greeks[:, self._slices[name]]
+        for k, greek in enumerate(GREEKS):
+            greeks[k] = values[greek]
+        np.dot(greeks, quantity, out=self._by_underlying[row])
+
+    def update_spot(self, underlying: Hashable, spot: float) -> None:
+        """Set the spot of one underlying and reprice its positions only."""
+        self.spots[self._rows[underlying]] = spot
+        self._reprice(underlying)
+
+    def set_spots(self, spots: Mapping[Hashable, float]) -> None:
+        """Set several spots at once; more than one underlying is repriced in a single pass."""
+        for underlying, spot in spots.items():
+            self.spots[self._rows[underlying]] = spot
+        if len(spots) == 1:
+            self._reprice(next(iter(spots)))
+        elif spots:
+            self.reprice_all()
+
+    def set_time(self, time: float) -> None:
+        """Move the valuation date: refresh the cached expiry terms and reprice everything."""
+        self._terms_cache(time, self.sigma)
+        self.reprice_all()
+
+    def set_volatility(self, sigma) -> None:
+        """Replace the volatilities (scalar or one per position, in input order) and reprice."""
+        sigma = np.ascontiguousarray(np.broadcast_to(np.asarray(sigma, dtype=np.float64), (len(self),))[self.order])
+        self._terms_cache(self.time, sigma)
+        self.reprice_all()
+
+    @timed("OptionBook.reprice_all", "pricing")
+    def reprice_all(self) -> None:
+        """Reprice every position in one vectorized pass."""
+        values = bs_greeks(self.spots[self.underlying_index], self.strike, self.r, self.sigma, self._T, self.sign,
+                           GREEKS, self._terms)
+        for k, greek in enumerate(GREEKS):
+            self.position_greeks[k] = values[greek]
+        # quantity-weighted sums per underlying; NaN rows (spot not set yet) stay NaN
+        weighted = self.position_greeks * self.quantity
+        for name, rows in self._slices.items():
+            self._by_underlying[self._rows[name]] = weighted[:, rows].sum(axis=1)
+
+    def risk(self) -> Dict[str, object]:
+        """
+        Aggregated price and Greeks: {"underlyings", "by_underlying": {greek:
+        array over underlyings}, "total": {greek: float}}. Delta and gamma
+        are in units of each underlying, so their totals only make sense for
+        a single underlying.
+        """
+        return {
+            "underlyings": self.underlyings,
+            "by_underlying": {greek: self._by_underlying[:, k].copy() for k, greek in enumerate(GREEKS)},
+            "total": {greek: float(self._by_underlying[:, k].sum()) for k, greek in enumerate(GREEKS)},
+        }
+
+    def underlying_greeks(self, underlying: Hashable) -> np.ndarray:
+        """Aggregated GREEKS row of one underlying, as a view updated in place by every reprice."""
+        return self._by_underlying[self._rows[underlying]]
+
+    def positions(self, greek: str = "price") -> np.ndarray:
+        """Per-position values of one of GREEKS (unit quantity), in input order."""
+        values = np.empty(len(self))
+        values[self.order] = self.position_greeks[GREEKS.index(greek)]
+        return values
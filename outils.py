@@ -1,19 +1,97 @@
-import tkinter as tk
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.pyplot as plt
 import numpy as np
-from scipy.stats import norm
+
+from instrumentation import count, enabled, timed
+
+# --- Noyau Black-Scholes vectorisé ---
+GREEKS = ("price", "delta", "gamma", "vega", "theta", "rho")
+_INV_SQRT_2PI = 1.0 / np.sqrt(2.0 * np.pi)
+_OPTION_SIGNS = {"call": 1.0, "c": 1.0, "put": -1.0, "p": -1.0}
+
+
+_scipy_ndtr = None
+
+
+def ndtr(x, out=None):
+    # fonction de répartition de la loi normale ; scipy.special (~0.2 s) n'est importé qu'au premier appel,
+    # puis gardé dans _scipy_ndtr. Pas de span ici (appelée sur chaque scalaire) : les appelants sont chronométrés
+    global _scipy_ndtr
+    if _scipy_ndtr is None:
+        from scipy.special import ndtr as _scipy_ndtr
+    if enabled():
+        count("normal_cdf_evaluations", np.size(x))
+    # out=None passé explicitement coûte plus cher à l'ufunc que le calcul d'un scalaire
+    return _scipy_ndtr(x) if out is None else _scipy_ndtr(x, out=out)
+
+
+def option_sign(option_type):
+    # +1 pour un call, -1 pour un put ; accepte "call"/"put", un enum (OptionType) ou un tableau de +-1
+    if isinstance(option_type, str):
+        return _OPTION_SIGNS[option_type.lower()]
+    return np.asarray(getattr(option_type, "value", option_type), dtype=np.float64)
+
+
+def bs_time_terms(r, sigma, T):
+    # termes qui ne dépendent que de (r, sigma, T) : réutilisables quand seuls S ou K changent
+    sqrt_T = np.sqrt(T)
+    return {
+        "sqrt_T": sqrt_T,
+        "vol_sqrt_T": sigma * sqrt_T,
+        "discount": np.exp(-r * T),
+        "drift_T": (r + 0.5 * sigma ** 2) * T,
+    }
+
+
+@timed("bs_greeks", "pricing")
+def bs_greeks(S, K, r, sigma, T, option_type="call", greeks=GREEKS, terms=None):
+    """Price and Greeks of European options in one broadcasting pass.
+
+    All inputs broadcast together; option_type is "call"/"put" or an array of
+    +1 (call) / -1 (put). d1, d2, the normal CDF/PDF and the discount factor are
+    computed once and shared by every requested quantity. `greeks` selects a
+    subset of GREEKS; `terms` may carry precomputed bs_time_terms(r, sigma, T).
+    Theta is per year and vega/rho per unit of volatility/rate.
+    """
+    unknown = set(greeks) - set(GREEKS)
+    if unknown:
+        raise ValueError(f"unknown greeks: {sorted(unknown)}")
+    cp = option_sign(option_type)
+    if terms is None:
+        terms = bs_time_terms(r, sigma, T)
+    vol_sqrt_T = terms["vol_sqrt_T"]
+    d1 = (np.log(S / K) + terms["drift_T"]) / vol_sqrt_T
+    d2 = d1 - vol_sqrt_T
+    count("options_priced", d1.size)
+
+    need_cdf1 = "price" in greeks or "delta" in greeks
+    need_cdf2 = "price" in greeks or "theta" in greeks or "rho" in greeks
+    need_pdf = "gamma" in greeks or "vega" in greeks or "theta" in greeks
+    cdf1 = ndtr(cp * d1) if need_cdf1 else None
+    cdf2 = ndtr(cp * d2) if need_cdf2 else None
+    pdf1 = _INV_SQRT_2PI * np.exp(-0.5 * d1 * d1) if need_pdf else None
+    K_discount = K * terms["discount"] if need_cdf2 else None
+
+    result = {}
+    if "price" in greeks:
+        result["price"] = cp * (S * cdf1 - K_discount * cdf2)
+    if "delta" in greeks:
+        result["delta"] = cp * cdf1
+    if "gamma" in greeks:
+        result["gamma"] = pdf1 / (S * vol_sqrt_T)
+    if "vega" in greeks:
+        result["vega"] = S * pdf1 * terms["sqrt_T"]
+    if "theta" in greeks:
+        result["theta"] = -S * pdf1 * sigma / (2.0 * terms["sqrt_T"]) - cp * r * K_discount * cdf2
+    if "rho" in greeks:
+        result["rho"] = cp * T * K_discount * cdf2
+    return result
+
 
 # --- Fonctions de pricing Black-Scholes ---
 def call(S, K, r, sigma, T):
-    d1 = (np.log(S/K)+(r+(sigma**2)/2)*T)/(sigma*np.sqrt(T))
-    d2 = d1 - sigma*np.sqrt(T)
-    return S * norm.cdf(d1) - K * np.exp(-r*T) * norm.cdf(d2)
+    return bs_greeks(S, K, r, sigma, T, "call", ("price",))["price"]
 
 def put(S, K, r, sigma, T):
-    d1 = (np.log(S/K)+(r+(sigma**2)/2)*T)/(sigma*np.sqrt(T))
-    d2 = d1 - sigma*np.sqrt(T)
-    return K * np.exp(-r*T) * norm.cdf(-d2) - S * norm.cdf(-d1)
+    return bs_greeks(S, K, r, sigma, T, "put", ("price",))["price"]
+
 def calcul_delta(S,K,r,sigma,T,):
-    d1 = (np.log(S/K)+(r+(sigma**2)/2)*T)/(sigma*np.sqrt(T))
-    return norm.cdf(d1)
\ No newline at end of file
+    return bs_greeks(S, K, r, sigma, T, "call", ("delta",))["delta"]
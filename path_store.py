@@ -0,0 +1,221 @@
+"""
+Persistent store of simulated paths, shared between runs and processes.
+
+Each simulation is kept under a directory named after a hash of its request
+(model, parameters, seed, grid, dtype and layout):
+
+    <root>/<key>/paths.npy   (num_paths, num_steps + 1) prices, or (num_paths, num_steps) log-increments
+    <root>/<key>/start.npy   initial prices (log-increment layout only)
+    <root>/<key>/time.npy    time grid
+    <root>/<key>/meta.json   the request, the size and the creation date
+
+    store = PathStore("paths_cache")
+    paths = store.get_or_simulate("gbm", 1_000_000, 252, seed=7, initial_price=100.0, mu=0.05, sigma=0.2,
+                                  total_time=1.0, dtype="float32")
+    paths.data        # read-only np.memmap: opening is instant, pages are shared with the other readers
+
+An identical request finds the stored paths instead of simulating again.
+Paths are written chunk by chunk straight into the memory-mapped file, so
+neither writing nor reading needs the whole matrix in RAM. Writing goes to a
+temporary directory that is renamed at the end, so readers never see a
+partial entry.
+
+Layouts: "prices" stores the prices (float64 or float32). "log_increments"
+stores log(S_t+1 / S_t) and the initial prices; the prices are rebuilt block
+by block on read. In float32 it keeps the full relative precision of every
+step, where float32 prices round every level.
+"""
+import datetime
+import hashlib
+import json
+import numbers
+import os
+import shutil
+import tempfile
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from heston import HestonSimulator
+from instrumentation import count, timed
+from monte_carlo_simu import AssetPriceSimulator
+from online_pricer import GeneratePathsGBMChunks
+
+LAYOUTS = ("prices", "log_increments")
+DTYPES = ("float64", "float32")
+
+
+def _gbm(num_paths, num_steps, chunk_size, rng, initial_price, mu, sigma, total_time):
+    simulator = AssetPriceSimulator(initial_price, mu, sigma, total_time, num_steps)
+    return simulator.time_grid, simulator.iter_trajectory_chunks(num_paths, chunk_size, rng=rng)
+
+
+def _gbm_moment_matched(num_paths, num_steps, chunk_size, rng, S_0, r, sigma, T, block_size=100_000):
+    # moment matching is applied per block, so the block size is part of the request
+    chunks = GeneratePathsGBMChunks(num_paths, num_steps, T, r, sigma, S_0, block_size, rng=rng)
+    return np.linspace(0.0, T, num_steps + 1), (chunk["S"] for chunk in chunks)
+
+
+def _heston(num_paths, num_steps, chunk_size, rng, initial_price, mu, v0, kappa, theta, xi, rho, total_time):
+    simulator = HestonSimulator(initial_price, mu, v0, kappa, theta, xi, rho, total_time, num_steps)
+    return simulator.time_grid, simulator.iter_trajectory_chunks(num_paths, chunk_size, rng=rng)
+
+
+# model name -> function(num_paths, num_steps, chunk_size, rng, **params) returning
+# (time grid, iterator of (rows, num_steps + 1) price blocks)
+MODELS: Dict[str, Callable[..., Tuple[np.ndarray, Iterator[np.ndarray]]]] = {
+    "gbm": _gbm,                                # AssetPriceSimulator
+    "gbm_moment_matched": _gbm_moment_matched,  # online_pricer.GeneratePathsGBMChunks
+    "heston": _heston,                          # heston.HestonSimulator
+}
+# models whose random stream depends on how the paths are split into chunks (HestonSimulator
+# draws the shocks of all the paths of a chunk step by step): chunk_size is part of their request
+CHUNKED_STREAMS = frozenset({"heston"})
+
+
+def path_key(request: Dict[str, Any]) -> str:
+    """Hash of a request: canonical JSON with sorted keys. Numeric model parameters are
+    hashed as floats, so initial_price=100 and initial_price=100.0 share a key."""
+    params = {name: float(value) if isinstance(value, numbers.Real) and not isinstance(value, bool) else value
+              for name, value in request.get("params", {}).items()}
+    canonical = json.dumps(dict(request, params=params), sort_keys=True, default=float, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()[:24]
+
+
+class StoredPaths:
+    """Read-only view of one stored simulation."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.layout = self.meta["layout"]
+        self.time = np.load(os.path.join(directory, "time.npy"))
+        # mmap_mode="r": nothing is read until used, pages are shared between processes
+        self.data = np.load(os.path.join(directory, "paths.npy"), mmap_mode="r")
+        self.start = np.load(os.path.join(directory, "start.npy"), mmap_mode="r") \
+            if self.layout == "log_increments" else None
+
+    def __len__(self) -> int:
+        return self.data.shape[0]
+
+    def prices(self, rows=slice(None)) -> np.ndarray:
+        """Prices of `rows`: the memmap itself (no copy) for the "prices" layout,
+        rebuilt in float64 for the log-increment layout."""
+        if self.layout == "prices":
+            return self.data[rows]
+        increments = self.data[rows]
+        out = np.empty((increments.shape[0], increments.shape[1] + 1))
+        out[:, 0] = 0.0
+        out[:, 1:] = increments
+        np.cumsum(out, axis=1, out=out)
+        np.exp(out, out=out)
+        out *= np.asarray(self.start[rows], dtype=np.float64)[:, None]
+        return out
+
+    def iter_chunks(self, chunk_size: int) -> Iterator[np.ndarray]:
+        """Yield the prices in blocks of at most chunk_size rows."""
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        for start in range(0, len(self), chunk_size):
+            yield self.prices(slice(start, start + chunk_size))
+
+
+class PathStore:
+    """Directory of stored simulations, keyed by path_key of their request."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.stats = {"hits": 0, "misses": 0}
+
+    def _directory(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.exists(os.path.join(self._directory(key), "meta.json"))
+
+    def keys(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if name in self)
+
+    def open(self, key: str) -> StoredPaths:
+        if key not in self:
+            raise KeyError(key)
+        return StoredPaths(self._directory(key))
+
+    @timed("PathStore.write", "io")
+    def write(self, request: Dict[str, Any], time: np.ndarray, chunks, num_paths: int) -> StoredPaths:
+        """
+        Store price blocks of shape (rows, len(time)) under the key of
+        `request`, which must hold "dtype" and "layout". The blocks are
+        written one by one into the memory-mapped file.
+        """
+        layout, dtype = request["layout"], np.dtype(request["dtype"])
+        if layout not in LAYOUTS or dtype.name not in DTYPES:
+            raise ValueError(f"layout must be one of {LAYOUTS} and dtype one of {DTYPES}")
+        key = path_key(request)
+        os.makedirs(self.root, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=f".{key}-", dir=self.root)
+        try:
+            columns = len(time) if layout == "prices" else len(time) - 1
+            data = np.lib.format.open_memmap(os.path.join(staging, "paths.npy"), mode="w+", dtype=dtype,
+                                             shape=(num_paths, columns))
+            start = np.empty(num_paths) if layout == "log_increments" else None
+            row = 0
+            for chunk in chunks:
+                rows = slice(row, row + chunk.shape[0])
+                if layout == "prices":
+                    data[rows] = chunk
+                else:
+                    start[rows] = chunk[:, 0]
+                    data[rows] = np.diff(np.log(chunk), axis=1)
+                row += chunk.shape[0]
+            if row != num_paths:
+                raise ValueError(f"expected {num_paths} paths, got {row}")
+            data.flush()
+            count("bytes_written", data.nbytes)
+            del data
+            if start is not None:
+                np.save(os.path.join(staging, "start.npy"), start)
+            np.save(os.path.join(staging, "time.npy"), np.asarray(time, dtype=np.float64))
+            meta = dict(request, key=key, num_paths=num_paths,
+                        created=datetime.datetime.now().isoformat(timespec="seconds"))
+            with open(os.path.join(staging, "meta.json"), "w") as f:
+                json.dump(meta, f, indent=2, default=float)
+            try:
+                os.rename(staging, self._directory(key))
+            except OSError:
+                # another process stored the same request first: keep its copy
+                if key not in self:
+                    raise
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        return self.open(key)
+
+    def get_or_simulate(self, model: str, num_paths: int, num_steps: int, seed: int,
+                        dtype: str = "float64", layout: str = "prices", chunk_size: int = 100_000,
+                        **params) -> StoredPaths:
+        """
+        Stored paths of MODELS[model] for these parameters, simulated and
+        stored on the first request. The shocks come from
+        np.random.default_rng(seed). For the models of CHUNKED_STREAMS the
+        paths depend on chunk_size, which is then part of the key and of
+        meta.json. A seed is required: unseeded paths could never be found
+        again, and storing them would only fill the disk.
+        """
+        if model not in MODELS:
+            raise ValueError(f"unknown model {model!r}, expected one of {sorted(MODELS)}")
+        if seed is None:
+            raise ValueError("stored paths need a seed; simulate without the store for unseeded paths")
+        request = {"model": model, "params": params, "seed": seed, "num_steps": num_steps,
+                   "num_paths": num_paths, "dtype": np.dtype(dtype).name, "layout": layout}
+        if model in CHUNKED_STREAMS:
+            request["chunk_size"] = chunk_size
+        key = path_key(request)
+        if key in self:
+            self.stats["hits"] += 1
+            return self.open(key)
+        self.stats["misses"] += 1
+        time, chunks = MODELS[model](num_paths, num_steps, chunk_size, np.random.default_rng(seed), **params)
+        return self.write(request, time, chunks, num_paths)
@@ -0,0 +1,259 @@
+"""
+Streaming path-dependent payoffs: Asian (arithmetic and geometric), barrier
+(knock-in / knock-out) and lookback options.
+
+Every payoff keeps a running state of one value per path (sum, log-sum,
+running extremum, survival probability). The state is updated one time step
+at a time, so evaluating a payoff needs O(num_paths) memory, however many
+monitoring dates there are. Several payoffs can be fed from the same
+simulation:
+
+    steps = GeneratePathsGBMSteps(NoOfPaths, NoOfSteps, T, r, sigma, S_0)
+    values = evaluate_streaming({"asian": AsianArithmetic(K), "dao": Barrier(K, 80, "down", "out")}, steps)
+
+Payoffs are also plain callables on a (num_paths, num_steps + 1) path matrix
+(e.g. GeneratePathsGBM(...)["S"] or mc_pricer.price_monte_carlo paths), and
+evaluate_chunks runs them on GeneratePathsGBMChunks blocks. The returned
+values are undiscounted.
+
+Barriers and lookbacks are monitored on the simulation grid. Passing
+`sigma` switches to continuous monitoring with a Brownian-bridge correction:
+barriers multiply the survival probability of each path by the probability
+of not crossing between two dates, and lookbacks shift the discrete extremum
+by exp(+-0.5826 sigma sqrt(dt)) (Broadie-Glasserman-Kou).
+"""
+import abc
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+
+from outils import bs_greeks, option_sign
+
+_BGK_BETA = 0.5826  # -zeta(1/2) / sqrt(2 pi)
+
+
+class PathPayoff(abc.ABC):
+    """Payoff computed from a running per-path state.
+
+    reset(S0) starts a batch of paths, update(S_prev, S, dt) adds one
+    monitoring date and value() returns the payoff of every path.
+    """
+
+    @abc.abstractmethod
+    def reset(self, S0: np.ndarray) -> None:
+        ...
+
+    @abc.abstractmethod
+    def update(self, S_prev: np.ndarray, S: np.ndarray, dt: float) -> None:
+        ...
+
+    @abc.abstractmethod
+    def value(self) -> np.ndarray:
+        ...
+
+    def __call__(self, paths: np.ndarray, dt: Optional[float] = None) -> np.ndarray:
+        """Payoff of every row of a path matrix, fed column by column. `dt`
+        defaults to T / num_steps when the payoff knows its maturity T."""
+        paths = np.asarray(paths)
+        if dt is None:
+            T = getattr(self, "T", None)
+            if T is None and getattr(self, "sigma", None) is not None:
+                raise ValueError("continuous-monitoring correction needs dt or the maturity T")
+            dt = 1.0 if T is None else T / (paths.shape[1] - 1)
+        self.reset(paths[:, 0])
+        for i in range(1, paths.shape[1]):
+            self.update(paths[:, i - 1], paths[:, i], dt)
+        return self.value()
+
+
+class AsianArithmetic(PathPayoff):
+    """max(+-(A - K), 0) where A is the arithmetic average of the prices at the
+    monitoring dates (S0 excluded)."""
+
+    def __init__(self, K: float, option_type="call"):
+        self.K = K
+        self.sign = option_sign(option_type)
+
+    def reset(self, S0):
+        self._sum = np.zeros(np.shape(S0))
+        self._count = 0
+
+    def update(self, S_prev, S, dt):
+        self._sum += S
+        self._count += 1
+
+    def value(self):
+        return np.maximum(self.sign * (self._sum / self._count - self.K), 0.0)
+
+    def gradient(self, paths: np.ndarray) -> np.ndarray:
+        # pathwise derivative d payoff / d S_t, for mc_pricer Greeks
+        n = paths.shape[1] - 1
+        in_the_money = self.sign * (paths[:, 1:].mean(axis=1) - self.K) > 0.0
+        gradient = np.zeros(paths.shape)
+        gradient[:, 1:] = (self.sign / n) * in_the_money[:, None]
+        return gradient
+
+
+class AsianGeometric(PathPayoff):
+    """max(+-(G - K), 0) where G is the geometric average of the prices at the
+    monitoring dates (S0 excluded)."""
+
+    def __init__(self, K: float, option_type="call"):
+        self.K = K
+        self.sign = option_sign(option_type)
+
+    def reset(self, S0):
+        self._log_sum = np.zeros(np.shape(S0))
+        self._count = 0
+
+    def update(self, S_prev, S, dt):
+        self._log_sum += np.log(S)
+        self._count += 1
+
+    def value(self):
+        return np.maximum(self.sign * (np.exp(self._log_sum / self._count) - self.K), 0.0)
+
+    def gradient(self, paths: np.ndarray) -> np.ndarray:
+        n = paths.shape[1] - 1
+        G = np.exp(np.log(paths[:, 1:]).mean(axis=1))
+        in_the_money = self.sign * (G - self.K) > 0.0
+        gradient = np.zeros(paths.shape)
+        gradient[:, 1:] = (self.sign / n) * (in_the_money * G)[:, None] / paths[:, 1:]
+        return gradient
+
+
+def geometric_asian_price(S0: float, K: float, r: float, sigma: float, T: float, num_steps: int,
+                          option_type="call") -> float:
+    """Closed-form price of AsianGeometric monitored at T / num_steps, 2 T / num_steps, ..., T."""
+    n = num_steps
+    mean = np.log(S0) + (r - 0.5 * sigma ** 2) * T * (n + 1) / (2 * n)
+    variance = sigma ** 2 * T * (n + 1) * (2 * n + 1) / (6 * n ** 2)
+    # G is lognormal: price it as a Black-Scholes option on a forward exp(mean + variance / 2)
+    forward = np.exp(mean + 0.5 * variance)
+    sigma_eff = np.sqrt(variance / T)
+    return float(bs_greeks(forward * np.exp(-r * T), K, r, sigma_eff, T, option_type, ("price",))["price"])
+
+
+class Barrier(PathPayoff):
+    """
+    European option max(+-(S_T - K), 0) that is knocked out, or knocked in,
+    when the path crosses `barrier`.
+
+    direction is "up" (barrier above S0) or "down"; knock is "out" or "in".
+    Without sigma the barrier is checked on the grid dates only. With sigma,
+    the payoff is weighted by the Brownian-bridge probability of the
+    continuous path not crossing between dates.
+    """
+
+    def __init__(self, K: float, barrier: float, direction: str = "down", knock: str = "out",
+                 option_type="call", sigma: Optional[float] = None, T: Optional[float] = None):
+        if direction not in ("up", "down") or knock not in ("in", "out"):
+            raise ValueError("direction must be 'up' or 'down' and knock 'in' or 'out'")
+        self.K = K
+        self.barrier = barrier
+        self.direction = direction
+        self.knock = knock
+        self.sign = option_sign(option_type)
+        self.sigma = sigma
+        self.T = T
+
+    def _beyond(self, S):
+        return S >= self.barrier if self.direction == "up" else S <= self.barrier
+
+    def reset(self, S0):
+        self._survival = np.where(self._beyond(np.asarray(S0)), 0.0, 1.0)
+        self._last = np.asarray(S0)
+
+    def update(self, S_prev, S, dt):
+        self._survival[self._beyond(S)] = 0.0
+        if self.sigma is not None:
+            # P(no crossing | S_prev, S) = 1 - exp(-2 ln(B/S_prev) ln(B/S) / (sigma^2 dt)), both on the safe side
+            exponent = np.log(self.barrier / S_prev) * np.log(self.barrier / S)
+            exponent *= -2.0 / (self.sigma ** 2 * dt)
+            np.minimum(exponent, 0.0, out=exponent)
+            self._survival *= -np.expm1(exponent)
+        self._last = S
+
+    def value(self):
+        vanilla = np.maximum(self.sign * (self._last - self.K), 0.0)
+        alive = self._survival if self.knock == "out" else 1.0 - self._survival
+        return vanilla * alive
+
+
+class Lookback(PathPayoff):
+    """
+    Lookback option on the extremum of the path (S0 included).
+
+    Floating strike (K=None): call S_T - min S, put max S - S_T.
+    Fixed strike: call max(max S - K, 0), put max(K - min S, 0).
+    With sigma, the discrete extremum is shifted to approximate continuous
+    monitoring.
+    """
+
+    def __init__(self, K: Optional[float] = None, option_type="call", sigma: Optional[float] = None,
+                 T: Optional[float] = None):
+        self.K = K
+        self.sign = option_sign(option_type)
+        self.sigma = sigma
+        self.T = T
+
+    def reset(self, S0):
+        self._extremum = np.array(S0, dtype=np.float64)
+        self._last = self._extremum
+        self._dt = None
+
+    def update(self, S_prev, S, dt):
+        # floating call and fixed put use the minimum, the others the maximum
+        use_min = (self.K is None) == (self.sign > 0)
+        (np.minimum if use_min else np.maximum)(self._extremum, S, out=self._extremum)
+        self._last = S
+        self._dt = dt
+
+    def value(self):
+        use_min = (self.K is None) == (self.sign > 0)
+        extremum = self._extremum
+        if self.sigma is not None and self._dt is not None:
+            shift = _BGK_BETA * self.sigma * np.sqrt(self._dt)
+            extremum = extremum * np.exp(-shift if use_min else shift)
+        if self.K is None:
+            return self.sign * (self._last - extremum)
+        return np.maximum(self.sign * (extremum - self.K), 0.0)
+
+
+def evaluate_streaming(payoffs: Dict[str, PathPayoff],
+                       steps: Iterable[Tuple[float, float, np.ndarray, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """Feed every payoff from a step iterator yielding (t_prev, t, S_prev, S),
+    such as online_pricer.GeneratePathsGBMSteps, and return their values."""
+    started = False
+    for t_prev, t, S_prev, S in steps:
+        if not started:
+            for payoff in payoffs.values():
+                payoff.reset(S_prev)
+            started = True
+        for payoff in payoffs.values():
+            payoff.update(S_prev, S, t - t_prev)
+    if not started:
+        raise ValueError("no time step to evaluate")
+    return {name: payoff.value() for name, payoff in payoffs.items()}
+
+
+def evaluate_chunks(payoffs: Dict[str, PathPayoff], chunks: Iterable) -> Dict[str, np.ndarray]:
+    """Evaluate every payoff on path blocks ({"time", "S"} dicts as yielded by
+    GeneratePathsGBMChunks, or plain matrices) and concatenate the values.
+    Plain matrices have no time grid: each payoff gets the dt of
+    PathPayoff.__call__ (T / num_steps, or an error under continuous monitoring
+    without T)."""
+    values = {name: [] for name in payoffs}
+    for chunk in chunks:
+        if isinstance(chunk, dict):
+            chunk_values = evaluate_streaming(payoffs, _matrix_steps(chunk["S"], chunk["time"]))
+        else:
+            chunk_values = {name: payoff(chunk) for name, payoff in payoffs.items()}
+        for name, value in chunk_values.items():
+            values[name].append(value)
+    return {name: np.concatenate(parts) for name, parts in values.items()}
+
+
+def _matrix_steps(S: np.ndarray, time: np.ndarray) -> Iterator:
+    for i in range(1, S.shape[1]):
+        yield time[i - 1], time[i], S[:, i - 1], S[:, i]
@@ -0,0 +1,132 @@
+"""
+Plotting helpers that scale to large path sets.
+
+- add_path_collection draws paths as a single LineCollection. It shows a random
+  subset of at most max_paths rows, decimated to at most max_points dates, so
+  the number of drawn vertices does not depend on the number of simulated
+  paths.
+- add_fan_chart draws quantile bands computed from the data. The data is
+  either a path matrix, estimated on at most max_rows random rows, or a
+  monte_carlo_simu.TrajectoryAccumulator, whose sketch quantiles are
+  independent of the path count.
+- new_figure / show_or_save render interactively through pyplot, or, when an
+  output file is given, straight to PNG/SVG/PDF with the Agg canvas. In that
+  case no pyplot state and no display are involved, so it works on headless
+  servers.
+
+matplotlib is only imported when a figure is created.
+"""
+from typing import Optional, Sequence
+
+import numpy as np
+
+PLOT_MODES = ("lines", "collection", "fan")
+DEFAULT_MAX_PATHS = 500
+DEFAULT_MAX_POINTS = 1000
+DEFAULT_QUANTILE_ROWS = 20_000  # quantile error ~ 1 / sqrt(rows), well below a pixel
+FAN_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+def new_figure(output: Optional[str] = None, figsize=None):
+    """Figure drawn by pyplot (output=None) or by an off-screen Agg canvas."""
+    if output is None:
+        import matplotlib.pyplot as plt
+        return plt.figure(figsize=figsize)
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    figure = Figure(figsize=figsize)
+    FigureCanvasAgg(figure)
+    return figure
+
+
+def show_or_save(figure, output: Optional[str] = None, dpi: int = 100) -> None:
+    """Show the figure interactively, or write it to `output` (the format
+    follows the extension: .png, .svg, .pdf, ...)."""
+    if output is None:
+        import matplotlib.pyplot as plt
+        plt.show()
+    else:
+        figure.savefig(output, dpi=dpi)
+
+
+def subsample_rows(num_rows: int, max_rows: Optional[int], rng=None) -> np.ndarray:
+    """Sorted random indices of at most max_rows rows (all rows when fewer)."""
+    if max_rows is None or num_rows <= max_rows:
+        return np.arange(num_rows)
+    generator = rng if rng is not None else np.random.default_rng()
+    return np.sort(generator.choice(num_rows, size=max_rows, replace=False))
+
+
+def decimation_indices(num_points: int, max_points: Optional[int]) -> np.ndarray:
+    """At most max_points evenly spread column indices, first and last included."""
+    if max_points is None or num_points <= max_points:
+        return np.arange(num_points)
+    return np.unique(np.linspace(0, num_points - 1, max_points).round().astype(int))
+
+
+def add_path_collection(ax, time: np.ndarray, paths, max_paths: Optional[int] = DEFAULT_MAX_PATHS,
+                        max_points: Optional[int] = DEFAULT_MAX_POINTS, rng=None, **line_kwargs):
+    """Draw (a random subset of) the rows of `paths` as one LineCollection."""
+    from matplotlib.collections import LineCollection
+    paths = np.asarray(paths)
+    time = np.asarray(time)
+    rows = subsample_rows(paths.shape[0], max_paths, rng)
+    columns = decimation_indices(paths.shape[1], max_points)
+    segments = np.empty((len(rows), len(columns), 2))
+    segments[:, :, 0] = time[columns]
+    segments[:, :, 1] = paths[np.ix_(rows, columns)]
+    collection = LineCollection(segments, **line_kwargs)
+    ax.add_collection(collection)
+    ax.autoscale_view()
+    return collection
+
+
+def path_quantiles(source, quantiles: Sequence[float] = FAN_QUANTILES, max_rows: Optional[int] = None,
+                   rng=None) -> np.ndarray:
+    """(len(quantiles), num_dates) quantiles of a path matrix (estimated on at
+    most max_rows random rows) or of a TrajectoryAccumulator."""
+    if hasattr(source, "quantiles"):
+        return np.asarray(source.quantiles(quantiles))
+    source = np.asarray(source)
+    return np.quantile(source[subsample_rows(source.shape[0], max_rows, rng)], quantiles, axis=0)
+
+
+def add_fan_chart(ax, time: np.ndarray, source, quantiles: Sequence[float] = FAN_QUANTILES,
+                  color: str = "gray", label: Optional[str] = None,
+                  max_points: Optional[int] = DEFAULT_MAX_POINTS, max_rows: Optional[int] = DEFAULT_QUANTILE_ROWS,
+                  rng=None) -> np.ndarray:
+    """
+    Shade the bands between symmetric quantiles (q, 1 - q), darker towards
+    the centre, and draw the median when 0.5 is among the quantiles. Returns
+    the computed quantiles.
+    """
+    quantiles = sorted(quantiles)
+    levels = path_quantiles(source, quantiles, max_rows, rng)
+    columns = decimation_indices(levels.shape[1], max_points)
+    time = np.asarray(time)[columns]
+    levels_shown = levels[:, columns]
+    num_bands = len(quantiles) // 2
+    for k in range(num_bands):
+        lower, upper = levels_shown[k], levels_shown[len(quantiles) - 1 - k]
+        band_label = f"{quantiles[k]:.0%}-{quantiles[len(quantiles) - 1 - k]:.0%}"
+        ax.fill_between(time, lower, upper, color=color, alpha=0.15 + 0.5 * (k + 1) / (num_bands + 1),
+                        linewidth=0, label=band_label if label is None else f"{label} {band_label}")
+    if 0.5 in quantiles:
+        ax.plot(time, levels_shown[quantiles.index(0.5)], color=color, linewidth=1.5,
+                label="Median" if label is None else f"{label} median")
+    return levels
+
+
+def add_paths(ax, time: np.ndarray, paths, mode: str = "collection", max_paths: Optional[int] = DEFAULT_MAX_PATHS,
+              rng=None, color: str = "gray", alpha: float = 0.2) -> None:
+    """Draw a path set in one of PLOT_MODES: "lines" (one plot call per path,
+    the legacy behaviour), "collection" or "fan"."""
+    if mode == "lines":
+        for path in paths:
+            ax.plot(time, path, alpha=alpha, color=color)
+    elif mode == "collection":
+        add_path_collection(ax, time, paths, max_paths, rng=rng, colors=color, alpha=alpha)
+    elif mode == "fan":
+        add_fan_chart(ax, time, paths, color=color, rng=rng)
+    else:
+        raise ValueError(f"unknown plot mode {mode!r}, expected one of {PLOT_MODES}")
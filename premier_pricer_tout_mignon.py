@@ -1,91 +1,207 @@
+import logging
+import queue
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import numpy as np
-from scipy.stats import norm
-
-# --- Fonctions de pricing Black-Scholes ---
-def call(S, K, r, mu, T):
-    d1 = (np.log(S/K)+(r+(mu**2)/2)*T)/(mu*np.sqrt(T))
-    d2 = d1 - mu*np.sqrt(T)
-    return S * norm.cdf(d1) - K * np.exp(-r*T) * norm.cdf(d2)
-
-def put(S, K, r, mu, T):
-    d1 = (np.log(S/K)+(r+(mu**2)/2)*T)/(mu*np.sqrt(T))
-    d2 = d1 - mu*np.sqrt(T)
-    return K * np.exp(-r*T) * norm.cdf(-d2) - S * norm.cdf(-d1)
-
-# --- Fonction de plot ---
-def plot_prices():
-    try:
-        mu = float(vol_entry.get()) / 100
-        S = float(s_entry.get())
-        K = float(k_entry.get())
-        T = float(t_entry.get())
-        r = float(r_entry.get()) / 100
-
-        sgrid = np.linspace(1, 100, 100)
-        mugrid = np.linspace(0.01, 1, 100)
-        kgrid = np.linspace(1, 100, 100)
-        tgrid = np.linspace(, 2, 720)
-
-        prices_call_s = [call(s, K, r, mu, T) for s in sgrid]
-        prices_put_s = [put(s, K, r, mu, T) for s in sgrid]
-        prices_call_mu = [call(S, K, r, m, T) for m in mugrid]
-        prices_put_mu = [put(S, K, r, m, T) for m in mugrid]
-
-        fig, axs = plt.subplots(1, 2, figsize=(10, 4))
-        axs[0].plot(sgrid, prices_call_s, label="Call")
-        axs[0].plot(sgrid, prices_put_s, label="Put")
-        axs[0].set_title("Prix en fonction du sous-jacent")
-        axs[0].set_xlabel("Sous-jacent")
-        axs[0].set_ylabel("Prix")
-        axs[0].grid()
-        axs[0].legend()
-
-        axs[1].plot(mugrid, prices_call_mu, label="Call")
-        axs[1].plot(mugrid, prices_put_mu, label="Put")
-        axs[1].set_title("Prix en fonction de la volatilité")
-        axs[1].set_xlabel("Volatilité")
-        axs[1].set_ylabel("Prix")
-        axs[1].grid()
-        axs[1].legend()
-
-        # Affichage dans tkinter
-        canvas = FigureCanvasTkAgg(fig, master=root)
-        canvas.draw()
-        canvas.get_tk_widget().grid(row=7, column=0, columnspan=5, pady=20)
-
-    except ValueError:
-        print("Erreur : merci de vérifier les entrées numériques.")
+from outils import call, put
+
+logger = logging.getLogger(__name__)
+
+SGRID = np.linspace(1, 100, 100)
+MUGRID = np.linspace(0.01, 1, 100)
+
+
+# --- Calcul des courbes (mis en cache) ---
+# Chaque grille n'est recalculée que si ses propres paramètres ont changé :
+# la courbe en fonction du sous-jacent ne dépend pas de S, celle en fonction
+# de la volatilité ne dépend pas de mu.
+def _lecture_seule(*arrays):
+    for array in arrays:
+        array.setflags(write=False)
+    return arrays
+
+
+@lru_cache(maxsize=256)
+def courbes_sous_jacent(K, r, mu, T):
+    return _lecture_seule(call(SGRID, K, r, mu, T), put(SGRID, K, r, mu, T))
+
+
+@lru_cache(maxsize=256)
+def courbes_volatilite(S, K, r, T):
+    return _lecture_seule(call(S, K, r, MUGRID, T), put(S, K, r, MUGRID, T))
+
+
+def calcul_courbes(S, K, r, mu, T):
+    return courbes_sous_jacent(K, r, mu, T), courbes_volatilite(S, K, r, T)
+
+
+# --- Calculs en arrière-plan (sans Tk) ---
+class CalculsFusionnes:
+    """Runs `fonction` on one background worker, one call at a time.
+
+    Requests made while a computation runs are coalesced: only the latest is
+    computed next. relever() is called from the GUI thread and returns the
+    latest result still up to date (None if a newer request is pending) and
+    the exceptions raised by the worker, so that none is lost.
+    """
+
+    def __init__(self, fonction, executor=None):
+        self.fonction = fonction
+        self.executor = ThreadPoolExecutor(max_workers=1) if executor is None else executor
+        self.resultats = queue.Queue()
+        self.en_cours = False
+        self.demande = None
+        self.lancements = 0
+
+    def demander(self, parametres):
+        self.demande = parametres
+        self.lancer()
+
+    def lancer(self):
+        if self.en_cours or self.demande is None:
+            return
+        parametres, self.demande = self.demande, None
+        self.en_cours = True
+        self.lancements += 1
+        future = self.executor.submit(self.fonction, *parametres)
+        future.add_done_callback(self.resultats.put)
+
+    def relever(self):
+        resultat, erreurs = None, []
+        try:
+            while True:
+                future = self.resultats.get_nowait()
+                self.en_cours = False
+                if future.exception() is not None:
+                    erreurs.append(future.exception())
+                elif self.demande is None:
+                    resultat = future.result()
+        except queue.Empty:
+            pass
+        # le résultat d'une demande déjà remplacée n'est pas affiché
+        if self.demande is not None:
+            resultat = None
+        self.lancer()
+        return resultat, erreurs
+
+    def fermer(self):
+        self.executor.shutdown(wait=False)
 
-# --- Interface Tkinter ---
-root = tk.Tk()
-root.geometry("1000x600")
-root.title("Pricer Black-Scholes")
-
-# Champs d'entrée
-tk.Label(root, text="Volatilité (%)").grid(row=0, column=0, padx=10, pady=5)
-vol_entry = tk.Entry(root, width=10)
-vol_entry.grid(row=0, column=1)
-
-tk.Label(root, text="Sous-jacent ($)").grid(row=1, column=0, padx=10, pady=5)
-s_entry = tk.Entry(root, width=10)
-s_entry.grid(row=1, column=1)
-
-tk.Label(root, text="Strike ($)").grid(row=2, column=0, padx=10, pady=5)
-k_entry = tk.Entry(root, width=10)
-k_entry.grid(row=2, column=1)
 
-tk.Label(root, text="Maturité (années)").grid(row=3, column=0, padx=10, pady=5)
-t_entry = tk.Entry(root, width=10)
-t_entry.grid(row=3, column=1)
-
-tk.Label(root, text="Taux sans risque (%)").grid(row=4, column=0, padx=10, pady=5)
-r_entry = tk.Entry(root, width=10)
-r_entry.grid(row=4, column=1)
-
-# Bouton pour afficher le graphique
-tk.Button(root, text="Plot", command=plot_prices, bg="lightblue").grid(row=5, column=0, columnspan=2, pady=10)
-
-root.mainloop()
+# --- Interface Tkinter ---
+class PricerApp:
+    """Pricer GUI: curves are computed on a background worker and drawn into a
+    single persistent canvas whose line data is updated in place."""
+
+    DELAI_SAISIE_MS = 150
+    DELAI_SONDAGE_MS = 30
+
+    def __init__(self, root):
+        self.root = root
+        root.geometry("1000x600")
+        root.title("Pricer Black-Scholes")
+
+        # Champs d'entrée
+        self.entries = {}
+        labels = [("vol", "Volatilité (%)"), ("S", "Sous-jacent ($)"), ("K", "Strike ($)"),
+                  ("T", "Maturité (années)"), ("r", "Taux sans risque (%)")]
+        for row, (key, text) in enumerate(labels):
+            tk.Label(root, text=text).grid(row=row, column=0, padx=10, pady=5)
+            entry = tk.Entry(root, width=10)
+            entry.grid(row=row, column=1)
+            entry.bind("<KeyRelease>", self.planifier_trace)
+            self.entries[key] = entry
+
+        # Bouton pour afficher le graphique
+        tk.Button(root, text="Plot", command=self.plot_prices, bg="lightblue").grid(
+            row=5, column=0, columnspan=2, pady=10)
+
+        # Figure et canvas créés une seule fois, seules les données des courbes changent
+        self.figure = Figure(figsize=(10, 4))
+        axs = self.figure.subplots(1, 2)
+        self.lines = {}
+        for ax, grid, key, title, xlabel in (
+                (axs[0], SGRID, "s", "Prix en fonction du sous-jacent", "Sous-jacent"),
+                (axs[1], MUGRID, "mu", "Prix en fonction de la volatilité", "Volatilité")):
+            self.lines[key] = (ax.plot(grid, np.full_like(grid, np.nan), label="Call")[0],
+                               ax.plot(grid, np.full_like(grid, np.nan), label="Put")[0])
+            ax.set_title(title)
+            ax.set_xlabel(xlabel)
+            ax.set_ylabel("Prix")
+            ax.grid()
+            ax.legend()
+        self.axs = axs
+        self.canvas = FigureCanvasTkAgg(self.figure, master=root)
+        self.canvas.get_tk_widget().grid(row=7, column=0, columnspan=5, pady=20)
+
+        # Erreurs de saisie ou de calcul
+        self.statut = tk.Label(root, text="", fg="red")
+        self.statut.grid(row=6, column=0, columnspan=5)
+
+        # Un seul calcul en cours à la fois : les demandes arrivées entretemps
+        # sont fusionnées et seule la plus récente est calculée ensuite
+        self.calculs = CalculsFusionnes(calcul_courbes)
+        self.saisie_after = None
+        root.protocol("WM_DELETE_WINDOW", self.fermer)
+        root.after(self.DELAI_SONDAGE_MS, self.sonder_resultats)
+
+    def lire_parametres(self):
+        mu = float(self.entries["vol"].get()) / 100
+        S = float(self.entries["S"].get())
+        K = float(self.entries["K"].get())
+        T = float(self.entries["T"].get())
+        r = float(self.entries["r"].get()) / 100
+        return S, K, r, mu, T
+
+    def planifier_trace(self, _event=None):
+        # retrace automatiquement après une courte pause dans la saisie
+        if self.saisie_after is not None:
+            self.root.after_cancel(self.saisie_after)
+        self.saisie_after = self.root.after(self.DELAI_SAISIE_MS, self.plot_prices, False)
+
+    def plot_prices(self, signaler_erreur=True):
+        self.saisie_after = None
+        try:
+            parametres = self.lire_parametres()
+        except ValueError:
+            if signaler_erreur:
+                self.statut.config(text="Erreur : merci de vérifier les entrées numériques.")
+            return
+        self.calculs.demander(parametres)
+
+    def sonder_resultats(self):
+        # le thread de calcul ne touche jamais à Tk : les résultats sont relevés ici
+        resultat, erreurs = self.calculs.relever()
+        for erreur in erreurs:
+            logger.error("échec du calcul des courbes", exc_info=erreur)
+            self.statut.config(text=f"Erreur de calcul : {erreur}")
+        if resultat is not None:
+            self.statut.config(text="")
+            self.mettre_a_jour(*resultat)
+        self.root.after(self.DELAI_SONDAGE_MS, self.sonder_resultats)
+
+    def mettre_a_jour(self, courbes_s, courbes_mu):
+        for key, courbes in (("s", courbes_s), ("mu", courbes_mu)):
+            for line, prices in zip(self.lines[key], courbes):
+                line.set_ydata(prices)
+        for ax in self.axs:
+            ax.relim()
+            ax.autoscale_view()
+        self.canvas.draw_idle()
+
+    def fermer(self):
+        self.calculs.fermer()
+        self.root.destroy()
+
+
+def main():
+    root = tk.Tk()
+    PricerApp(root)
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,26 @@
-import numpy as np 
-import yfinance as yf
-import pandas as pd
+import numpy as np
 import matplotlib.pyplot as plt
+from market_data import MarketDataStore
 
 # Charger les données de dassault depuis 2015
+# (stockage local en colonnes .npy : seules les dates manquantes sont téléchargées)
 
-data_bank = yf.download("DSY.PA", start="2015-01-01", end="2024-12-31")
-data_bank.to_excel("action_dassault_system.xlsx")
-print (data_bank.head())
-close_prices = data_bank[('Close','DSY.PA')]
-open_prices =  data_bank[('Open','DSY.PA')]
-diff_prices = close_prices - open_prices
-dates = data_bank.index
-plt.plot(dates,open_prices)
+def main():
+    store = MarketDataStore("donnees_marche")
+    store.refresh("DSY.PA", "2015-01-01", "2024-12-31")
+    data_bank = store.load_frame("DSY.PA", "2015-01-01", "2024-12-31")
+    print (data_bank.head())
+    close_prices = data_bank['close']
+    open_prices =  data_bank['open']
+    diff_prices = close_prices - open_prices
+    dates = data_bank.index
+    plt.plot(dates,open_prices)
 
-plt.plot(dates,diff_prices)
-plt.title('différences entre prix douverture et de cloture')
+    plt.plot(dates,diff_prices)
+    plt.title('différences entre prix douverture et de cloture')
 
-plt.show()
+    plt.show()
 
+
+if __name__ == "__main__":
+    main()
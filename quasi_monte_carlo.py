@@ -0,0 +1,156 @@
+"""
+Quasi-Monte Carlo shocks for the path simulators.
+
+SobolGenerator replaces the `rng` argument of the simulators that draw all
+the shocks of a block of paths in one (num_paths, num_steps) call:
+AssetPriceSimulator.generate_trajectories / iter_trajectory_chunks,
+MonteCarloHedging.simulate_paths and online_pricer.GeneratePathsGBM. The
+simulators that draw step by step (HestonSimulator, GeneratePathsGBMSteps,
+longstaff_schwartz) would mix up the Sobol dimensions and raise ValueError
+instead. Instead of pseudo-random shocks it returns scrambled Sobol points (scipy.stats.qmc)
+mapped through the inverse normal CDF. With the Brownian-bridge
+construction, the first Sobol coordinates build the terminal value and then
+the successive midpoints of each path. The best-distributed dimensions
+therefore drive the large-scale shape of the path. The shocks are returned
+as standardized increments, so the simulators use them unchanged.
+
+A single scrambled sequence gives no error estimate. rqmc_estimate runs
+independently scrambled replicates and reports the mean and its standard
+error across replicates.
+"""
+from functools import lru_cache
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+from scipy.special import ndtri
+from scipy.stats import qmc
+
+GENERATORS = ("pseudo", "sobol")
+_EPS = np.finfo(np.float64).eps
+
+
+@lru_cache(maxsize=32)
+def brownian_bridge_plan(num_steps: int) -> Tuple[np.ndarray, ...]:
+    """
+    Construction order of a Brownian bridge on the grid 0, 1, ..., num_steps.
+
+    Returns arrays (point, left, right, left_weight, right_weight, std) where
+    the k-th normal builds W[point[k]] from the already known W[left[k]] and
+    W[right[k]] (W[0] = 0): the first one gives the terminal value, then the
+    midpoints are filled breadth first.
+    """
+    point, left, right = [num_steps], [0], [0]
+    left_weight, right_weight, std = [0.0], [0.0], [np.sqrt(num_steps)]
+    intervals = [(0, num_steps)]
+    while intervals:
+        refined = []
+        for a, b in intervals:
+            if b - a < 2:
+                continue
+            m = (a + b) // 2
+            point.append(m)
+            left.append(a)
+            right.append(b)
+            left_weight.append((b - m) / (b - a))
+            right_weight.append((m - a) / (b - a))
+            std.append(np.sqrt((m - a) * (b - m) / (b - a)))
+            refined += [(a, m), (m, b)]
+        intervals = refined
+    plan = tuple(np.array(values) for values in (point, left, right, left_weight, right_weight, std))
+    for values in plan:
+        values.setflags(write=False)
+    return plan
+
+
+def brownian_bridge_increments(Z: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Turn normals Z of shape (num_paths, num_steps), ordered by importance,
+    into the standardized increments W[i + 1] - W[i] of a Brownian motion on a
+    uniform grid, built by Brownian bridge. Each increment is N(0, 1), and the
+    increments of a path are independent.
+    """
+    num_paths, num_steps = Z.shape
+    point, left, right, left_weight, right_weight, std = brownian_bridge_plan(num_steps)
+    W = np.zeros((num_paths, num_steps + 1), dtype=Z.dtype)
+    for k in range(num_steps):
+        column = W[:, point[k]]
+        np.multiply(Z[:, k], std[k], out=column)
+        if left[k] or right[k]:
+            column += left_weight[k] * W[:, left[k]]
+            column += right_weight[k] * W[:, right[k]]
+    return np.subtract(W[:, 1:], W[:, :-1], out=out)
+
+
+class SobolGenerator:
+    """
+    Scrambled Sobol shocks with the subset of the np.random.Generator interface
+    used by the simulators (standard_normal and normal).
+
+    Every call of shape (num_paths, num_steps) continues the same sequence, so
+    drawing a book in chunks gives the same points as drawing it at once. The
+    dimension is fixed by the first call. Sobol points are balanced when the
+    number of paths is a power of two. Any other size raises ValueError: one
+    Sobol point is one whole path.
+    """
+    draws_whole_paths = True  # simulators drawing step by step check this flag and refuse the generator
+
+    def __init__(self, seed=None, bridge: bool = True, scramble: bool = True):
+        self.seed = seed
+        self.bridge = bridge
+        self.scramble = scramble
+        self.engine: Optional[qmc.Sobol] = None
+
+    def _points(self, num_paths: int, num_steps: int) -> np.ndarray:
+        if self.engine is None:
+            self.engine = qmc.Sobol(num_steps, scramble=self.scramble, seed=np.random.default_rng(self.seed))
+        elif self.engine.d != num_steps:
+            raise ValueError(f"generator was started with {self.engine.d} steps, got {num_steps}")
+        points = self.engine.random(num_paths)
+        np.clip(points, _EPS, 1.0 - _EPS, out=points)
+        return points
+
+    def standard_normal(self, size=None, dtype=np.float64) -> np.ndarray:
+        if size is None or np.ndim(size) != 1 or len(size) != 2:
+            raise ValueError(f"SobolGenerator draws whole paths: size must be (num_paths, num_steps), got {size!r}")
+        num_paths, num_steps = size
+        Z = ndtri(self._points(num_paths, num_steps))
+        if self.bridge:
+            Z = brownian_bridge_increments(Z, out=Z)
+        return Z.astype(dtype, copy=False)
+
+    def normal(self, loc=0.0, scale=1.0, size=None) -> np.ndarray:
+        Z = self.standard_normal(size)
+        if scale != 1.0:
+            Z *= scale
+        if loc != 0.0:
+            Z += loc
+        return Z
+
+
+def make_generator(kind: str = "pseudo", seed=None, bridge: bool = True):
+    """Shock generator to pass as `rng` to the simulators: "pseudo" gives
+    np.random.default_rng(seed), "sobol" a SobolGenerator."""
+    if kind == "pseudo":
+        return np.random.default_rng(seed)
+    if kind == "sobol":
+        return SobolGenerator(seed, bridge)
+    raise ValueError(f"unknown generator {kind!r}, expected one of {GENERATORS}")
+
+
+def rqmc_estimate(estimate: Callable[[object], float], num_replicates: int = 16, seed=None,
+                  kind: str = "sobol", bridge: bool = True) -> Dict[str, object]:
+    """
+    Randomized QMC: call estimate(rng) with num_replicates independently
+    scrambled generators and return the mean, its standard error across
+    replicates and the individual estimates. With kind="pseudo" the same
+    procedure gives a plain Monte Carlo reference.
+    """
+    if num_replicates < 2:
+        raise ValueError("at least two replicates are needed for an error estimate")
+    seeds = np.random.SeedSequence(seed).spawn(num_replicates)
+    values = np.array([estimate(make_generator(kind, child, bridge)) for child in seeds], dtype=np.float64)
+    return {
+        "mean": float(values.mean()),
+        "stderr": float(values.std(ddof=1) / np.sqrt(num_replicates)),
+        "replicates": values,
+    }
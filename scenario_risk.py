@@ -0,0 +1,202 @@
+"""
+Scenario revaluation and historical VaR / expected shortfall of an OptionBook.
+
+A scenario moves the spot of every underlying (log shock), shifts every
+volatility (absolute) and moves the valuation date forward (years). Every
+position is fully revalued with the Black-Scholes formula of outils.call / put,
+and the P&L is the change of the book value against the unshocked book.
+
+    engine = ScenarioEngine(book)
+    pnl = engine.revalue(scenario_grid(spot_shocks, vol_shifts, time_shifts))   # spot x vol x time
+    dates, returns = historical_returns(store, book.underlyings, "2015-01-01", "2024-12-31")
+    risk = var_es(engine.revalue(historical_scenarios(returns, horizon=1 / 252)))
+
+The terms that do not depend on the scenario are computed once:
+- Positions on the same contract (underlying, strike, expiry, volatility)
+  are merged. Puts are priced as calls through put-call parity, so a call
+  and a put on the same contract share one evaluation.
+- log(S0 / K) is computed once per contract, and sqrt(T), the drift and
+  K exp(-rT) once per (vol shift, time shift) pair.
+- For each scenario chunk, only d1, d2, their two normal CDFs and two
+  quantity-weighted sums remain. The spot factor S0 exp(x) is applied to the
+  per-underlying sums rather than to every position.
+
+Scenarios are evaluated in chunks of rows sized so that the (rows,
+contracts) temporaries fit in memory_budget bytes (and stay cache-sized).
+The two normal CDFs take most of the time: ~40 ns per contract and scenario
+on one core (benchmarks/run.py; the 1 s target for 10k x 5k is an open
+item of the README).
+"""
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+
+from instrumentation import count, timed
+from option_book import OptionBook
+from outils import ndtr
+
+TRADING_DAYS = 252
+_TEMPORARIES = 4  # (rows, contracts) float64 arrays alive at the same time in a chunk
+_BLOCK_BYTES = 1 << 20  # cache-sized temporaries are faster than one large block, whatever the budget
+
+
+def scenario_grid(spot_shocks: Sequence[float], vol_shifts: Sequence[float] = (0.0,),
+                  time_shifts: Sequence[float] = (0.0,)) -> Dict[str, np.ndarray]:
+    """
+    Every combination of relative spot shocks (-0.1 = spot down 10%, applied
+    to all underlyings), absolute vol shifts and time shifts (years). The
+    scenarios are ordered spot-major, so pnl.reshape(result["shape"]) is
+    indexed [spot, vol, time].
+    """
+    spot, vol, shift = np.meshgrid(np.asarray(spot_shocks, dtype=np.float64),
+                                   np.asarray(vol_shifts, dtype=np.float64),
+                                   np.asarray(time_shifts, dtype=np.float64), indexing="ij")
+    return {"log_spot": np.log1p(spot.ravel()), "vol_shift": vol.ravel(), "time_shift": shift.ravel(),
+            "shape": spot.shape}
+
+
+def historical_scenarios(log_returns: np.ndarray, horizon: float = 1.0 / TRADING_DAYS,
+                         vol_shift: float = 0.0) -> Dict[str, np.ndarray]:
+    """Scenarios from a (num_scenarios, num_underlyings) matrix of log returns over
+    `horizon` years, columns in book.underlyings order."""
+    log_returns = np.asarray(log_returns, dtype=np.float64)
+    n = log_returns.shape[0]
+    return {"log_spot": log_returns, "vol_shift": np.full(n, float(vol_shift)),
+            "time_shift": np.full(n, float(horizon))}
+
+
+def historical_returns(store, tickers: Sequence[str], start=None, end=None,
+                       horizon: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Overlapping `horizon`-day log returns of the close prices of `tickers`
+    stored in a market_data.MarketDataStore, on the dates where every ticker
+    has a price. Returns (dates, returns) with returns of shape
+    (num_dates, len(tickers)), dated by the end of each return period.
+    """
+    dates, close = store.load_panel(tickers, "close", start, end)
+    complete = ~np.isnan(close).any(axis=1)
+    dates, log_close = dates[complete], np.log(close[complete])
+    return dates[horizon:], log_close[horizon:] - log_close[:-horizon]
+
+
+def var_es(pnl: np.ndarray, levels: Sequence[float] = (0.95, 0.99)) -> Dict[str, Dict[float, float]]:
+    """Value-at-risk and expected shortfall of a P&L sample, as positive losses:
+    VaR is the `level` quantile of the loss, ES the mean loss at or beyond it."""
+    loss = -np.asarray(pnl, dtype=np.float64)
+    result = {"var": {}, "es": {}}
+    for level in levels:
+        var = float(np.quantile(loss, level))
+        result["var"][level] = var
+        result["es"][level] = float(loss[loss >= var].mean())
+    return result
+
+
+class ScenarioEngine:
+    """Full revaluation of an OptionBook under spot / vol / time scenarios."""
+
+    def __init__(self, book: OptionBook):
+        if np.isnan(book.spots).any():
+            raise ValueError("every underlying of the book needs a spot")
+        self.underlyings = book.underlyings
+        self.r = book.r
+        self.spots = book.spots.copy()
+
+        # contracts: unique (underlying, strike, expiry, volatility); the book is sorted by
+        # underlying and np.unique keeps that order
+        keys = np.column_stack((book.underlying_index, book.strike, book.expiry - book.time, book.sigma))
+        contracts, index = np.unique(keys, axis=0, return_inverse=True)
+        index = index.ravel()
+        self.underlying_index = contracts[:, 0].astype(np.intp)
+        self.strike, self.T, self.sigma = contracts[:, 1], contracts[:, 2], contracts[:, 3]
+        self.quantity = np.bincount(index, weights=book.quantity, minlength=len(contracts))
+        self.log_moneyness = np.log(self.spots[self.underlying_index] / self.strike)
+        self.spot_weight = self.quantity * self.spots[self.underlying_index]
+
+        # put = call - S + K exp(-rT): the puts add a term linear in the spots
+        put = book.sign < 0.0
+        self._put_quantity = book.quantity[put]
+        self._put_strike = book.strike[put]
+        self._put_T = (book.expiry - book.time)[put]
+        self._put_spot_weight = np.bincount(book.underlying_index[put], weights=book.quantity[put],
+                                            minlength=len(self.underlyings)) * self.spots
+        self.num_positions = len(book)
+        self.base_value = float(self._values(np.zeros((1, len(self.underlyings))), 0.0, 0.0, 1 << 20)[0])
+
+    def __len__(self) -> int:
+        # number of contracts actually evaluated per scenario
+        return len(self.strike)
+
+    def _values(self, log_spot: np.ndarray, vol_shift: float, time_shift: float, memory_budget: int) -> np.ndarray:
+        # book value for rows of log spot shocks, (rows,) or (rows, num_underlyings), at one (vol, time) shift
+        uniform = log_spot.ndim == 1
+        rows = log_spot.shape[0]
+        values = np.zeros(rows)
+
+        T = self.T - time_shift
+        live = T > 0.0
+        sigma = np.maximum(self.sigma + vol_shift, 1e-8)
+        T_live = T[live]
+        vol_sqrt_T = sigma[live] * np.sqrt(T_live)
+        inverse_vol = 1.0 / vol_sqrt_T
+        shift = self.log_moneyness[live] + (self.r + 0.5 * sigma[live] ** 2) * T_live
+        strike_weight = self.quantity[live] * self.strike[live] * np.exp(-self.r * T_live)
+        spot_weight = self.spot_weight[live]
+        underlying = self.underlying_index[live]
+        present, starts = np.unique(underlying, return_index=True)
+
+        chunk = max(1, min(memory_budget // _TEMPORARIES, _BLOCK_BYTES) // (8 * max(len(T_live), 1)))
+        for first in range(0, rows if len(T_live) else 0, chunk):
+            block = log_spot[first:first + chunk]
+            # d1 = (log(S0 / K) + x + (r + sigma^2 / 2) T) / (sigma sqrt(T)), d2 = d1 - sigma sqrt(T)
+            d1 = block[:, None] + shift if uniform else block[:, underlying] + shift
+            d1 *= inverse_vol
+            d2 = d1 - vol_sqrt_T
+            ndtr(d1, out=d1)
+            ndtr(d2, out=d2)
+            # sum_i q_i S0_i exp(x_u) N(d1_i): weighted sums per underlying, then the spot factor
+            if uniform:
+                spot_term = (d1 @ spot_weight) * np.exp(block)
+            else:
+                d1 *= spot_weight
+                spot_term = (np.add.reduceat(d1, starts, axis=1) * np.exp(block[:, present])).sum(axis=1)
+            values[first:first + chunk] = spot_term - d2 @ strike_weight
+
+        if not live.all():
+            # expired during the shift: intrinsic value of the call
+            expired = ~live
+            S = self.spots[self.underlying_index[expired]] * np.exp(
+                log_spot[:, None] if uniform else log_spot[:, self.underlying_index[expired]])
+            values += np.maximum(S - self.strike[expired], 0.0) @ self.quantity[expired]
+
+        # parity term of the puts: sum q (K exp(-r max(T, 0)) - S)
+        put_T = np.maximum(self._put_T - time_shift, 0.0)
+        values += float(self._put_quantity @ (self._put_strike * np.exp(-self.r * put_T)))
+        if uniform:
+            values -= np.exp(log_spot) * self._put_spot_weight.sum()
+        else:
+            values -= np.exp(log_spot) @ self._put_spot_weight
+        return values
+
+    @timed("ScenarioEngine.revalue", "risk")
+    def revalue(self, scenarios: Dict[str, np.ndarray], memory_budget: int = 256 << 20) -> np.ndarray:
+        """
+        P&L of the book in every scenario (book value minus the unshocked
+        value). `scenarios` comes from scenario_grid or historical_scenarios:
+        "log_spot" of shape (n,) (same shock for all underlyings) or (n,
+        num_underlyings), "vol_shift" and "time_shift" of shape (n,).
+        """
+        log_spot = np.asarray(scenarios["log_spot"], dtype=np.float64)
+        vol_shift = np.asarray(scenarios["vol_shift"], dtype=np.float64)
+        time_shift = np.asarray(scenarios["time_shift"], dtype=np.float64)
+        if log_spot.ndim == 2 and log_spot.shape[1] != len(self.underlyings):
+            raise ValueError(f"log_spot needs one column per underlying ({len(self.underlyings)})")
+        pnl = np.empty(len(vol_shift))
+        count("scenarios", len(pnl))
+        # the (vol, time) terms are shared by all the scenarios of a pair
+        pairs, pair_index = np.unique(np.column_stack((vol_shift, time_shift)), axis=0, return_inverse=True)
+        pair_index = pair_index.ravel()
+        for k, (dv, dt) in enumerate(pairs):
+            rows = np.flatnonzero(pair_index == k)
+            pnl[rows] = self._values(log_spot[rows], dv, dt, memory_budget)
+        pnl -= self.base_value
+        return pnl
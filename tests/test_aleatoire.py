@@ -1,7 +1,7 @@
 import unittest
 import numpy as np
 from outils import call, calcul_delta
-from monte_carlo_hedging import MonteCarloHedging  # Adjust if filename differs
+from aleatoire import MonteCarloHedging
 
 class TestMonteCarloHedging(unittest.TestCase):
     def setUp(self):
@@ -44,5 +44,27 @@ class TestMonteCarloHedging(unittest.TestCase):
         self.assertEqual(len(portfolio), 101)
         self.assertTrue(all(np.isfinite(v) for v in portfolio))
 
+    def test_hedging_book_shape(self):
+        book = self.model.simulate_hedging_book(self.paths)
+        self.assertEqual(book["portfolio_values"].shape, (10, 101))
+        self.assertEqual(book["hedging_error"].shape, (10,))
+        self.assertTrue(np.all(np.isfinite(book["portfolio_values"])))
+        self.assertEqual(set(book["stats"]), {"mean", "std", "quantiles"})
+
+    def test_hedging_book_matches_single_path(self):
+        initial_price = call(self.model.S0, self.model.K, self.model.r, self.model.sigma, self.model.T)
+        book = self.model.simulate_hedging_book(self.paths, initial_price)
+        for i in (0, 5):
+            deltas = self.model.compute_deltas(self.paths[i])
+            portfolio = self.model.simulate_hedging_portfolio(self.paths[i], deltas, initial_price)
+            np.testing.assert_allclose(book["portfolio_values"][i], portfolio, rtol=1e-9, atol=1e-9)
+
+    def test_hedging_error_small_with_fine_grid(self):
+        np.random.seed(1)
+        model = MonteCarloHedging(S0=50, K=50, r=0.05, sigma=0.3, T=1, num_paths=2000, num_steps=500)
+        stats = model.simulate_hedging_book(model.simulate_paths())["stats"]
+        self.assertLess(abs(stats["mean"]), 0.05)
+        self.assertLess(stats["std"], 0.5)
+
 if __name__ == "__main__":
     unittest.main()
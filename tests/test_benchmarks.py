@@ -0,0 +1,54 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from benchmarks.run import compare, environment, environment_changes, main
+
+
+def results(**entries):
+    # name -> (rate, peak_bytes)
+    return {"meta": dict(environment(), timestamp="2026-01-01T00:00:00"),
+            "results": {name: {"size": 10, "unit": "paths/s", "rate": rate, "seconds": 10 / rate, "peak_bytes": peak}
+                        for name, (rate, peak) in entries.items()}}
+
+
+class TestCompare(unittest.TestCase):
+    def test_flagged_entries(self):
+        baseline = results(stable=(1000.0, 100), slower=(1000.0, 100), bigger=(1000.0, 100), removed=(1.0, 1))
+        current = results(stable=(800.0, 120), slower=(700.0, 100), bigger=(1000.0, 130), added=(1.0, 1))
+        regressions = compare(current, baseline, threshold=0.25)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith("slower: throughput 700 < baseline 1000 paths/s (-30%)"))
+        self.assertTrue(regressions[1].startswith("bigger: peak memory 130 > baseline 100 bytes (+30%)"))
+        self.assertEqual(compare(current, baseline, threshold=0.5), [])
+
+    def test_environment_changes(self):
+        baseline = results()
+        self.assertEqual(environment_changes(results(), baseline), [])
+        baseline["meta"]["numpy"] = "1.24.3"
+        del baseline["meta"]["cpu_count"]
+        changes = environment_changes(results(), baseline)
+        self.assertEqual([change.split(":")[0] for change in changes], ["numpy", "cpu_count"])
+
+    def test_exit_status(self):
+        with tempfile.TemporaryDirectory() as directory:
+            paths = {name: os.path.join(directory, name) for name in ("baseline.json", "current.json")}
+            arguments = ["--only", "outils.call", "--sizes", "10", "--repeats", "1", "--output", paths["current.json"],
+                         "--baseline", paths["baseline.json"]]
+            for rate, peak, status in ((1e30, 1e30, 1), (1e-9, 1e30, 0), (1e-9, 1, 1)):
+                baseline = results(**{"outils.call[100]": (rate, peak)})
+                with open(paths["baseline.json"], "w") as f:
+                    json.dump(baseline, f)
+                stdout = io.StringIO()
+                with contextlib.redirect_stdout(stdout):
+                    self.assertEqual(main(arguments), status, (rate, peak))
+                self.assertEqual(stdout.getvalue().count("REGRESSION"), status)
+                self.assertNotIn("WARNING", stdout.getvalue())
+            with open(paths["current.json"]) as f:
+                self.assertEqual(list(json.load(f)["results"]), ["outils.call[100]"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+from cli import main as cli_main
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("scipy", "matplotlib", "tkinter", "seaborn", "pandas")
+
+# numpy is imported first and excluded from the timing: it is the floor of every
+# module of the repository (~0.1 s on its own), the budget is for our code
+_IMPORT_PROBE = """
+import sys, time
+import numpy
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(elapsed)
+print(",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+def cold_import(module):
+    # fresh interpreter, so nothing is cached in sys.modules
+    script = _IMPORT_PROBE.format(module=module, heavy=HEAVY_MODULES)
+    output = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=True)
+    elapsed, loaded = output.stdout.split("\n")[:2]
+    return float(elapsed), [m for m in loaded.split(",") if m]
+
+
+class TestCore(unittest.TestCase):
+    def test_cold_import_is_fast(self):
+        # best of three runs to absorb a slow disk or a busy machine
+        elapsed = min(cold_import("core")[0] for _ in range(3))
+        self.assertLess(elapsed, 0.1)
+
+    def test_import_has_no_heavy_dependency(self):
+        for module in ("core", "outils", "online_pricer", "BS_pricer"):
+            self.assertEqual(cold_import(module)[1], [], module)
+
+    def test_core_exports(self):
+        import core
+        for name in core.__all__:
+            self.assertTrue(hasattr(core, name), name)
+        self.assertAlmostEqual(float(core.call(100.0, 95.0, 0.05, 0.2, 0.5)), 9.8727, places=3)
+
+
+class TestCli(unittest.TestCase):
+    def run_cli(self, *argv):
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            self.assertEqual(cli_main(list(argv)), 0)
+        return stdout.getvalue()
+
+    def test_price(self):
+        output = self.run_cli("price", "--S", "100", "--K", "95", "--r", "0.05", "--sigma", "0.2", "--T", "0.5")
+        self.assertIn("price = 9.87", output)
+        self.assertIn("gamma", output)
+
+    def test_scenarios_headless(self):
+        with tempfile.TemporaryDirectory() as directory:
+            np.random.seed(0)
+            self.run_cli("simulate", "--paths", "20", "--steps", "10", "--output", os.path.join(directory, "sim.png"))
+            output = self.run_cli("hedge", "--paths", "50", "--steps", "20", "--output",
+                                  os.path.join(directory, "hedge.svg"))
+            self.assertIn("over 50 paths", output)
+            self.run_cli("mc-hedge", "--paths", "10", "--steps", "20", "--output", os.path.join(directory, "mc.png"))
+            self.run_cli("bs-curve", "--steps", "50", "--output", os.path.join(directory, "bs.png"))
+            self.assertEqual(sorted(os.listdir(directory)),
+                             ["bs.png", "hedge_path.svg", "hedge_pnl.svg", "mc_paths.png", "mc_portfolio.png",
+                              "sim.png"])
+
+
+if __name__ == "__main__":
+    unittest.main()
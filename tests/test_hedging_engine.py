@@ -0,0 +1,67 @@
+import unittest
+import numpy as np
+from hedging_engine import DeltaBand, EveryKSteps, FixedSchedule, HedgeConfig, run_backtest, sweep_configs
+from online_pricer import GeneratePathsGBM, GeneratePathsGBMChunks, HedgingSimulation, OptionType
+
+
+class TestHedgingEngine(unittest.TestCase):
+    def setUp(self):
+        self.args = (0.95, 0.1, 0.2)  # K, r, sigma
+        self.paths = GeneratePathsGBM(500, 50, 1.0, 0.1, 0.2, 1.0, rng=np.random.default_rng(0))
+
+    def test_matches_hedging_simulation(self):
+        with np.errstate(divide="ignore"):
+            reference = HedgingSimulation(300, 40, 1.0, 0.1, 0.2, 1.0, [0.95], OptionType.CALL,
+                                          rng=np.random.default_rng(1))
+        result = run_backtest(reference["S"], reference["time"], *self.args, [HedgeConfig(EveryKSteps(1))],
+                              OptionType.CALL, block_size=64, record_paths=[13], return_errors=True)
+        np.testing.assert_allclose(result["hedging_error"][0], reference["PnL"][:, -1], atol=1e-12)
+        recorded = result["recorded"]
+        np.testing.assert_allclose(recorded["pnl"][0, 0, :-1], reference["PnL"][13, :-1], atol=1e-12)
+        np.testing.assert_allclose(recorded["delta"][0, 0, :-1], reference["DeltaM"][13, :-1], atol=1e-12)
+        np.testing.assert_allclose(recorded["S"][0], reference["S"][13])
+
+    def test_configurations_are_independent(self):
+        configs = sweep_configs([EveryKSteps(1), EveryKSteps(5), DeltaBand(0.05)], [0.0, 0.002], [0.0, 1e-4])
+        self.assertEqual(len(configs), 12)
+        swept = run_backtest(self.paths["S"], self.paths["time"], *self.args, configs, return_errors=True)
+        for c in (0, 5, 11):
+            alone = run_backtest(self.paths["S"], self.paths["time"], *self.args, [configs[c]], return_errors=True)
+            np.testing.assert_allclose(swept["hedging_error"][c], alone["hedging_error"][0])
+            self.assertEqual(swept["stats"][c], alone["stats"][0])
+
+    def test_costs_and_rebalance_counts(self):
+        configs = [HedgeConfig(EveryKSteps(1)), HedgeConfig(EveryKSteps(1), 0.001, 1e-4),
+                   HedgeConfig(EveryKSteps(10)), HedgeConfig(FixedSchedule([0.5])), HedgeConfig(DeltaBand(0.1))]
+        result = run_backtest(self.paths["S"], self.paths["time"], *self.args, configs, return_errors=True)
+        stats = result["stats"]
+        self.assertEqual([s["mean_rebalances"] for s in stats[:4]], [50.0, 50.0, 5.0, 2.0])
+        self.assertLess(stats[4]["mean_rebalances"], 50.0)
+        self.assertEqual(stats[0]["mean_cost"], 0.0)
+        # every cost paid reduces the terminal PnL by its compounded amount
+        self.assertGreater(stats[1]["mean_cost"], 50 * 1e-4)
+        self.assertTrue(np.all(result["hedging_error"][1] < result["hedging_error"][0]))
+        # hedging less often leaves a wider error distribution
+        self.assertGreater(stats[2]["std"], stats[0]["std"])
+
+    def test_chunked_paths(self):
+        configs = [HedgeConfig(DeltaBand(0.02), 0.001)]
+        chunks = list(GeneratePathsGBMChunks(500, 50, 1.0, 0.1, 0.2, 1.0, ChunkSize=128,
+                                             rng=np.random.default_rng(3)))
+        whole = np.concatenate([chunk["S"] for chunk in chunks])
+        streamed = run_backtest(chunks, chunks[0]["time"], *self.args, configs, return_errors=True,
+                                record_paths=[200])
+        direct = run_backtest(whole, chunks[0]["time"], *self.args, configs, return_errors=True,
+                              record_paths=[200])
+        self.assertEqual(streamed["num_paths"], 500)
+        np.testing.assert_allclose(streamed["hedging_error"], direct["hedging_error"])
+        np.testing.assert_allclose(streamed["recorded"]["pnl"], direct["recorded"]["pnl"])
+
+    def test_put(self):
+        result = run_backtest(self.paths["S"], self.paths["time"], *self.args, [HedgeConfig(EveryKSteps(1))],
+                              "put")
+        self.assertLess(abs(result["stats"][0]["mean"]), 5e-3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+import numpy as np
+from heston import HestonSimulator, heston_call_price
+from hedging_engine import EveryKSteps, HedgeConfig, run_backtest
+from monte_carlo_simu import TrajectoryAnalyzer
+from online_pricer import GeneratePathsHeston
+from outils import call
+
+
+class TestHestonSimulator(unittest.TestCase):
+    def setUp(self):
+        # S0, r, v0, kappa, theta, xi, rho, T, steps
+        self.simulator = HestonSimulator(100.0, 0.05, 0.04, 1.5, 0.04, 0.6, -0.7, 1.0, 50)
+
+    def test_shapes_and_chunks(self):
+        S, V = self.simulator.generate_trajectories(1000, rng=np.random.default_rng(0), return_variance=True)
+        self.assertEqual(S.shape, (1000, 51))
+        self.assertEqual(V.shape, (1000, 51))
+        self.assertTrue(np.all(S[:, 0] == 100.0))
+        self.assertTrue(np.all(V >= 0.0))
+        chunks = list(self.simulator.iter_trajectory_chunks(1000, 300, rng=np.random.default_rng(0)))
+        self.assertEqual([chunk.shape[0] for chunk in chunks], [300, 300, 300, 100])
+        self.assertEqual(TrajectoryAnalyzer.compute_mean_trajectory(S).shape, (51,))
+
+    def test_closed_form_reduces_to_black_scholes(self):
+        # theta = v0 and a vanishing vol of vol give a constant variance
+        price = heston_call_price(100.0, 100.0, 0.05, 1.0, 0.04, 2.0, 0.04, 1e-4, 0.0)
+        self.assertAlmostEqual(price, call(100.0, 100.0, 0.05, 0.2, 1.0), places=4)
+
+    def test_prices_match_closed_form(self):
+        S = self.simulator.generate_trajectories(100_000, rng=np.random.default_rng(1))
+        discount = np.exp(-0.05)
+        self.assertAlmostEqual(S[:, -1].mean(), 100.0 / discount, delta=0.15)
+        for K in (80.0, 100.0, 120.0):
+            payoff = discount * np.maximum(S[:, -1] - K, 0.0)
+            exact = heston_call_price(100.0, K, 0.05, 1.0, 0.04, 1.5, 0.04, 0.6, -0.7)
+            self.assertAlmostEqual(payoff.mean(), exact, delta=4 * payoff.std() / np.sqrt(len(payoff)) + 0.02)
+
+    def test_exponential_branch(self):
+        # high vol of vol and a low variance level push the QE scheme to its exponential branch
+        simulator = HestonSimulator(100.0, 0.0, 0.09, 0.5, 0.04, 1.0, -0.9, 2.0, 24)
+        S, V = simulator.generate_trajectories(100_000, rng=np.random.default_rng(2), return_variance=True)
+        self.assertGreater(np.mean(V[:, -1] == 0.0), 0.01)
+        payoff = np.maximum(S[:, -1] - 100.0, 0.0)
+        exact = heston_call_price(100.0, 100.0, 0.0, 2.0, 0.09, 0.5, 0.04, 1.0, -0.9)
+        self.assertAlmostEqual(payoff.mean(), exact, delta=4 * payoff.std() / np.sqrt(len(payoff)) + 0.05)
+
+    def test_generate_paths_heston_feeds_hedging(self):
+        paths = GeneratePathsHeston(500, 50, 1.0, 0.05, 100.0, 0.04, 1.5, 0.04, 0.6, -0.7,
+                                    rng=np.random.default_rng(3))
+        self.assertEqual(set(paths), {"time", "S", "V"})
+        result = run_backtest(paths["S"], paths["time"], 100.0, 0.05, 0.2, [HedgeConfig(EveryKSteps(1))])
+        self.assertTrue(np.isfinite(result["stats"][0]["std"]))
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValueError):
+            HestonSimulator(100.0, 0.05, 0.04, 1.5, 0.04, 0.6, -1.5, 1.0, 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
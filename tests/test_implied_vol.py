@@ -0,0 +1,38 @@
+import unittest
+import numpy as np
+from outils import bs_greeks
+from implied_vol import CONVERGED, OUT_OF_BOUNDS, SIGMA_BOUND, implied_volatility
+
+
+class TestImpliedVolatility(unittest.TestCase):
+    def test_round_trip_chain(self):
+        strikes = np.linspace(60, 160, 41)
+        maturities = np.array([0.05, 0.25, 1.0, 3.0])[:, None]
+        sigma = 0.15 + 0.4 * np.abs(np.log(strikes / 100.0))
+        cp = np.where(strikes < 100, -1.0, 1.0)
+        prices = bs_greeks(100.0, strikes, 0.02, sigma, maturities, cp, ("price",))["price"]
+        result = implied_volatility(prices, 100.0, strikes, 0.02, maturities, cp)
+        self.assertEqual(result["sigma"].shape, (4, 41))
+        self.assertTrue(np.all(result["converged"]))
+        np.testing.assert_allclose(result["sigma"], np.broadcast_to(sigma, (4, 41)), rtol=1e-6)
+        self.assertTrue(np.all(result["iterations"] <= 20))
+
+    def test_out_of_bounds_quotes(self):
+        result = implied_volatility([0.5, 120.0, 10.0], 100.0, [50.0, 100.0, 100.0], 0.0, 1.0, "call")
+        np.testing.assert_array_equal(result["status"], [OUT_OF_BOUNDS, OUT_OF_BOUNDS, CONVERGED])
+        self.assertTrue(np.isnan(result["sigma"][0]))
+        self.assertFalse(result["converged"][1])
+
+    def test_root_outside_sigma_range(self):
+        vols = np.array([12.0, 1e-8, 9.5, 2e-6])
+        strikes = np.full(4, 100.0)
+        prices = bs_greeks(100.0, strikes, 0.0, vols, 1.0, 1.0, ("price",))["price"]
+        result = implied_volatility(prices, 100.0, strikes, 0.0, 1.0, "call")
+        np.testing.assert_array_equal(result["status"], [SIGMA_BOUND, SIGMA_BOUND, CONVERGED, CONVERGED])
+        np.testing.assert_array_equal(result["converged"], [False, False, True, True])
+        np.testing.assert_array_equal(result["sigma"][:2], [10.0, 1e-6])
+        np.testing.assert_allclose(result["sigma"][2:], vols[2:], rtol=1e-6)
+
+
+if __name__ == "__main__":
+    unittest.main()
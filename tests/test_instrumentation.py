@@ -0,0 +1,158 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+import unittest
+import numpy as np
+import instrumentation
+from cli import main as cli_main
+from hedging_engine import EveryKSteps, HedgeConfig, run_backtest
+from instrumentation import SamplingProfiler, count, disable, enabled, recording, span, timed
+from online_pricer import GeneratePathsGBM, GeneratePathsGBMSteps
+from outils import bs_greeks
+
+
+@timed("busy", "run")
+def busy_loop(seconds):
+    """Spin for `seconds`."""
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class TestInstrumentation(unittest.TestCase):
+    def tearDown(self):
+        disable()
+
+    def test_disabled(self):
+        with recording() as recorder:
+            pass
+        self.assertFalse(enabled())
+        # no allocation per disabled span: the shared no-op
+        self.assertIs(span("a"), instrumentation._NULL_SPAN)
+        self.assertIs(span("b", "paths"), span("a"))
+        with span("a"):
+            count("paths_generated", 10)
+            busy_loop(0.0)
+        self.assertEqual((busy_loop.__name__, busy_loop.__doc__), ("busy_loop", "Spin for `seconds`."))
+        # nothing reaches the recorder of a finished run
+        report = recorder.report()
+        self.assertEqual((report["spans"], report["counters"], recorder.events), ({}, {}, []))
+
+    def test_spans_and_counters(self):
+        with recording() as recorder:
+            self.assertTrue(enabled())
+            with span("outer", "hedging"):
+                busy_loop(0.02)
+                with span("inner", "pricing"):
+                    busy_loop(0.01)
+            count("custom", 2)
+            count("custom", 3)
+        self.assertFalse(enabled())
+        report = recorder.report()
+        self.assertEqual(report["counters"], {"custom": 5})
+        spans = report["spans"]
+        self.assertEqual(spans["busy"]["count"], 2)
+        self.assertGreaterEqual(spans["busy"]["total"], 0.03)  # the loops spin at least that long
+        self.assertEqual({name: spans[name]["category"] for name in spans},
+                         {"outer": "hedging", "inner": "pricing", "busy": "run"})
+        for aggregate in spans.values():
+            self.assertLessEqual(aggregate["self"], aggregate["total"])
+        # self time excludes the nested spans: the self times of the tree add up to the outer span
+        self.assertEqual(spans["busy"]["self"], spans["busy"]["total"])
+        self.assertAlmostEqual(sum(aggregate["self"] for aggregate in spans.values()), spans["outer"]["total"],
+                               places=12)
+        # events are recorded on exit, and the nested span lies within its parent
+        spans_events = [event for event in recorder.events if event[0] == "X"]
+        self.assertEqual([event[1] for event in spans_events], ["busy", "busy", "inner", "outer"])
+        (_, _, _, inner_start, inner_duration, _), (_, _, _, outer_start, outer_duration, _) = spans_events[2:]
+        self.assertLessEqual(outer_start, inner_start)
+        self.assertLessEqual(inner_start + inner_duration, outer_start + outer_duration)
+        selfs = [aggregate["self"] for aggregate in spans.values()]
+        self.assertEqual(selfs, sorted(selfs, reverse=True))  # sorted by self time
+        self.assertLessEqual(sum(report["categories"].values()), report["wall_time"])
+
+    def test_stage_counters(self):
+        time_grid = np.linspace(0.0, 1.0, 21)
+        with recording() as recorder:
+            paths = GeneratePathsGBM(500, 20, 1.0, 0.02, 0.2, 100.0, rng=np.random.default_rng(0))
+            bs_greeks(np.full(7, 100.0), 100.0, 0.02, 0.2, 1.0)
+            run_backtest(paths["S"], time_grid, 100.0, 0.02, 0.2, [HedgeConfig(EveryKSteps(1))], block_size=200)
+        report = recorder.report()
+        counters = report["counters"]
+        self.assertEqual(counters["paths_generated"], 500)
+        self.assertEqual(counters["bytes_allocated"], 500 * 21 * 8)
+        self.assertEqual(counters["options_priced"], 7 + 500 * 20 + 500)
+        self.assertEqual(counters["rebalances"], 500 * 20)
+        self.assertEqual(report["spans"]["hedging_engine._hedge_block"]["count"], 3)
+        self.assertEqual(report["spans"]["GeneratePathsGBM"]["category"], "paths")
+        self.assertIn("bs_greeks", report["spans"])
+        self.assertNotIn("ndtr", report["spans"])  # too small to be a span: its callers are
+        self.assertGreater(counters["normal_cdf_evaluations"], 0)
+
+    def test_streamed_paths(self):
+        with recording() as recorder:
+            for _, _, _, S in GeneratePathsGBMSteps(100, 12, 1.0, 0.02, 0.2, 100.0, rng=np.random.default_rng(0)):
+                with span("consumer", "pricing"):
+                    S.sum()
+        report = recorder.report()
+        self.assertEqual(report["spans"]["GeneratePathsGBMSteps"]["count"], 12)
+        self.assertEqual(report["spans"]["GeneratePathsGBMSteps"]["category"], "paths")
+        self.assertEqual(report["counters"]["paths_generated"], 100)
+        # the consumer runs between the steps, outside of their spans
+        names = [event[1] for event in recorder.events if event[0] == "X"]
+        self.assertEqual(names, ["GeneratePathsGBMSteps", "consumer"] * 12)
+
+    def test_chrome_trace(self):
+        with recording() as recorder:
+            with span("stage"):
+                count("items", 4)
+        trace = json.loads(json.dumps(recorder.chrome_trace()))
+        complete = [event for event in trace["traceEvents"] if event["ph"] == "X"]
+        counters = [event for event in trace["traceEvents"] if event["ph"] == "C"]
+        self.assertEqual([event["name"] for event in complete], ["stage"])
+        self.assertGreaterEqual(complete[0]["ts"], 0.0)
+        self.assertEqual(counters[0]["args"], {"items": 4})
+
+    def test_event_limit(self):
+        with recording(max_events=10) as recorder:
+            for _ in range(25):
+                with span("tick"):
+                    pass
+        self.assertEqual(len(recorder.events), 10)
+        self.assertEqual(recorder.dropped_events, 15)
+        self.assertEqual(recorder.report()["spans"]["tick"]["count"], 25)
+
+    def test_sampling_profiler(self):
+        with SamplingProfiler(interval=0.001) as profiler:
+            busy_loop(0.2)
+        self.assertGreater(profiler.total, 0)
+        self.assertEqual(profiler.top(1)[0]["function"], "test_instrumentation.py:busy_loop")
+        stack, hits = profiler.collapsed()[0].rsplit(" ", 1)
+        self.assertTrue(stack.endswith("test_instrumentation.py:busy_loop"))
+        self.assertGreater(int(hits), 0)
+
+    def test_cli(self):
+        with tempfile.TemporaryDirectory() as directory:
+            files = {name: os.path.join(directory, name) for name in ("run.json", "run.trace", "run.folded")}
+            stderr = io.StringIO()
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(stderr):
+                cli_main(["--report", files["run.json"], "--trace", files["run.trace"], "--profile",
+                          files["run.folded"], "mc-hedge", "--paths", "50", "--steps", "20", "--output",
+                          os.path.join(directory, "mc.png")])
+            self.assertFalse(instrumentation.enabled())
+            with open(files["run.json"]) as f:
+                report = json.load(f)
+            self.assertEqual(report["counters"]["paths_generated"], 50)
+            self.assertIn("mc-hedge", report["spans"])
+            self.assertIn("profile", report)
+            with open(files["run.trace"]) as f:
+                self.assertTrue(json.load(f)["traceEvents"])
+            self.assertTrue(os.path.getsize(files["run.folded"]) > 0)
+            self.assertIn("wall time", stderr.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
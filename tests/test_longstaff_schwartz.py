@@ -0,0 +1,52 @@
+import unittest
+import numpy as np
+from longstaff_schwartz import backward_gbm_steps, basis_functions, longstaff_schwartz
+from online_pricer import GeneratePathsGBM
+from outils import call
+
+
+class TestLongstaffSchwartz(unittest.TestCase):
+    def test_backward_bridge_marginals(self):
+        steps = dict(backward_gbm_steps(100_000, 10, 1.0, 0.05, 0.2, 100.0, rng=np.random.default_rng(0)))
+        self.assertEqual(sorted(steps), list(range(1, 11)))
+        for i in (1, 5, 10):
+            log_S = np.log(steps[i] / 100.0)
+            t = i / 10
+            self.assertAlmostEqual(log_S.mean(), (0.05 - 0.02) * t, delta=0.003)
+            self.assertAlmostEqual(log_S.std(), 0.2 * np.sqrt(t), delta=0.003)
+        increments = np.log(steps[6] / steps[5])
+        self.assertAlmostEqual(np.corrcoef(increments, np.log(steps[5]))[0, 1], 0.0, delta=0.02)
+
+    def test_basis_functions(self):
+        x = np.linspace(0.5, 1.5, 7)
+        np.testing.assert_allclose(basis_functions(x, "polynomial", 2), np.column_stack([np.ones(7), x, x ** 2]))
+        laguerre = basis_functions(x, "laguerre", 2)
+        np.testing.assert_allclose(laguerre[:, 2], np.exp(-x / 2) * (1 - 2 * x + x ** 2 / 2))
+        with self.assertRaises(ValueError):
+            basis_functions(x, "hermite")
+
+    def test_longstaff_schwartz_reference_put(self):
+        # Longstaff & Schwartz (2001), table 1: S=36, K=40, r=6%, sigma=20%, T=1, finite-difference value 4.478
+        for basis in ("polynomial", "laguerre"):
+            result = longstaff_schwartz(36.0, 40.0, 0.06, 0.2, 1.0, num_paths=40_000, num_exercise=50, basis=basis,
+                                        lower_bound_paths=40_000, rng=np.random.default_rng(1))
+            self.assertAlmostEqual(result["price"], 4.478, delta=4 * result["stderr"] + 0.01)
+            self.assertAlmostEqual(result["lower_bound"], 4.478, delta=4 * result["lower_bound_stderr"] + 0.02)
+            self.assertGreater(result["price"], result["european"] + 0.5)
+
+    def test_american_call_without_dividends_is_european(self):
+        result = longstaff_schwartz(100.0, 100.0, 0.05, 0.2, 1.0, num_paths=40_000, num_exercise=20,
+                                    option_type="call", rng=np.random.default_rng(2))
+        self.assertAlmostEqual(result["price"], call(100.0, 100.0, 0.05, 0.2, 1.0), delta=4 * result["stderr"])
+
+    def test_path_matrix_input(self):
+        paths = GeneratePathsGBM(20_000, 25, 1.0, 0.06, 0.2, 36.0, rng=np.random.default_rng(3))["S"]
+        result = longstaff_schwartz(36.0, 40.0, 0.06, 0.2, 1.0, num_exercise=25, paths=paths)
+        self.assertEqual(result["num_paths"], 20_000)
+        self.assertAlmostEqual(result["price"], 4.47, delta=0.06)
+        with self.assertRaises(ValueError):
+            longstaff_schwartz(36.0, 40.0, 0.06, 0.2, 1.0, num_exercise=50, paths=paths)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from market_data import COLUMNS, CsvFetcher, Fetcher, MarketDataStore
+
+
+class FakeFetcher(Fetcher):
+    """Business-day bars with close = day number, recording every request."""
+
+    def __init__(self):
+        self.requests = []
+
+    def fetch(self, ticker, start, end):
+        self.requests.append((str(np.datetime64(start, "D")), str(np.datetime64(end, "D"))))
+        dates = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D"))
+        dates = dates[np.is_busday(dates)]
+        close = dates.astype(np.int64).astype(np.float64)
+        columns = {name: close.copy() for name in COLUMNS}
+        columns["date"] = dates
+        return columns
+
+
+class TestMarketDataStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.fetcher = FakeFetcher()
+        self.store = MarketDataStore(self.tmp.name, self.fetcher)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_incremental_refresh_fetches_only_missing_dates(self):
+        self.store.refresh("DSY.PA", "2020-01-01", "2020-07-01")
+        self.store.refresh("DSY.PA", "2020-03-01", "2020-05-01")
+        self.store.refresh("DSY.PA", "2019-06-01", "2021-01-01")
+        self.assertEqual(self.fetcher.requests, [("2020-01-01", "2020-07-01"),
+                                                 ("2019-06-01", "2020-01-01"),
+                                                 ("2020-07-01", "2021-01-01")])
+        data = self.store.load("DSY.PA")
+        self.assertTrue(np.all(np.diff(data["date"].astype(np.int64)) > 0))
+        np.testing.assert_array_equal(data["close"], data["date"].astype(np.int64))
+        self.assertEqual(self.store.tickers(), ["DSY.PA"])
+
+    def test_load_is_memory_mapped_and_sliced(self):
+        data = self.store.get("AIR.PA", "2021-01-01", "2021-12-31")
+        self.assertIsInstance(data["close"], np.memmap)
+        march = self.store.load("AIR.PA", "2021-03-01", "2021-04-01")
+        self.assertEqual(len(march["date"]), 23)
+        self.assertEqual(str(march["date"][0]), "2021-03-01")
+        frame = self.store.load_frame("AIR.PA", "2021-03-01", "2021-04-01")
+        self.assertEqual(list(frame.columns), list(COLUMNS))
+
+    def test_refresh_keeps_loaded_arrays(self):
+        self.store.refresh("DSY.PA", "2020-01-01", "2020-02-01")
+        before = self.store.load("DSY.PA")
+        dates = np.array(before["date"])
+        self.store.refresh("DSY.PA", "2019-12-01", "2020-03-01")
+        # the memory maps of the first load still show the old bars
+        np.testing.assert_array_equal(before["date"], dates)
+        after = self.store.load("DSY.PA")
+        self.assertGreater(len(after["date"]), len(dates))
+        self.assertEqual(sorted(os.listdir(os.path.join(self.tmp.name, "DSY.PA"))), ["meta.json", "v2"])
+
+    def test_tickers_are_the_original_names(self):
+        self.store.refresh(f"odd{os.sep}name", "2021-01-04", "2021-01-09")
+        self.store.refresh("B", "2021-01-04", "2021-01-09")
+        self.assertEqual(self.store.tickers(), ["B", f"odd{os.sep}name"])
+        self.assertEqual(len(self.store.load(f"odd{os.sep}name")["date"]), 5)
+
+    def test_fetcher_is_abstract(self):
+        with self.assertRaises(TypeError):
+            Fetcher()
+
+    def test_panel_alignment(self):
+        self.store.refresh("A", "2021-01-04", "2021-01-09")
+        self.store.refresh("B", "2021-01-06", "2021-01-13")
+        dates, values = self.store.load_panel(["A", "B"])
+        self.assertEqual(values.shape, (7, 2))
+        self.assertTrue(np.isnan(values[0, 1]) and np.isnan(values[-1, 0]))
+
+    def test_csv_fetcher(self):
+        path = os.path.join(self.tmp.name, "X.csv")
+        with open(path, "w") as f:
+            f.write("Date,Open,High,Low,Close,Volume\n2022-01-03,1,2,0.5,1.5,100\n2022-01-04,1.5,2,1,1.8,120\n")
+        store = MarketDataStore(os.path.join(self.tmp.name, "store"), CsvFetcher(self.tmp.name))
+        data = store.get("X", "2022-01-01", "2022-02-01")
+        np.testing.assert_array_equal(data["close"], [1.5, 1.8])
+        self.assertTrue(np.all(np.isnan(data["adj_close"])))
+
+
+if __name__ == "__main__":
+    unittest.main()
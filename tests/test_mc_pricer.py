@@ -0,0 +1,92 @@
+import unittest
+import numpy as np
+from mc_pricer import GREEKS, european_payoff, greek_samples, price_monte_carlo
+from outils import bs_greeks, call, put
+
+
+def asian_payoff(paths):
+    return np.maximum(paths[:, 1:].mean(axis=1) - 100.0, 0.0)
+
+
+class TestPriceMonteCarlo(unittest.TestCase):
+    def setUp(self):
+        self.market = (100.0, 0.05, 0.2, 1.0)  # S0, r, sigma, T
+
+    def test_european_matches_closed_form(self):
+        for K, option_type, pricer in ((110.0, "call", call), (90.0, "put", put)):
+            result = price_monte_carlo(european_payoff(K, option_type), *self.market, target_stderr=0.02,
+                                       rng=np.random.default_rng(0))
+            self.assertTrue(result["converged"])
+            self.assertLessEqual(result["stderr"], 0.02)
+            self.assertLess(abs(result["price"] - pricer(100.0, K, 0.05, 0.2, 1.0)), 4 * result["stderr"])
+
+    def test_control_variates_reduce_paths(self):
+        kwargs = dict(num_steps=12, target_stderr=0.02)
+        plain = price_monte_carlo(asian_payoff, *self.market, control_variates=(),
+                                  rng=np.random.default_rng(1), **kwargs)
+        controlled = price_monte_carlo(asian_payoff, *self.market, rng=np.random.default_rng(1), **kwargs)
+        self.assertLess(3 * controlled["num_paths"], plain["num_paths"])
+        self.assertLess(abs(controlled["price"] - plain["price"]), 4 * (plain["stderr"] + controlled["stderr"]))
+        self.assertEqual(set(controlled["beta"]), {"terminal", "vanilla"})
+
+    def test_target_is_not_overshot(self):
+        result = price_monte_carlo(asian_payoff, *self.market, num_steps=12, target_stderr=0.01,
+                                   rng=np.random.default_rng(2))
+        self.assertTrue(0.008 < result["stderr"] <= 0.01)
+
+    def test_path_and_time_limits(self):
+        result = price_monte_carlo(asian_payoff, *self.market, num_steps=12, target_stderr=1e-6,
+                                   max_paths=10_000, rng=np.random.default_rng(3))
+        self.assertEqual(result["num_paths"], 10_000)
+        self.assertEqual(result["stopped"], "max_paths")
+        self.assertFalse(result["converged"])
+        # an exhausted budget stops after the first batch, however fast the machine
+        result = price_monte_carlo(asian_payoff, *self.market, num_steps=12, time_budget=0.0,
+                                   rng=np.random.default_rng(3))
+        self.assertEqual((result["num_batches"], result["num_paths"]), (1, 2_000))
+        self.assertEqual(result["stopped"], "time_budget")
+        self.assertFalse(result["converged"])
+
+    def test_unknown_control_variate(self):
+        with self.assertRaises(ValueError):
+            price_monte_carlo(asian_payoff, *self.market, control_variates=("delta",))
+
+
+class TestMonteCarloGreeks(unittest.TestCase):
+    def setUp(self):
+        self.market = (100.0, 0.05, 0.2, 1.0)  # S0, r, sigma, T
+        self.exact = bs_greeks(100.0, 105.0, 0.05, 0.2, 1.0)
+
+    def test_european_greeks_every_method(self):
+        for method, num_steps in (("pathwise", 1), ("pathwise", 12), ("lr", 1), ("fd", 12)):
+            result = price_monte_carlo(european_payoff(105.0), *self.market, num_steps=num_steps,
+                                       max_paths=100_000, greeks=GREEKS, greek_method=method,
+                                       rng=np.random.default_rng(0))
+            for name in GREEKS:
+                error = abs(result["greeks"][name] - self.exact[name])
+                self.assertLess(error, 5 * result["greek_stderr"][name] + 1e-3 * abs(self.exact[name]),
+                                (method, num_steps, name))
+
+    def test_pathwise_is_the_default_with_a_gradient(self):
+        paths = np.random.default_rng(1).lognormal(np.log(100.0), 0.2, (1000, 2))
+        paths[:, 0] = 100.0
+        payoff = european_payoff(105.0)
+        np.testing.assert_allclose(greek_samples(payoff, paths, *self.market, ("delta",)),
+                                   greek_samples(payoff, paths, *self.market, ("delta",), "pathwise"))
+
+    def test_likelihood_ratio_matches_finite_differences_on_asian(self):
+        kwargs = dict(num_steps=4, max_paths=100_000, greeks=("delta", "vega", "rho"))
+        lr = price_monte_carlo(asian_payoff, *self.market, rng=np.random.default_rng(2), **kwargs)
+        fd = price_monte_carlo(asian_payoff, *self.market, greek_method="fd", rng=np.random.default_rng(2),
+                               **kwargs)
+        for name in ("delta", "vega", "rho"):
+            tolerance = 5 * (lr["greek_stderr"][name] + fd["greek_stderr"][name])
+            self.assertLess(abs(lr["greeks"][name] - fd["greeks"][name]), tolerance, name)
+
+    def test_unknown_greek(self):
+        with self.assertRaises(ValueError):
+            price_monte_carlo(asian_payoff, *self.market, max_paths=1000, greeks=("vanna",))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,6 @@
 import unittest
 import numpy as np
-from monte_carlo_simu import AssetPriceSimulator, TrajectoryAnalyzer
+from monte_carlo_simu import AssetPriceSimulator, TrajectoryAnalyzer, TrajectoryAccumulator
 
 
 class TestAssetPriceSimulator(unittest.TestCase):
@@ -50,6 +50,89 @@ class TestAssetPriceSimulator(unittest.TestCase):
         self.assertEqual(len(mean_trajectory), self.num_steps + 1)
         self.assertTrue(np.all(np.isfinite(mean_trajectory)))
 
+    def test_array_trajectories_shape(self):
+        """Test that the batched engine returns a (num_trajectories, num_steps + 1) array."""
+        # (FR) Vérifie la forme du tableau renvoyé par le moteur vectorisé.
+        trajectories = self.simulator.generate_trajectories(self.num_trajectories)
+        self.assertEqual(trajectories.shape, (self.num_trajectories, self.num_steps + 1))
+        self.assertTrue(np.all(trajectories[:, 0] == self.initial_price))
+        self.assertTrue(np.all(trajectories > 0))
+
+    def test_array_trajectories_match_loop(self):
+        """Test that the batched engine reproduces the per-step loop for the same seed."""
+        # (FR) Vérifie que le moteur vectorisé reproduit la boucle pas à pas.
+        np.random.seed(0)
+        expected = [self.simulator.generate_single_trajectory() for _ in range(3)]
+        np.random.seed(0)
+        trajectories = self.simulator.generate_trajectories(3)
+        np.testing.assert_allclose(trajectories, expected, rtol=1e-10)
+
+    def test_array_trajectories_float32_out(self):
+        """Test the float32 option and the preallocated output buffer."""
+        # (FR) Vérifie l'option float32 et le buffer de sortie préalloué.
+        buffer = np.empty((self.num_trajectories, self.num_steps + 1), dtype=np.float32)
+        trajectories = self.simulator.generate_trajectories(self.num_trajectories, out=buffer)
+        self.assertIs(trajectories, buffer)
+        self.assertEqual(trajectories.dtype, np.float32)
+        with self.assertRaises(ValueError):
+            self.simulator.generate_trajectories(self.num_trajectories + 1, out=buffer)
+
+    def test_mean_trajectory_accepts_array(self):
+        """Test that the analyzer reduces an array without converting it to lists."""
+        # (FR) Vérifie que l'analyseur accepte directement un tableau.
+        trajectories = self.simulator.generate_trajectories(self.num_trajectories)
+        mean_trajectory = TrajectoryAnalyzer.compute_mean_trajectory(trajectories)
+        self.assertIsInstance(mean_trajectory, np.ndarray)
+        np.testing.assert_allclose(mean_trajectory, trajectories.mean(axis=0))
+
+
+class TestTrajectoryAccumulator(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(3)
+        self.simulator = AssetPriceSimulator(100.0, 0.1, 0.3, 1.0, 20)
+        self.trajectories = self.simulator.generate_trajectories(5000)
+
+    def test_chunks_cover_all_paths(self):
+        """Test that the chunked mode yields blocks of bounded size covering every path."""
+        # (FR) Vérifie que les blocs sont bornés et couvrent toutes les trajectoires.
+        chunks = list(self.simulator.iter_trajectory_chunks(1050, 400))
+        self.assertEqual([chunk.shape[0] for chunk in chunks], [400, 400, 250])
+        self.assertTrue(all(chunk.shape[1] == 21 for chunk in chunks))
+
+    def test_streaming_matches_in_memory(self):
+        """Test that block-wise statistics match the in-memory computation."""
+        # (FR) Vérifie que les statistiques par blocs égalent le calcul en mémoire.
+        chunks = np.array_split(self.trajectories, 7)
+        accumulator = TrajectoryAnalyzer.accumulate(chunks)
+        self.assertEqual(accumulator.count, 5000)
+        np.testing.assert_allclose(accumulator.mean, self.trajectories.mean(axis=0), rtol=1e-12)
+        np.testing.assert_allclose(accumulator.variance(ddof=1), self.trajectories.var(axis=0, ddof=1), rtol=1e-10)
+        np.testing.assert_array_equal(accumulator.min, self.trajectories.min(axis=0))
+        np.testing.assert_array_equal(accumulator.max, self.trajectories.max(axis=0))
+        qs = [0.01, 0.25, 0.5, 0.75, 0.99]
+        exact = np.quantile(self.trajectories, qs, axis=0, method='lower')
+        np.testing.assert_allclose(accumulator.quantiles(qs), exact, rtol=2 * accumulator.relative_accuracy)
+
+    def test_merge_accumulators(self):
+        """Test that merging two accumulators equals accumulating everything at once."""
+        # (FR) Vérifie que la fusion de deux accumulateurs équivaut à un accumulateur unique.
+        left = TrajectoryAnalyzer.accumulate([self.trajectories[:1234]])
+        right = TrajectoryAnalyzer.accumulate([self.trajectories[1234:]])
+        whole = TrajectoryAnalyzer.accumulate([self.trajectories])
+        left.merge(right)
+        np.testing.assert_allclose(left.mean, whole.mean, rtol=1e-12)
+        np.testing.assert_allclose(left.variance(), whole.variance(), rtol=1e-10)
+        np.testing.assert_array_equal(left.quantiles([0.1, 0.9]), whole.quantiles([0.1, 0.9]))
+
+    def test_signed_values(self):
+        """Test quantiles of data with negative values and zeros."""
+        # (FR) Vérifie les quantiles de données signées.
+        data = np.concatenate((np.random.normal(size=(999, 3)), np.zeros((1, 3))))
+        accumulator = TrajectoryAccumulator().update(data)
+        qs = [0.05, 0.5, 0.95]
+        exact = np.quantile(data, qs, axis=0, method='lower')
+        np.testing.assert_allclose(accumulator.quantiles(qs), exact, rtol=0.02, atol=1e-12)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import numpy as np
+from online_pricer import GeneratePathsGBM, GeneratePathsGBMChunks
+
+
+def legacy_paths(NoOfPaths, NoOfSteps, T, r, sigma, S_0):
+    # reference step-by-step implementation of the original generator
+    Z = np.random.normal(0.0, 1.0, [NoOfPaths, NoOfSteps])
+    X = np.zeros([NoOfPaths, NoOfSteps + 1])
+    X[:, 0] = np.log(S_0)
+    dt = T / float(NoOfSteps)
+    for i in range(0, NoOfSteps):
+        if NoOfPaths > 1:
+            Z[:, i] = (Z[:, i] - np.mean(Z[:, i])) / np.std(Z[:, i])
+        X[:, i + 1] = X[:, i] + (r - 0.5 * sigma * sigma) * dt + sigma * np.power(dt, 0.5) * Z[:, i]
+    return np.exp(X)
+
+
+class TestGeneratePathsGBM(unittest.TestCase):
+    def setUp(self):
+        self.args = (200, 50, 1.0, 0.1, 0.2, 1.0)
+
+    def test_shape_and_time_grid(self):
+        paths = GeneratePathsGBM(*self.args)
+        self.assertEqual(set(paths), {"time", "S"})
+        self.assertEqual(paths["S"].shape, (200, 51))
+        np.testing.assert_allclose(paths["time"], np.linspace(0.0, 1.0, 51))
+        self.assertTrue(np.all(paths["S"][:, 0] == 1.0))
+
+    def test_matches_legacy_generator(self):
+        np.random.seed(2)
+        expected = legacy_paths(*self.args)
+        np.random.seed(2)
+        S = GeneratePathsGBM(*self.args)["S"]
+        np.testing.assert_allclose(S, expected, rtol=1e-10)
+
+    def test_moment_matching(self):
+        S = GeneratePathsGBM(*self.args)["S"]
+        increments = np.diff(np.log(S), axis=1)
+        np.testing.assert_allclose(increments.std(axis=0), 0.2 * np.sqrt(1.0 / 50))
+        np.testing.assert_allclose(increments.mean(axis=0), (0.1 - 0.5 * 0.2 ** 2) / 50)
+
+    def test_antithetic_pairs(self):
+        S = GeneratePathsGBM(201, 50, 1.0, 0.1, 0.2, 1.0, MomentMatching=False, Antithetic=True)["S"]
+        drift = (0.1 - 0.5 * 0.2 ** 2) / 50
+        increments = np.diff(np.log(S), axis=1) - drift
+        np.testing.assert_allclose(increments[:100], -increments[101:201], atol=1e-12)
+
+    def test_chunks(self):
+        chunks = list(GeneratePathsGBMChunks(*self.args, ChunkSize=64))
+        self.assertEqual([chunk["S"].shape[0] for chunk in chunks], [64, 64, 64, 8])
+
+
+if __name__ == "__main__":
+    unittest.main()
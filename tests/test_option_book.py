@@ -0,0 +1,95 @@
+import unittest
+import numpy as np
+from instrumentation import recording
+from option_book import OptionBook
+from outils import GREEKS, bs_greeks
+
+
+class TestOptionBook(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        n = 2000
+        self.names = np.array(["AAA", "BBB", "CCC", "DDD"])[rng.integers(0, 4, n)]
+        self.types = np.where(rng.random(n) < 0.5, "call", "put")
+        self.strikes = rng.uniform(80.0, 120.0, n)
+        self.expiries = rng.choice([0.25, 0.5, 1.0, 2.0], n)
+        self.quantities = rng.integers(-10, 11, n).astype(float)
+        self.sigma = rng.uniform(0.1, 0.4, n)
+        self.spots = {"AAA": 100.0, "BBB": 95.0, "CCC": 105.0, "DDD": 110.0}
+        self.book = OptionBook(self.names, self.types, self.strikes, self.expiries, self.quantities, self.sigma,
+                               r=0.02, spots=self.spots)
+
+    def reference(self, spots, time=0.0):
+        S = np.array([spots[name] for name in self.names])
+        signs = np.where(self.types == "call", 1.0, -1.0)
+        return bs_greeks(S, self.strikes, 0.02, self.sigma, self.expiries - time, signs)
+
+    def assert_matches(self, reference):
+        for greek in GREEKS:
+            np.testing.assert_allclose(self.book.positions(greek), reference[greek], rtol=1e-12, atol=1e-12)
+        risk = self.book.risk()
+        for k, name in enumerate(risk["underlyings"]):
+            mine = self.names == name
+            for greek in GREEKS:
+                self.assertAlmostEqual(risk["by_underlying"][greek][k],
+                                       float(reference[greek][mine] @ self.quantities[mine]), places=8)
+        self.assertAlmostEqual(risk["total"]["vega"], float(reference["vega"] @ self.quantities), places=8)
+
+    def test_layout(self):
+        self.assertEqual(len(self.book), 2000)
+        self.assertEqual(self.book.underlyings, ["AAA", "BBB", "CCC", "DDD"])
+        self.assertTrue(np.all(np.diff(self.book.underlying_index) >= 0))
+        np.testing.assert_array_equal(self.book.strike, self.strikes[self.book.order])
+        self.assertTrue(self.book.strike.flags["C_CONTIGUOUS"])
+
+    def test_full_pricing(self):
+        self.assert_matches(self.reference(self.spots))
+
+    def test_incremental_update(self):
+        before = self.book.risk()["by_underlying"]["price"]
+        self.book.update_spot("BBB", 97.5)
+        after = self.book.risk()["by_underlying"]["price"]
+        np.testing.assert_array_equal(after[[0, 2, 3]], before[[0, 2, 3]])
+        self.assertNotEqual(after[1], before[1])
+        self.assert_matches(self.reference(dict(self.spots, BBB=97.5)))
+
+    def test_time_and_volatility(self):
+        self.book.set_time(0.1)
+        self.assert_matches(self.reference(self.spots, time=0.1))
+        self.sigma = np.full(len(self.sigma), 0.3)
+        self.book.set_volatility(0.3)
+        self.assert_matches(self.reference(self.spots, time=0.1))
+        with self.assertRaises(ValueError):
+            self.book.set_time(0.3)
+        # a rejected valuation date leaves the book as it was
+        self.assertEqual(self.book.time, 0.1)
+        self.book.set_volatility(self.sigma)
+        self.assert_matches(self.reference(self.spots, time=0.1))
+        with self.assertRaises(ValueError):
+            OptionBook(["X"], "call", [100.0], [1.0], [1.0], time=1.0)
+
+    def test_unset_spot_is_nan(self):
+        book = OptionBook(["X", "Y"], "call", [100.0, 100.0], [1.0, 1.0], [1.0, 2.0], spots={"X": 100.0})
+        risk = book.risk()
+        self.assertFalse(np.isnan(risk["by_underlying"]["price"][0]))
+        self.assertTrue(np.isnan(risk["by_underlying"]["price"][1]))
+
+    def test_tick_cost(self):
+        rng = np.random.default_rng(1)
+        n = 50_000
+        names = [f"U{k:02d}" for k in rng.integers(0, 50, n)]
+        book = OptionBook(names, np.where(rng.random(n) < 0.5, "call", "put"), rng.uniform(80.0, 120.0, n),
+                          rng.choice([0.25, 0.5, 1.0], n), np.ones(n), 0.2, 0.01,
+                          spots={f"U{k:02d}": 100.0 for k in range(50)})
+        # a tick reprices the positions of its underlying only, whatever the size of the book
+        with recording() as recorder:
+            for i in range(200):
+                book.update_spot("U07", 100.0 + 0.01 * i)
+                book.risk()
+        report = recorder.report()
+        self.assertEqual(report["counters"]["options_priced"], 200 * np.count_nonzero(np.array(names) == "U07"))
+        self.assertNotIn("OptionBook.reprice_all", report["spans"])
+
+
+if __name__ == "__main__":
+    unittest.main()
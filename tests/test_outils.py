@@ -0,0 +1,61 @@
+import unittest
+import numpy as np
+from scipy.stats import norm
+from outils import GREEKS, bs_greeks, calcul_delta, call, put
+
+
+def reference_call(S, K, r, sigma, T):
+    d1 = (np.log(S / K) + (r + sigma ** 2 / 2) * T) / (sigma * np.sqrt(T))
+    d2 = d1 - sigma * np.sqrt(T)
+    return S * norm.cdf(d1) - K * np.exp(-r * T) * norm.cdf(d2)
+
+
+class TestBlackScholesKernel(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.S = rng.uniform(50, 150, 200)
+        self.K = rng.uniform(60, 140, 200)
+        self.r = 0.03
+        self.sigma = rng.uniform(0.1, 0.6, 200)
+        self.T = rng.uniform(0.05, 2.0, 200)
+
+    def test_wrappers_match_reference(self):
+        args = (self.S, self.K, self.r, self.sigma, self.T)
+        np.testing.assert_allclose(call(*args), reference_call(*args), rtol=1e-12, atol=1e-12)
+        parity = self.S - self.K * np.exp(-self.r * self.T)
+        np.testing.assert_allclose(call(*args) - put(*args), parity, atol=1e-10)
+        self.assertAlmostEqual(calcul_delta(100.0, 95.0, 0.05, 0.2, 0.25),
+                               norm.cdf((np.log(100 / 95) + 0.07 * 0.25) / (0.2 * 0.5)), places=12)
+
+    def test_greeks_match_finite_differences(self):
+        for option_type in ("call", "put"):
+            g = bs_greeks(self.S, self.K, self.r, self.sigma, self.T, option_type)
+            price = lambda S=self.S, r=self.r, sigma=self.sigma, T=self.T: \
+                bs_greeks(S, self.K, r, sigma, T, option_type, ("price",))["price"]
+            h = 1e-4
+            np.testing.assert_allclose(g["delta"], (price(S=self.S + h) - price(S=self.S - h)) / (2 * h), atol=1e-6)
+            np.testing.assert_allclose(g["gamma"], (price(S=self.S + h) - 2 * g["price"] + price(S=self.S - h)) / h ** 2,
+                                       atol=1e-4)
+            np.testing.assert_allclose(g["vega"], (price(sigma=self.sigma + h) - price(sigma=self.sigma - h)) / (2 * h),
+                                       atol=1e-5)
+            np.testing.assert_allclose(g["rho"], (price(r=self.r + h) - price(r=self.r - h)) / (2 * h), atol=1e-5)
+            np.testing.assert_allclose(g["theta"], -(price(T=self.T + h) - price(T=self.T - h)) / (2 * h), atol=1e-5)
+
+    def test_mixed_types_and_subset(self):
+        cp = np.where(np.arange(200) % 2 == 0, 1.0, -1.0)
+        g = bs_greeks(self.S, self.K, self.r, self.sigma, self.T, cp, ("price", "delta"))
+        self.assertEqual(set(g), {"price", "delta"})
+        np.testing.assert_allclose(g["price"][::2], call(self.S, self.K, self.r, self.sigma, self.T)[::2])
+        np.testing.assert_allclose(g["price"][1::2], put(self.S, self.K, self.r, self.sigma, self.T)[1::2])
+        self.assertEqual(set(bs_greeks(100.0, 100.0, 0.0, 0.2, 1.0)), set(GREEKS))
+        with self.assertRaises(ValueError):
+            bs_greeks(100.0, 100.0, 0.0, 0.2, 1.0, greeks=("charm",))
+
+    def test_broadcasting(self):
+        spots = np.linspace(80, 120, 5)[:, None]
+        vols = np.linspace(0.1, 0.5, 4)[None, :]
+        self.assertEqual(call(spots, 100.0, 0.01, vols, 1.0).shape, (5, 4))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,29 @@
+import unittest
+import numpy as np
+from outils import call
+from parallel_mc import hedge_parallel, price_european_parallel, shard_sizes
+
+
+class TestParallelMonteCarlo(unittest.TestCase):
+    def test_shard_sizes(self):
+        self.assertEqual(shard_sizes(10, 3), [4, 3, 3])
+        self.assertEqual(sum(shard_sizes(100_001, 7)), 100_001)
+
+    def test_price_reproducible_and_accurate(self):
+        kwargs = dict(S0=100.0, K=95.0, r=0.05, sigma=0.2, T=0.5, num_paths=40_000, seed=11)
+        first = price_european_parallel(num_workers=2, **kwargs)
+        second = price_european_parallel(num_workers=2, **kwargs)
+        self.assertEqual(first["price"], second["price"])
+        np.testing.assert_array_equal(first["path_stats"].mean, second["path_stats"].mean)
+        self.assertLess(abs(first["price"] - call(100.0, 95.0, 0.05, 0.2, 0.5)), 4 * first["stderr"])
+
+    def test_results_depend_on_shards_not_scheduling(self):
+        kwargs = dict(S0=50.0, K=50.0, r=0.05, sigma=0.3, T=1.0, num_paths=600, num_steps=50, seed=5)
+        pooled = hedge_parallel(num_workers=3, **kwargs)
+        in_process = hedge_parallel(num_workers=1, num_shards=3, **kwargs)
+        np.testing.assert_array_equal(pooled["hedging_error"], in_process["hedging_error"])
+        self.assertEqual(pooled["hedging_error"].shape, (600,))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+import numpy as np
+from heston import HestonSimulator
+from monte_carlo_simu import AssetPriceSimulator
+from path_store import PathStore, StoredPaths, path_key
+
+GBM = {"initial_price": 100.0, "mu": 0.05, "sigma": 0.2, "total_time": 1.0}
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestPathStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = PathStore(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def reference(self, num_paths=1000, num_steps=50, seed=3):
+        simulator = AssetPriceSimulator(GBM["initial_price"], GBM["mu"], GBM["sigma"], GBM["total_time"], num_steps)
+        return simulator.generate_trajectories(num_paths, rng=np.random.default_rng(seed))
+
+    def test_key(self):
+        request = {"model": "gbm", "params": {"mu": 0.05, "sigma": 0.2}, "seed": 1}
+        self.assertEqual(path_key(request), path_key({"seed": 1, "params": {"sigma": 0.2, "mu": 0.05}, "model": "gbm"}))
+        self.assertEqual(path_key(request), path_key(dict(request, params={"mu": np.float64(0.05), "sigma": 0.2})))
+        self.assertEqual(path_key(dict(request, params={"mu": 0.05, "sigma": 0.2, "initial_price": 100})),
+                         path_key(dict(request, params={"mu": 0.05, "sigma": 0.2, "initial_price": 100.0})))
+        self.assertNotEqual(path_key(request), path_key(dict(request, seed=2)))
+
+    def test_round_trip_and_cache(self):
+        paths = self.store.get_or_simulate("gbm", 1000, 50, seed=3, chunk_size=300, **GBM)
+        np.testing.assert_array_equal(paths.prices(), self.reference())
+        np.testing.assert_allclose(paths.time, np.linspace(0.0, 1.0, 51))
+        self.assertEqual(paths.meta["params"], GBM)
+        self.assertEqual((paths.meta["seed"], paths.meta["num_steps"], len(paths)), (3, 50, 1000))
+
+        again = self.store.get_or_simulate("gbm", 1000, 50, seed=3, **dict(GBM, initial_price=100, total_time=1))
+        self.assertEqual(self.store.stats, {"hits": 1, "misses": 1})
+        self.assertIsInstance(again.data, np.memmap)
+        self.assertFalse(again.data.flags.writeable)
+        np.testing.assert_array_equal(again.data, paths.data)
+
+        self.store.get_or_simulate("gbm", 1000, 50, seed=4, **GBM)
+        with self.assertRaises(ValueError):
+            # unseeded paths could never be reused: they are not stored
+            self.store.get_or_simulate("gbm", 1000, 50, seed=None, **GBM)
+        self.assertEqual(self.store.stats, {"hits": 1, "misses": 2})
+        self.assertEqual(len(self.store.keys()), 2)
+        # no staging directory is left behind
+        self.assertEqual(sorted(os.listdir(self.directory.name)), self.store.keys())
+
+    def test_compact_layouts(self):
+        reference = self.reference()
+        single = self.store.get_or_simulate("gbm", 1000, 50, seed=3, dtype="float32", **GBM)
+        self.assertEqual(single.data.dtype, np.float32)
+        np.testing.assert_allclose(single.prices(), reference, rtol=1e-7)
+
+        increments = self.store.get_or_simulate("gbm", 1000, 50, seed=3, dtype="float32", layout="log_increments",
+                                                **GBM)
+        self.assertEqual(increments.data.shape, (1000, 50))
+        np.testing.assert_allclose(increments.prices(), reference, rtol=1e-6)
+        np.testing.assert_allclose(increments.prices([5, 7]), reference[[5, 7]], rtol=1e-6)
+        chunks = list(increments.iter_chunks(300))
+        self.assertEqual([len(chunk) for chunk in chunks], [300, 300, 300, 100])
+        np.testing.assert_allclose(np.vstack(chunks), reference, rtol=1e-6)
+        self.assertEqual(os.path.getsize(os.path.join(increments.directory, "paths.npy")) // 1000,
+                         os.path.getsize(os.path.join(single.directory, "paths.npy")) * 50 // 51 // 1000)
+
+    def test_models(self):
+        params = {"initial_price": 100.0, "mu": 0.02, "v0": 0.04, "kappa": 2.0, "theta": 0.04, "xi": 0.3,
+                  "rho": -0.7, "total_time": 1.0}
+        heston = self.store.get_or_simulate("heston", 200, 20, seed=5, **params)
+        simulator = HestonSimulator(*params.values(), 20)
+        expected = np.vstack(list(simulator.iter_trajectory_chunks(200, 100_000, rng=np.random.default_rng(5))))
+        np.testing.assert_array_equal(heston.prices(), expected)
+        # Heston paths depend on the chunking: another chunk size is another entry
+        rechunked = self.store.get_or_simulate("heston", 200, 20, seed=5, chunk_size=50, **params)
+        self.assertNotEqual(rechunked.meta["key"], heston.meta["key"])
+        self.assertEqual(rechunked.meta["chunk_size"], 50)
+        expected = np.vstack(list(simulator.iter_trajectory_chunks(200, 50, rng=np.random.default_rng(5))))
+        np.testing.assert_array_equal(rechunked.prices(), expected)
+
+        matched = self.store.get_or_simulate("gbm_moment_matched", 500, 20, seed=5, S_0=100.0, r=0.03, sigma=0.2,
+                                             T=1.0)
+        # moment matching: the sample mean of the final log price is exact
+        mean = np.log(100.0) + (0.03 - 0.5 * 0.2 ** 2)
+        self.assertAlmostEqual(np.log(matched.prices()[:, -1]).mean(), mean, places=10)
+
+        with self.assertRaises(ValueError):
+            self.store.get_or_simulate("sabr", 10, 10, seed=1)
+        with self.assertRaises(ValueError):
+            self.store.get_or_simulate("gbm", 10, 10, seed=1, layout="returns", **GBM)
+        with self.assertRaises(KeyError):
+            self.store.open("0" * 24)
+
+    def test_reopen_from_another_process(self):
+        paths = self.store.get_or_simulate("gbm", 1000, 50, seed=3, **GBM)
+        code = ("import sys, numpy as np; from path_store import PathStore; "
+                "p = PathStore(sys.argv[1]).open(sys.argv[2]); print(repr(float(np.asarray(p.prices()).sum())))")
+        output = subprocess.run([sys.executable, "-c", code, self.directory.name, paths.meta["key"]], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout
+        self.assertEqual(float(output), float(paths.prices().sum()))
+        with open(os.path.join(paths.directory, "meta.json")) as f:
+            self.assertEqual(json.load(f)["key"], paths.meta["key"])
+
+    def test_cli_store(self):
+        from cli import main
+        output = os.path.join(self.directory.name, "sim.png")
+        for _ in range(2):
+            self.assertEqual(main(["simulate", "--paths", "20", "--steps", "10", "--seed", "1",
+                                   "--store", self.directory.name, "--output", output]), 0)
+        self.assertEqual(len(self.store.keys()), 1)
+        self.assertTrue(os.path.exists(output))
+        with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            main(["simulate", "--store", self.directory.name, "--output", output])
+        self.assertEqual(len(self.store.keys()), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+import numpy as np
+from mc_pricer import price_monte_carlo
+from online_pricer import GeneratePathsGBM, GeneratePathsGBMChunks, GeneratePathsGBMSteps
+from outils import call
+from payoffs import (AsianArithmetic, AsianGeometric, Barrier, Lookback, PathPayoff, evaluate_chunks,
+                     evaluate_streaming, geometric_asian_price)
+
+
+class TestPathPayoffs(unittest.TestCase):
+    def setUp(self):
+        self.market = (1.0, 0.05, 0.2, 100.0)  # T, r, sigma, S_0
+        self.paths = GeneratePathsGBM(2000, 20, *self.market, rng=np.random.default_rng(0))
+        self.S = self.paths["S"]
+
+    def test_matrix_evaluation_matches_direct_formulas(self):
+        S = self.S
+        np.testing.assert_allclose(AsianArithmetic(100.0)(S), np.maximum(S[:, 1:].mean(axis=1) - 100.0, 0.0))
+        np.testing.assert_allclose(AsianGeometric(100.0, "put")(S),
+                                   np.maximum(100.0 - np.exp(np.log(S[:, 1:]).mean(axis=1)), 0.0))
+        np.testing.assert_allclose(Lookback()(S), S[:, -1] - S.min(axis=1))
+        np.testing.assert_allclose(Lookback(110.0)(S), np.maximum(S.max(axis=1) - 110.0, 0.0))
+        # knock-in + knock-out = vanilla, path by path
+        in_and_out = Barrier(100.0, 90.0, knock="in", sigma=0.2, T=1.0)(S) + Barrier(100.0, 90.0, sigma=0.2, T=1.0)(S)
+        np.testing.assert_allclose(in_and_out, np.maximum(S[:, -1] - 100.0, 0.0))
+        knocked = (S <= 90.0).any(axis=1)
+        np.testing.assert_allclose(Barrier(100.0, 90.0)(S), np.where(knocked, 0.0, np.maximum(S[:, -1] - 100.0, 0.0)))
+
+    def test_streaming_matches_matrix(self):
+        payoffs = {"asian": AsianArithmetic(100.0), "uo": Barrier(100.0, 120.0, "up", "out", sigma=0.2),
+                   "lookback": Lookback(sigma=0.2)}
+        streamed = evaluate_streaming(payoffs, GeneratePathsGBMSteps(500, 20, *self.market,
+                                                                     rng=np.random.default_rng(1)))
+        steps = list(GeneratePathsGBMSteps(500, 20, *self.market, rng=np.random.default_rng(1)))
+        S = np.column_stack([steps[0][2]] + [step[3] for step in steps])
+        for name, payoff in payoffs.items():
+            np.testing.assert_allclose(streamed[name], payoff(S, dt=0.05), err_msg=name)
+
+    def test_chunks(self):
+        chunks = list(GeneratePathsGBMChunks(1000, 20, *self.market, ChunkSize=300, rng=np.random.default_rng(2)))
+        values = evaluate_chunks({"asian": AsianGeometric(100.0)}, chunks)["asian"]
+        self.assertEqual(values.shape, (1000,))
+        np.testing.assert_allclose(values[300:600], AsianGeometric(100.0)(chunks[1]["S"]))
+
+    def test_chunks_of_plain_matrices(self):
+        # no time grid: the continuous-monitoring correction uses dt = T / num_steps, as in __call__
+        payoffs = {"barrier": Barrier(100.0, 90.0, sigma=0.2, T=1.0), "lookback": Lookback(sigma=0.2, T=1.0)}
+        values = evaluate_chunks(payoffs, [self.S[:1200], self.S[1200:]])
+        for name, payoff in payoffs.items():
+            np.testing.assert_allclose(values[name], payoff(self.S), rtol=1e-12)
+        dated = evaluate_chunks(payoffs, [{"time": self.paths["time"], "S": self.S}])
+        np.testing.assert_allclose(dated["barrier"], values["barrier"], rtol=1e-12)
+        with self.assertRaises(ValueError):
+            evaluate_chunks({"barrier": Barrier(100.0, 90.0, sigma=0.2)}, [self.S])
+
+    def test_prices_against_closed_forms(self):
+        payoffs = {"geometric": AsianGeometric(100.0), "out": Barrier(100.0, 90.0, sigma=0.2),
+                   "in": Barrier(100.0, 90.0, knock="in", sigma=0.2)}
+        values = evaluate_streaming(payoffs, GeneratePathsGBMSteps(100_000, 20, *self.market,
+                                                                   rng=np.random.default_rng(3)))
+        discount = np.exp(-0.05)
+        price = {name: discount * value.mean() for name, value in values.items()}
+        stderr = {name: discount * value.std() / np.sqrt(100_000) for name, value in values.items()}
+        self.assertLess(abs(price["geometric"] - geometric_asian_price(100.0, 100.0, 0.05, 0.2, 1.0, 20)),
+                        4 * stderr["geometric"])
+        # continuously monitored down-and-out call (Merton / Reiner-Rubinstein)
+        vanilla = call(100.0, 100.0, 0.05, 0.2, 1.0)
+        exponent = 2 * (0.05 + 0.5 * 0.2 ** 2) / 0.2 ** 2 - 2
+        down_and_out = vanilla - (90.0 / 100.0) ** exponent * call(90.0 ** 2 / 100.0, 100.0, 0.05, 0.2, 1.0)
+        self.assertLess(abs(price["out"] - down_and_out), 4 * stderr["out"])
+        self.assertAlmostEqual(price["in"] + price["out"], vanilla, delta=4 * (stderr["in"] + stderr["out"]))
+
+    def test_pathwise_greeks_with_asian_gradient(self):
+        result = price_monte_carlo(AsianArithmetic(100.0), 100.0, 0.05, 0.2, 1.0, num_steps=12, max_paths=50_000,
+                                   greeks=("delta",), rng=np.random.default_rng(4))
+        lr = price_monte_carlo(AsianArithmetic(100.0), 100.0, 0.05, 0.2, 1.0, num_steps=12, max_paths=50_000,
+                               greeks=("delta",), greek_method="lr", rng=np.random.default_rng(4))
+        self.assertLess(result["greek_stderr"]["delta"], lr["greek_stderr"]["delta"])
+        self.assertLess(abs(result["greeks"]["delta"] - lr["greeks"]["delta"]),
+                        4 * (result["greek_stderr"]["delta"] + lr["greek_stderr"]["delta"]))
+
+    def test_invalid_barrier(self):
+        with self.assertRaises(ValueError):
+            Barrier(100.0, 90.0, direction="sideways")
+        with self.assertRaises(ValueError):
+            Barrier(100.0, 90.0, sigma=0.2)(self.S)
+
+    def test_path_payoff_is_abstract(self):
+        class Partial(PathPayoff):
+            def reset(self, S0):
+                pass
+
+        with self.assertRaises(TypeError):
+            Partial()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from aleatoire import MonteCarloHedging
+from monte_carlo_simu import AssetPriceSimulator, TrajectoryAccumulator, TrajectoryAnalyzer, TrajectoryPlotter
+from online_pricer import enhanced_plotting
+from plotting import (add_fan_chart, add_path_collection, decimation_indices, new_figure, path_quantiles,
+                      subsample_rows)
+
+
+class TestPlotting(unittest.TestCase):
+    def setUp(self):
+        self.simulator = AssetPriceSimulator(100.0, 0.05, 0.2, 1.0, 1500)
+        self.paths = self.simulator.generate_trajectories(2000, rng=np.random.default_rng(0))
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def output(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def test_subsampling_and_decimation(self):
+        rows = subsample_rows(5000, 200, np.random.default_rng(1))
+        self.assertEqual(len(rows), 200)
+        self.assertEqual(len(np.unique(rows)), 200)
+        np.testing.assert_array_equal(subsample_rows(50, 200), np.arange(50))
+        columns = decimation_indices(1501, 1000)
+        self.assertLessEqual(len(columns), 1000)
+        self.assertEqual((columns[0], columns[-1]), (0, 1500))
+
+    def test_collection_size_is_bounded(self):
+        figure = new_figure(self.output("unused.png"))
+        ax = figure.add_subplot()
+        collection = add_path_collection(ax, self.simulator.time_grid, self.paths, max_paths=100, max_points=500)
+        segments = collection.get_segments()
+        self.assertEqual(len(segments), 100)
+        self.assertLessEqual(len(segments[0]), 500)
+
+    def test_fan_chart_quantiles(self):
+        figure = new_figure(self.output("unused.png"))
+        levels = add_fan_chart(figure.add_subplot(), self.simulator.time_grid, self.paths)
+        np.testing.assert_allclose(levels, np.quantile(self.paths, (0.05, 0.25, 0.5, 0.75, 0.95), axis=0))
+        accumulator = TrajectoryAccumulator()
+        accumulator.update(self.paths)
+        sketched = path_quantiles(accumulator, (0.25, 0.75))
+        np.testing.assert_allclose(sketched, np.quantile(self.paths, (0.25, 0.75), axis=0), rtol=0.02)
+
+    def test_headless_outputs(self):
+        mean = TrajectoryAnalyzer.compute_mean_trajectory(self.paths)
+        for mode, name in (("collection", "paths.png"), ("fan", "fan.svg"), ("lines", "lines.png")):
+            paths = self.paths[:20] if mode == "lines" else self.paths
+            TrajectoryPlotter.plot_trajectories(self.simulator.time_grid, paths, mean, mode=mode,
+                                                output=self.output(name))
+            self.assertGreater(os.path.getsize(self.output(name)), 0)
+        with open(self.output("fan.svg")) as f:
+            self.assertIn("<svg", f.read(1000))
+
+        model = MonteCarloHedging(100.0, 100.0, 0.05, 0.2, 1.0, 1000, 50)
+        paths = model.simulate_paths(rng=np.random.default_rng(2))
+        model.plot_paths(paths, paths.mean(axis=0), model.compute_option_prices(paths.mean(axis=0)),
+                         output=self.output("hedging.png"))
+        self.assertTrue(os.path.exists(self.output("hedging.png")))
+
+        time = np.linspace(0.0, 1.0, 11)
+        matrix = np.random.default_rng(3).normal(size=(30, 11))
+        enhanced_plotting(time, matrix, matrix, matrix, matrix, path_id=3, output=self.output("hedge.png"))
+        self.assertTrue(os.path.exists(self.output("hedge_path.png")))
+        self.assertTrue(os.path.exists(self.output("hedge_pnl.png")))
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            TrajectoryPlotter.plot_trajectories(self.simulator.time_grid, self.paths, self.paths[0], mode="dots",
+                                                output=self.output("unused.png"))
+
+
+if __name__ == "__main__":
+    unittest.main()
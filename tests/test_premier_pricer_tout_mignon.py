@@ -0,0 +1,90 @@
+import threading
+import time
+import unittest
+import numpy as np
+from outils import call, put
+from premier_pricer_tout_mignon import (MUGRID, SGRID, CalculsFusionnes, calcul_courbes, courbes_sous_jacent,
+                                        courbes_volatilite)
+
+
+def relever_jusqua(calculs, condition, timeout=5.0):
+    # relève les résultats jusqu'à ce que condition(resultat, erreurs) soit vraie
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        resultat, erreurs = calculs.relever()
+        if condition(resultat, erreurs):
+            return resultat, erreurs
+        time.sleep(0.001)
+    raise AssertionError("no result before the timeout")
+
+
+class TestCourbes(unittest.TestCase):
+    def setUp(self):
+        courbes_sous_jacent.cache_clear()
+        courbes_volatilite.cache_clear()
+
+    def test_calcul_courbes(self):
+        (call_s, put_s), (call_mu, put_mu) = calcul_courbes(50.0, 45.0, 0.02, 0.3, 1.0)
+        np.testing.assert_allclose(call_s, call(SGRID, 45.0, 0.02, 0.3, 1.0))
+        np.testing.assert_allclose(put_s, put(SGRID, 45.0, 0.02, 0.3, 1.0))
+        np.testing.assert_allclose(call_mu, call(50.0, 45.0, 0.02, MUGRID, 1.0))
+        np.testing.assert_allclose(put_mu, put(50.0, 45.0, 0.02, MUGRID, 1.0))
+        self.assertFalse(call_s.flags.writeable)
+        with self.assertRaises(ValueError):
+            call_s[0] = 0.0
+
+    def test_cache_par_grille(self):
+        courbes_s, courbes_mu = calcul_courbes(50.0, 45.0, 0.02, 0.3, 1.0)
+        # changing S only recomputes the volatility grid, changing mu only the spot grid
+        autres_s, autres_mu = calcul_courbes(60.0, 45.0, 0.02, 0.3, 1.0)
+        self.assertIs(autres_s, courbes_s)
+        self.assertIsNot(autres_mu, courbes_mu)
+        _, encore_mu = calcul_courbes(60.0, 45.0, 0.02, 0.4, 1.0)
+        self.assertIs(encore_mu, autres_mu)
+        self.assertEqual(courbes_sous_jacent.cache_info().hits, 1)
+        self.assertEqual(courbes_volatilite.cache_info().hits, 1)
+
+
+class TestCalculsFusionnes(unittest.TestCase):
+    def test_fusion_des_demandes(self):
+        libere = threading.Event()
+        appels = []
+
+        def lent(x):
+            appels.append(x)
+            libere.wait(5.0)
+            return x * 10
+
+        calculs = CalculsFusionnes(lent)
+        try:
+            calculs.demander((1,))
+            for x in (2, 3, 4):
+                calculs.demander((x,))
+            libere.set()
+            # the result of 1 is superseded by the pending request: only 4 is computed next and shown
+            resultat, erreurs = relever_jusqua(calculs, lambda resultat, erreurs: resultat is not None)
+            self.assertEqual((resultat, erreurs), (40, []))
+            self.assertEqual(appels, [1, 4])
+            self.assertEqual(calculs.lancements, 2)
+            self.assertFalse(calculs.en_cours)
+            self.assertEqual(calculs.relever(), (None, []))
+        finally:
+            calculs.fermer()
+
+    def test_erreurs_remontees(self):
+        def echoue(x):
+            raise ZeroDivisionError(f"calcul impossible pour {x}")
+
+        calculs = CalculsFusionnes(echoue)
+        try:
+            calculs.demander((1,))
+            resultat, erreurs = relever_jusqua(calculs, lambda resultat, erreurs: erreurs)
+            self.assertIsNone(resultat)
+            self.assertIsInstance(erreurs[0], ZeroDivisionError)
+            self.assertFalse(calculs.en_cours)
+        finally:
+            calculs.fermer()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+import numpy as np
+from aleatoire import MonteCarloHedging
+from heston import HestonSimulator
+from monte_carlo_simu import AssetPriceSimulator
+from online_pricer import GeneratePathsGBM, GeneratePathsGBMSteps
+from outils import call
+from quasi_monte_carlo import (SobolGenerator, brownian_bridge_increments, brownian_bridge_plan,
+                               make_generator, rqmc_estimate)
+
+
+class TestBrownianBridge(unittest.TestCase):
+    def test_plan_covers_every_point_once(self):
+        for num_steps in (1, 2, 7, 64, 252):
+            point = brownian_bridge_plan(num_steps)[0]
+            self.assertEqual(point[0], num_steps)
+            self.assertEqual(sorted(point.tolist()), list(range(1, num_steps + 1)))
+
+    def test_increments_are_standard_normal(self):
+        Z = np.random.default_rng(0).standard_normal((100_000, 10))
+        increments = brownian_bridge_increments(Z)
+        np.testing.assert_allclose(np.cov(increments.T), np.eye(10), atol=0.02)
+        # the first normal alone sets the terminal value
+        np.testing.assert_allclose(increments.sum(axis=1), np.sqrt(10) * Z[:, 0])
+
+
+class TestSobolGenerator(unittest.TestCase):
+    def setUp(self):
+        self.S0, self.K, self.r, self.sigma, self.T = 100.0, 105.0, 0.05, 0.2, 1.0
+        self.simulator = AssetPriceSimulator(self.S0, self.r, self.sigma, self.T, 32)
+
+    def discounted_payoff(self, rng, num_paths=1024):
+        paths = self.simulator.generate_trajectories(num_paths, rng=rng)
+        return np.exp(-self.r * self.T) * np.maximum(paths[:, -1] - self.K, 0.0).mean()
+
+    def test_drop_in_for_the_simulators(self):
+        self.assertEqual(GeneratePathsGBM(256, 32, 1.0, 0.05, 0.2, 100.0, rng=SobolGenerator(1))["S"].shape,
+                         (256, 33))
+        model = MonteCarloHedging(100.0, 100.0, 0.05, 0.2, 1.0, 256, 32)
+        self.assertEqual(model.simulate_paths(rng=SobolGenerator(1)).shape, (256, 33))
+        paths = self.simulator.generate_trajectories(256, dtype=np.float32, rng=SobolGenerator(1))
+        self.assertEqual(paths.dtype, np.float32)
+
+    def test_chunks_continue_the_sequence(self):
+        whole = self.simulator.generate_trajectories(1024, rng=SobolGenerator(5))
+        chunks = np.vstack(list(self.simulator.iter_trajectory_chunks(1024, 256, rng=SobolGenerator(5))))
+        np.testing.assert_array_equal(whole, chunks)
+        generator = SobolGenerator(5)
+        generator.standard_normal((8, 32))
+        with self.assertRaises(ValueError):
+            generator.standard_normal((8, 16))
+
+    def test_unsupported_shapes(self):
+        for size in (None, 8, (8,), (2, 8, 4)):
+            with self.assertRaises(ValueError):
+                SobolGenerator(1).standard_normal(size)
+        # step-by-step simulators: 1-D draws, and Heston's (2, num_paths) draw per step
+        with self.assertRaises(ValueError):
+            list(GeneratePathsGBMSteps(256, 32, 1.0, 0.05, 0.2, 100.0, rng=SobolGenerator(1)))
+        heston = HestonSimulator(100.0, 0.05, 0.04, 1.5, 0.04, 0.6, -0.7, 1.0, 32)
+        with self.assertRaises(ValueError):
+            heston.generate_trajectories(256, rng=SobolGenerator(1))
+
+    def test_rqmc_error_bars(self):
+        exact = call(self.S0, self.K, self.r, self.sigma, self.T)
+        sobol = rqmc_estimate(self.discounted_payoff, 16, seed=1)
+        pseudo = rqmc_estimate(self.discounted_payoff, 16, seed=1, kind="pseudo")
+        self.assertEqual(len(sobol["replicates"]), 16)
+        self.assertLess(abs(sobol["mean"] - exact), 4 * sobol["stderr"] + 1e-3)
+        # same number of paths, at least 10 times smaller error
+        self.assertLess(10 * sobol["stderr"], pseudo["stderr"])
+
+    def test_make_generator(self):
+        self.assertIsInstance(make_generator("pseudo", 0), np.random.Generator)
+        self.assertIsInstance(make_generator("sobol", 0), SobolGenerator)
+        with self.assertRaises(ValueError):
+            make_generator("halton")
+
+
+if __name__ == "__main__":
+    unittest.main()
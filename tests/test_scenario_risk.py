@@ -0,0 +1,129 @@
+import tempfile
+import unittest
+import numpy as np
+from instrumentation import recording
+from market_data import COLUMNS, Fetcher, MarketDataStore
+from option_book import OptionBook
+from outils import call, put
+from scenario_risk import ScenarioEngine, historical_returns, historical_scenarios, scenario_grid, var_es
+
+
+class RandomWalkFetcher(Fetcher):
+    """Business-day bars following a seeded random walk per ticker; AIR.PA misses one day."""
+
+    def fetch(self, ticker, start, end):
+        dates = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D"))
+        dates = dates[np.is_busday(dates)]
+        if ticker == "AIR.PA":
+            dates = np.delete(dates, 10)
+        rng = np.random.default_rng(len(ticker) + ord(ticker[0]))
+        close = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.01, len(dates))))
+        columns = {name: close.copy() for name in COLUMNS}
+        columns["date"] = dates
+        return columns
+
+
+class TestScenarioRisk(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        n = 400
+        self.names = np.array(["AIR.PA", "DSY.PA", "MC.PA"])[rng.integers(0, 3, n)]
+        self.types = np.where(rng.random(n) < 0.5, "call", "put")
+        # few distinct strikes and expiries: positions share contracts
+        self.strikes = rng.choice([90.0, 100.0, 110.0], n)
+        self.expiries = rng.choice([0.02, 0.5, 1.0], n)
+        self.quantities = rng.integers(-5, 6, n).astype(float)
+        self.spots = {"AIR.PA": 95.0, "DSY.PA": 102.0, "MC.PA": 108.0}
+        self.book = OptionBook(self.names, self.types, self.strikes, self.expiries, self.quantities, 0.25, 0.03,
+                               spots=self.spots)
+        self.engine = ScenarioEngine(self.book)
+
+    def full_revaluation(self, spot_factors, vol_shift, time_shift):
+        # position by position with outils.call / put, intrinsic value once expired
+        total = 0.0
+        for name, option_type, K, T, q in zip(self.names, self.types, self.strikes, self.expiries, self.quantities):
+            S = self.spots[name] * spot_factors[name]
+            remaining = T - time_shift
+            if remaining <= 0.0:
+                value = max(S - K, 0.0) if option_type == "call" else max(K - S, 0.0)
+            else:
+                value = (call if option_type == "call" else put)(S, K, 0.03, 0.25 + vol_shift, remaining)
+            total += q * value
+        return total
+
+    def test_contracts_are_merged(self):
+        self.assertLessEqual(len(self.engine), 27)
+        base = self.full_revaluation(dict.fromkeys(self.spots, 1.0), 0.0, 0.0)
+        self.assertAlmostEqual(self.engine.base_value, base, places=8)
+
+    def test_grid(self):
+        grid = scenario_grid([-0.2, 0.0, 0.1], [-0.05, 0.0, 0.1], [0.0, 0.05])
+        self.assertEqual(grid["shape"], (3, 3, 2))
+        pnl = self.engine.revalue(grid, memory_budget=4096).reshape(grid["shape"])
+        base = self.full_revaluation(dict.fromkeys(self.spots, 1.0), 0.0, 0.0)
+        for i, shock in enumerate([-0.2, 0.0, 0.1]):
+            for j, dv in enumerate([-0.05, 0.0, 0.1]):
+                for k, dt in enumerate([0.0, 0.05]):
+                    expected = self.full_revaluation(dict.fromkeys(self.spots, 1.0 + shock), dv, dt) - base
+                    self.assertAlmostEqual(pnl[i, j, k], expected, places=8)
+        self.assertAlmostEqual(pnl[1, 1, 0], 0.0, places=9)
+
+    def test_chunking_does_not_change_results(self):
+        returns = np.random.default_rng(1).normal(0.0, 0.02, (300, 3))
+        scenarios = historical_scenarios(returns)
+        np.testing.assert_allclose(self.engine.revalue(scenarios, memory_budget=1000),
+                                   self.engine.revalue(scenarios), rtol=1e-12, atol=1e-9)
+
+    def test_historical_var(self):
+        with tempfile.TemporaryDirectory() as root:
+            store = MarketDataStore(root, RandomWalkFetcher())
+            for ticker in self.book.underlyings:
+                store.refresh(ticker, "2023-01-01", "2024-01-01")
+            dates, returns = historical_returns(store, self.book.underlyings, horizon=1)
+        # one day missing for AIR.PA: that date and its return are dropped
+        self.assertEqual(returns.shape, (len(dates), 3))
+        self.assertFalse(np.isnan(returns).any())
+
+        pnl = self.engine.revalue(historical_scenarios(returns))
+        for s in (0, 57, len(pnl) - 1):
+            factors = dict(zip(self.book.underlyings, np.exp(returns[s])))
+            expected = self.full_revaluation(factors, 0.0, 1.0 / 252) - self.engine.base_value
+            self.assertAlmostEqual(pnl[s], expected, places=8)
+
+        risk = var_es(pnl, levels=(0.95, 0.99))
+        loss = -pnl
+        self.assertAlmostEqual(risk["var"][0.99], np.quantile(loss, 0.99))
+        self.assertGreaterEqual(risk["es"][0.99], risk["var"][0.99])
+        self.assertGreaterEqual(risk["var"][0.99], risk["var"][0.95])
+
+    def test_vectorised_revaluation(self):
+        # the cost is timed in benchmarks/run.py; here: two normal CDF calls per chunk of scenarios,
+        # each over every contract of the chunk, whatever the number of positions
+        rng = np.random.default_rng(0)
+        names = np.array([f"U{k:02d}" for k in range(20)])
+        n = 2000
+        book = OptionBook(names[rng.integers(0, 20, n)], np.where(rng.random(n) < 0.5, "call", "put"),
+                          rng.uniform(80.0, 120.0, n), rng.choice([0.25, 0.5, 1.0, 2.0], n),
+                          rng.integers(-10, 11, n), rng.uniform(0.1, 0.4, n), 0.02,
+                          spots=dict(zip(names, rng.uniform(90.0, 110.0, 20))))
+        engine = ScenarioEngine(book)
+        grid = scenario_grid(np.linspace(-0.2, 0.2, 20), np.linspace(-0.05, 0.05, 10), np.linspace(0.0, 0.1, 5))
+        with recording() as recorder:
+            engine.revalue(grid)
+            engine.revalue(grid, memory_budget=4 * 8 * len(engine) * 5)
+        cdf_calls = sum(1 for event in recorder.events if event[0] == "C" and event[1] == "normal_cdf_evaluations")
+        counters = recorder.report()["counters"]
+        self.assertEqual(counters["scenarios"], 2 * 1000)
+        self.assertEqual(counters["normal_cdf_evaluations"], 2 * 2 * len(engine) * 1000)
+        # 50 (vol, time) pairs of 20 spot shocks: one chunk per pair, then chunks of 5 rows
+        self.assertEqual(cdf_calls, 2 * 50 + 2 * 50 * 4)
+
+    def test_bad_scenarios(self):
+        with self.assertRaises(ValueError):
+            self.engine.revalue(historical_scenarios(np.zeros((5, 2))))
+        with self.assertRaises(ValueError):
+            ScenarioEngine(OptionBook(["X"], "call", [100.0], [1.0], [1.0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
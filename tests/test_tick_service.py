@@ -0,0 +1,177 @@
+import asyncio
+import os
+import tempfile
+import unittest
+import numpy as np
+from option_book import OptionBook
+from outils import bs_greeks
+from tick_service import (FileReplaySource, LatencyHistogram, SocketReplaySource, TickBatch, TickService,
+                          TickSource, parse_lines, serve_replay, write_replay_file)
+
+
+class ListSource(TickSource):
+    def __init__(self, batches):
+        self._batches = batches
+
+    async def batches(self):
+        for batch in self._batches:
+            if isinstance(batch, Exception):
+                raise batch
+            yield batch
+
+
+def make_book(names=("AAA", "BBB", "CCC")):
+    # one long call and one short put per underlying
+    return OptionBook(np.repeat(names, 2), ["call", "put"] * len(names), [100.0, 95.0] * len(names),
+                      [1.0, 0.5] * len(names), [1.0, -2.0] * len(names), 0.25, 0.01)
+
+
+class TestTickService(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "ticks.csv")
+        rng = np.random.default_rng(0)
+        n = 20_000
+        self.instruments = np.array(["AAA", "BBB", "CCC"])[rng.integers(0, 3, n)]
+        self.prices = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 1e-3, n)))
+        self.timestamps = np.arange(n) * 1e-4
+        write_replay_file(self.path, self.timestamps, self.instruments, self.prices)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def last_prices(self):
+        return {name: self.prices[np.flatnonzero(self.instruments == name)[-1]] for name in ("AAA", "BBB", "CCC")}
+
+    def assert_final_state(self, service):
+        snapshot = service.snapshot()
+        reference = make_book()
+        reference.set_spots(self.last_prices())
+        for k, name in enumerate(snapshot["underlyings"]):
+            self.assertEqual(snapshot["spot"][k], self.last_prices()[name])
+            greeks = reference.underlying_greeks(name)
+            self.assertAlmostEqual(snapshot["value"][k], greeks[0], places=10)
+            self.assertAlmostEqual(snapshot["delta"][k], greeks[1], places=10)
+            self.assertEqual(snapshot["hedge"][k], -snapshot["delta"][k])
+        stats = service.stats()
+        self.assertEqual(stats["ticks"], len(self.prices))
+        self.assertEqual(stats["ticks"], stats["coalesced"] + stats["updates"])
+        self.assertEqual(stats["latency"]["count"], stats["updates"])
+        self.assertLessEqual(stats["max_queue"], service.queue_size)
+
+    def test_parse_and_write(self):
+        batch = parse_lines(["0.5,AAA,101.25", "0.75,BBB,99.0"], received=1.0)
+        self.assertEqual(batch, TickBatch(1.0, ["AAA", "BBB"], [101.25, 99.0], [0.5, 0.75]))
+        with open(self.path) as f:
+            first = parse_lines([f.readline().strip()])
+        self.assertEqual(first.prices[0], self.prices[0])
+        with self.assertRaises(ValueError):
+            parse_lines(["0.5,AAA"])
+        with self.assertRaises(ValueError):
+            # the total field count is right, the lines are not
+            parse_lines(["1,A", "2,B,3,4"])
+
+    def test_blank_lines(self):
+        path = os.path.join(self.directory.name, "blank.csv")
+        with open(path, "w") as f:
+            f.write("0.0,AAA,100\n\n0.1,AAA,101\n  \n0.2,AAA,102\n\n")
+        for batch_size in (1, 2, 4096):
+            service = TickService(make_book(), FileReplaySource(path, batch_size=batch_size))
+            stats = asyncio.run(service.run())
+            self.assertEqual(stats["ticks"], 3)
+            self.assertEqual(service.snapshot()["spot"][0], 102.0)
+
+    def test_file_replay(self):
+        service = TickService(make_book(), FileReplaySource(self.path, batch_size=1000), queue_size=4)
+        asyncio.run(service.run())
+        self.assert_final_state(service)
+        self.assertEqual(service.stats()["batches"], 20)
+
+    def test_paced_replay(self):
+        # 2 s of ticks replayed 40 times faster: the last batch starts 1.5 s / 40 after the first
+        service = TickService(make_book(), FileReplaySource(self.path, batch_size=5000, speed=40.0))
+        stats = asyncio.run(service.run())
+        self.assertGreater(stats["elapsed"], 1.5 / 40.0)
+        self.assert_final_state(service)
+
+    def test_socket_replay(self):
+        async def replay():
+            server = await serve_replay(self.path)
+            port = server.sockets[0].getsockname()[1]
+            service = TickService(make_book(), SocketReplaySource("127.0.0.1", port, batch_size=1000))
+            async with server:
+                await service.run()
+            return service
+
+        self.assert_final_state(asyncio.run(replay()))
+
+    def test_coalescing(self):
+        # one burst: 1000 ticks on two instruments give two updates, at the last prices
+        names = ["AAA", "BBB"] * 500
+        prices = list(np.linspace(90.0, 110.0, 1000))
+        service = TickService(make_book(), ListSource([TickBatch(0.0, names, prices, [0.0] * 1000)]))
+        stats = asyncio.run(service.run())
+        self.assertEqual((stats["updates"], stats["coalesced"]), (2, 998))
+        np.testing.assert_array_equal(service.snapshot()["spot"][:2], [prices[-2], prices[-1]])
+        self.assertTrue(np.isnan(service.snapshot()["spot"][2]))
+
+    def test_hedged_pnl(self):
+        # one tick per batch: every tick is priced; P&L = sum of dV - delta_prev dS
+        prices = [100.0, 101.0, 99.5, 102.0]
+        batches = [TickBatch(0.0, ["AAA"], [price], [0.0]) for price in prices]
+        service = TickService(make_book(), ListSource(batches))
+        asyncio.run(service.run())
+        S = np.array(prices)
+        greeks = bs_greeks(S[:, None], np.array([100.0, 95.0]), 0.01, 0.25, np.array([1.0, 0.5]),
+                           np.array([1.0, -1.0]))
+        value = greeks["price"] @ [1.0, -2.0]
+        delta = greeks["delta"] @ [1.0, -2.0]
+        expected = np.sum(np.diff(value) - delta[:-1] * np.diff(S))
+        self.assertAlmostEqual(service.snapshot()["pnl"][0], expected, places=10)
+        self.assertEqual(service.snapshot()["updates"][0], 4)
+
+    def test_source_error(self):
+        batches = [TickBatch(0.0, ["AAA"], [100.0], [0.0]), RuntimeError("feed lost")]
+        with self.assertRaisesRegex(RuntimeError, "feed lost"):
+            asyncio.run(TickService(make_book(), ListSource(batches)).run())
+
+    def test_source_error_after_batches_of_the_same_drain(self):
+        # the error arrives in the same drain as two batches: their ticks are applied before it is raised
+        service = TickService(make_book(), ListSource([]))
+        queue = asyncio.Queue()
+        for item in (TickBatch(0.0, ["AAA"], [100.0], [0.0]), TickBatch(0.0, ["BBB", "AAA"], [97.0, 101.0], [1.0, 2.0]),
+                     RuntimeError("feed lost")):
+            queue.put_nowait(item)
+        with self.assertRaisesRegex(RuntimeError, "feed lost"):
+            asyncio.run(service._consume(queue))
+        self.assertEqual(service.stats()["ticks"], 3)
+        self.assertEqual(service.stats()["batches"], 2)
+        np.testing.assert_array_equal(service.book.spots, [101.0, 97.0, np.nan])
+
+    def test_latency_histogram(self):
+        histogram = LatencyHistogram()
+        histogram.record(np.full(90, 2e-5))
+        histogram.record(np.full(10, 3e-3))
+        summary = histogram.summary()
+        self.assertEqual(summary["count"], 100)
+        self.assertTrue(2e-5 <= summary["p50"] < 2e-5 * 1.26)
+        self.assertTrue(3e-3 <= summary["p99"] < 3e-3 * 1.26)
+        self.assertEqual(summary["max"], 3e-3)
+
+    def test_burst_replay(self):
+        # the throughput of a burst is measured by benchmarks/run.py ("TickService[burst replay]")
+        n = 300_000
+        rng = np.random.default_rng(1)
+        path = os.path.join(self.directory.name, "burst.csv")
+        names = np.array([f"U{k:02d}" for k in range(50)])
+        write_replay_file(path, np.arange(n) * 1e-6, names[rng.integers(0, 50, n)],
+                          np.round(rng.uniform(90.0, 110.0, n), 2))
+        book = OptionBook(names, "call", 100.0, 1.0, 1.0, 0.2, 0.01)
+        service = TickService(book, FileReplaySource(path), queue_size=8)
+        stats = asyncio.run(service.run())
+        self.assertEqual(stats["ticks"], n)
+        self.assertLessEqual(stats["max_queue"], service.queue_size)
+
+
+if __name__ == "__main__":
+    unittest.main()
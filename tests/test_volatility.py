@@ -0,0 +1,145 @@
+import unittest
+import numpy as np
+from volatility import (VolatilityTracker, close_to_close, ewma, garman_klass, parkinson)
+
+
+def synthetic_bars(n_bars, n_tickers, sigma, seed=0):
+    rng = np.random.default_rng(seed)
+    daily = sigma / np.sqrt(252)
+    close = 100 * np.exp(np.cumsum(daily * rng.standard_normal((n_bars, n_tickers)), axis=0))
+    open = close * np.exp(0.3 * daily * rng.standard_normal((n_bars, n_tickers)))
+    high = np.maximum(open, close) * np.exp(np.abs(0.5 * daily * rng.standard_normal((n_bars, n_tickers))))
+    low = np.minimum(open, close) * np.exp(-np.abs(0.5 * daily * rng.standard_normal((n_bars, n_tickers))))
+    return open, high, low, close
+
+
+def ewma_reference(close, decay=0.94):
+    # bar by bar: start at the first valid squared return, keep the variance over missing ones
+    squared = np.diff(np.log(close), axis=0) ** 2
+    variance = np.full(close.shape, np.nan)
+    for j in range(close.shape[1]):
+        current = np.nan
+        for t, value in enumerate(squared[:, j], start=1):
+            if np.isfinite(value):
+                current = value if np.isnan(current) else decay * current + (1 - decay) * value
+            variance[t, j] = current
+    return np.sqrt(variance * 252)
+
+
+class TestVolatility(unittest.TestCase):
+    def setUp(self):
+        self.open, self.high, self.low, self.close = synthetic_bars(300, 4, np.array([0.1, 0.2, 0.3, 0.5]))
+
+    def test_close_to_close_matches_naive_windows(self):
+        window = 20
+        vol = close_to_close(self.close, window)
+        self.assertEqual(vol.shape, self.close.shape)
+        self.assertTrue(np.all(np.isnan(vol[:window])))
+        returns = np.diff(np.log(self.close), axis=0)
+        for t in (window, 150, 299):
+            expected = returns[t - window:t].std(axis=0, ddof=1) * np.sqrt(252)
+            np.testing.assert_allclose(vol[t], expected, rtol=1e-9)
+
+    def test_ragged_panel(self):
+        # load_panel layout: the last ticker only starts trading at bar 100
+        close, high, low, open = (x.copy() for x in (self.close, self.high, self.low, self.open))
+        for x in (close, high, low, open):
+            x[:100, 3] = np.nan
+        window = 20
+        vol = close_to_close(close, window)
+        self.assertTrue(np.all(np.isnan(vol[:101 + window - 1, 3])))
+        self.assertFalse(np.any(np.isnan(vol[101 + window:, 3])))
+        returns = np.diff(np.log(close[100:, 3]))
+        expected = returns[-window:].std(ddof=1) * np.sqrt(252)
+        self.assertAlmostEqual(vol[-1, 3], expected, places=9)
+        np.testing.assert_allclose(vol[:, :3], close_to_close(self.close[:, :3], window), rtol=1e-9)
+        self.assertAlmostEqual(parkinson(high, low, window)[-1, 3], parkinson(self.high, self.low, window)[-1, 3])
+        self.assertTrue(np.isnan(garman_klass(open, high, low, close, window)[110, 3]))
+        self.assertFalse(np.isnan(garman_klass(open, high, low, close, window)[120, 3]))
+
+    def test_gap_in_series(self):
+        # one missing bar at 150: the windows around it use the valid observations only
+        close, high, low = self.close.copy(), self.high.copy(), self.low.copy()
+        close[150], high[150], low[150] = np.nan, np.nan, np.nan
+        window = 20
+        vol = close_to_close(close, window, min_periods=15)
+        self.assertFalse(np.any(np.isnan(vol[window:])))
+        returns = np.diff(np.log(close), axis=0)
+        window_returns = returns[155 - window:155]
+        expected = np.nanstd(window_returns, axis=0, ddof=1) * np.sqrt(252)
+        np.testing.assert_allclose(vol[155], expected, rtol=1e-9)
+        # after the gap has left the window, same values as without the gap
+        np.testing.assert_allclose(vol[175:], close_to_close(self.close, window)[175:], rtol=1e-9)
+        # with the default min_periods (full window) the windows holding the gap are NaN, the later ones are not
+        full = close_to_close(close, window)
+        self.assertTrue(np.all(np.isnan(full[151:171])))
+        self.assertFalse(np.any(np.isnan(full[172:])))
+        range_vol = parkinson(high, low, window, min_periods=15)
+        terms = np.log(high / low) ** 2 / (4 * np.log(2))
+        np.testing.assert_allclose(range_vol[160], np.sqrt(np.nanmean(terms[141:161], axis=0) * 252), rtol=1e-9)
+
+    def test_ewma_leading_nans(self):
+        close = self.close.copy()
+        close[:100, 3] = np.nan
+        vol = ewma(close)
+        np.testing.assert_allclose(vol, ewma_reference(close), rtol=1e-10)
+        self.assertTrue(np.all(np.isnan(vol[:101, 3])))
+        self.assertFalse(np.any(np.isnan(vol[101:])))
+        np.testing.assert_allclose(vol[:, :3], ewma(self.close[:, :3]), rtol=1e-12)
+        tracker = VolatilityTracker(4)
+        for t in range(300):
+            current = tracker.update(self.open[t], self.high[t], self.low[t], close[t])
+            if t == 50:
+                self.assertTrue(np.isnan(current["ewma"][3]))
+        np.testing.assert_allclose(current["ewma"], vol[-1], rtol=1e-10)
+
+    def test_ewma_gap(self):
+        close = self.close.copy()
+        close[150, 1] = np.nan
+        vol = ewma(close)
+        np.testing.assert_allclose(vol, ewma_reference(close), rtol=1e-10)
+        # the variance is carried over the two missing returns
+        self.assertEqual(vol[151, 1], vol[149, 1])
+        self.assertFalse(np.any(np.isnan(vol[1:])))
+        np.testing.assert_allclose(ewma(close[:, 1])[-1], vol[-1, 1], rtol=1e-12)
+        tracker = VolatilityTracker.from_history(self.open[:200], self.high[:200], self.low[:200], close[:200])
+        np.testing.assert_allclose(tracker.current()["ewma"], vol[199], rtol=1e-10)
+        tracker = VolatilityTracker(4)
+        for t in range(300):
+            current = tracker.update(self.open[t], self.high[t], self.low[t], close[t])
+        np.testing.assert_allclose(current["ewma"], vol[-1], rtol=1e-10)
+
+    def test_one_dimensional_input_and_level(self):
+        vol = close_to_close(self.close[:, 3], 250)
+        self.assertEqual(vol.shape, (300,))
+        self.assertAlmostEqual(vol[-1], 0.5, delta=0.1)
+
+    def test_tracker_matches_batch(self):
+        window = 30
+        tracker = VolatilityTracker.from_history(self.open[:100], self.high[:100], self.low[:100],
+                                                 self.close[:100], window)
+        current = tracker.current()
+        np.testing.assert_allclose(current["close_to_close"], close_to_close(self.close[:100], window)[-1], rtol=1e-8)
+        for t in range(100, 300):
+            current = tracker.update(self.open[t], self.high[t], self.low[t], self.close[t])
+            if t == 110:
+                np.testing.assert_allclose(current["parkinson"], parkinson(self.high[:111], self.low[:111], window)[-1],
+                                           rtol=1e-8)
+        np.testing.assert_allclose(current["close_to_close"], close_to_close(self.close, window)[-1], rtol=1e-8)
+        np.testing.assert_allclose(current["parkinson"], parkinson(self.high, self.low, window)[-1], rtol=1e-8)
+        np.testing.assert_allclose(current["garman_klass"],
+                                   garman_klass(self.open, self.high, self.low, self.close, window)[-1], rtol=1e-8)
+        np.testing.assert_allclose(current["ewma"], ewma(self.close)[-1], rtol=1e-10)
+
+    def test_tracker_from_scratch(self):
+        tracker = VolatilityTracker(4, window=10)
+        for t in range(10):
+            current = tracker.update(self.open[t], self.high[t], self.low[t], self.close[t])
+        self.assertTrue(np.all(np.isnan(current["close_to_close"])))
+        self.assertTrue(np.all(np.isfinite(current["parkinson"])))
+        current = tracker.update(self.open[10], self.high[10], self.low[10], self.close[10])
+        np.testing.assert_allclose(current["close_to_close"], close_to_close(self.close[:11], 10)[-1], rtol=1e-9)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,322 @@
+"""
+Tick-driven online pricing and hedging service (asyncio).
+
+A TickSource yields batches of ticks (instrument, price, timestamp). The
+service keeps, per underlying of an option_book.OptionBook, the live book
+value, the Black-Scholes delta used as hedge ratio and the P&L of the book
+hedged at every update.
+
+    source = FileReplaySource("ticks.csv")            # or SocketReplaySource(host, port)
+    service = TickService(book, source)
+    stats = asyncio.run(service.run())
+
+Sources are pluggable: FileReplaySource replays a "timestamp,instrument,price"
+CSV file from disk (as fast as possible, or paced by the timestamps), and
+SocketReplaySource reads the same lines from a TCP stream, e.g. one served by
+serve_replay.
+
+Batches go through an asyncio.Queue of at most queue_size batches, so at most
+queue_size * batch_size ticks are held in memory. A full queue makes the
+source wait. The pricer drains every batch waiting in the queue and only keeps
+the latest tick per instrument. A burst therefore costs one reprice per
+instrument, not one per tick. Every update records its tick-to-update latency
+(from the moment the batch was read) in a LatencyHistogram, next to the tick,
+coalescing and update counters.
+"""
+import abc
+import asyncio
+import time
+from typing import AsyncIterator, Dict, Hashable, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from option_book import OptionBook
+from outils import GREEKS
+
+_PRICE, _DELTA = GREEKS.index("price"), GREEKS.index("delta")
+
+
+class TickBatch(NamedTuple):
+    received: float  # time.perf_counter() when the batch was read from the source
+    instruments: List[str]
+    prices: List[float]
+    timestamps: List[float]
+
+
+def parse_lines(lines: Sequence[str], received: Optional[float] = None) -> TickBatch:
+    """TickBatch from "timestamp,instrument,price" lines (one split over the whole batch)."""
+    for line in lines:
+        if line.count(",") != 2:
+            raise ValueError(f"tick lines must have exactly three fields: timestamp,instrument,price, got {line!r}")
+    fields = ",".join(lines).split(",")
+    return TickBatch(time.perf_counter() if received is None else received, fields[1::3],
+                     list(map(float, fields[2::3])), list(map(float, fields[0::3])))
+
+
+def write_replay_file(path: str, timestamps, instruments, prices) -> None:
+    """Write ticks as a replay file for FileReplaySource / serve_replay."""
+    with open(path, "w") as f:
+        f.writelines(f"{float(t)!r},{name},{float(price)!r}\n"
+                     for t, name, price in zip(timestamps, instruments, prices))
+
+
+class TickSource(abc.ABC):
+    """Source of ticks: batches() is an async iterator of TickBatch."""
+
+    @abc.abstractmethod
+    def batches(self) -> AsyncIterator[TickBatch]:
+        ...
+
+
+class _LineSource(TickSource):
+    # shared by the file and socket replays: split raw blocks into complete lines
+    def __init__(self, batch_size: int = 4096):
+        self.batch_size = batch_size
+
+    @abc.abstractmethod
+    def _blocks(self) -> AsyncIterator[bytes]:
+        ...
+
+    async def batches(self):
+        remainder = b""
+        pending: List[str] = []
+        async for block in self._blocks():
+            block = remainder + block
+            cut = block.rfind(b"\n") + 1
+            remainder = block[cut:]
+            # blank lines are skipped wherever they fall
+            pending.extend(line for line in block[:cut].decode().splitlines() if line.strip())
+            while len(pending) >= self.batch_size:
+                yield parse_lines(pending[:self.batch_size])
+                del pending[:self.batch_size]
+        if remainder.strip():
+            pending.append(remainder.decode())
+        if pending:
+            yield parse_lines(pending)
+
+
+class FileReplaySource(_LineSource):
+    """
+    Replay a tick file from disk. speed=None replays as fast as possible;
+    speed=s replays s times faster than the file timestamps (in seconds),
+    pacing batch by batch.
+    """
+
+    def __init__(self, path: str, batch_size: int = 4096, speed: Optional[float] = None,
+                 block_size: int = 1 << 18):
+        super().__init__(batch_size)
+        self.path = path
+        self.speed = speed
+        self.block_size = block_size
+
+    async def _blocks(self):
+        with open(self.path, "rb") as f:
+            while True:
+                block = f.read(self.block_size)
+                if not block:
+                    return
+                yield block
+
+    async def batches(self):
+        if self.speed is None:
+            async for batch in super().batches():
+                yield batch
+            return
+        start_wall = start_tick = None
+        async for batch in super().batches():
+            if start_tick is None:
+                start_wall, start_tick = time.perf_counter(), batch.timestamps[0]
+            delay = (batch.timestamps[0] - start_tick) / self.speed - (time.perf_counter() - start_wall)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield batch._replace(received=time.perf_counter())
+
+
+class SocketReplaySource(_LineSource):
+    """Read "timestamp,instrument,price" lines from a TCP connection until it closes."""
+
+    def __init__(self, host: str, port: int, batch_size: int = 4096, block_size: int = 1 << 16):
+        super().__init__(batch_size)
+        self.host = host
+        self.port = port
+        self.block_size = block_size
+
+    async def _blocks(self):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            while True:
+                block = await reader.read(self.block_size)
+                if not block:
+                    return
+                yield block
+        finally:
+            writer.close()
+
+
+async def serve_replay(path: str, host: str = "127.0.0.1", port: int = 0) -> asyncio.AbstractServer:
+    """TCP server sending the tick file to every client, then closing the connection
+    (port=0 picks a free port: server.sockets[0].getsockname()[1])."""
+
+    async def send(reader, writer):
+        with open(path, "rb") as f:
+            while True:
+                block = f.read(1 << 16)
+                if not block:
+                    break
+                writer.write(block)
+                await writer.drain()
+        writer.close()
+
+    return await asyncio.start_server(send, host, port)
+
+
+class LatencyHistogram:
+    """Latencies in log-spaced buckets (10 per decade, 1 us to 10 s); fixed memory."""
+
+    def __init__(self, low: float = 1e-6, high: float = 10.0, per_decade: int = 10):
+        decades = int(round(np.log10(high / low)))
+        self.edges = low * 10.0 ** (np.arange(decades * per_decade + 1) / per_decade)
+        self.counts = np.zeros(len(self.edges) + 1, dtype=np.int64)  # + underflow and overflow buckets
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def record(self, seconds) -> None:
+        seconds = np.atleast_1d(np.asarray(seconds, dtype=np.float64))
+        if len(seconds) == 0:
+            return
+        self.counts += np.bincount(np.searchsorted(self.edges, seconds), minlength=len(self.counts))
+        self.total += float(seconds.sum())
+        self.maximum = max(self.maximum, float(seconds.max()))
+
+    @property
+    def count(self) -> int:
+        return int(self.counts.sum())
+
+    def quantile(self, q: float) -> float:
+        """Upper edge of the bucket holding the q-quantile (an upper bound within 26%)."""
+        if self.count == 0:
+            return float("nan")
+        bucket = int(np.searchsorted(np.cumsum(self.counts), q * self.count))
+        return float(self.edges[bucket]) if bucket < len(self.edges) else self.maximum
+
+    def summary(self) -> Dict[str, float]:
+        count = self.count
+        return {
+            "count": count,
+            "mean": self.total / count if count else float("nan"),
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "max": self.maximum,
+        }
+
+
+class TickService:
+    """
+    Live value, hedge ratio and P&L per underlying of `book`, driven by `source`.
+
+    On every update of an underlying, the P&L accrues the change of the book
+    value plus the gain of the hedge held since the previous update
+    (-delta shares), then the hedge is reset to -delta. The valuation date of
+    the book is not moved by the ticks (see OptionBook.set_time).
+    """
+
+    def __init__(self, book: OptionBook, source: TickSource, queue_size: int = 64):
+        self.book = book
+        self.source = source
+        self.queue_size = queue_size
+        n = len(book.underlyings)
+        self._rows = {name: k for k, name in enumerate(book.underlyings)}
+        self.spot = np.full(n, np.nan)
+        self.value = np.full(n, np.nan)
+        self.delta = np.full(n, np.nan)
+        self.hedge = np.zeros(n)
+        self.pnl = np.zeros(n)
+        self.updates = np.zeros(n, dtype=np.int64)
+        self.latency = LatencyHistogram()
+        self.counters = {"ticks": 0, "batches": 0, "coalesced": 0, "updates": 0, "unknown": 0, "max_queue": 0}
+        self.elapsed = 0.0
+
+    def _update(self, prices: Dict[Hashable, float], received: Dict[Hashable, float]) -> None:
+        now_latencies = []
+        for name, price in prices.items():
+            row = self._rows.get(name)
+            if row is None:
+                self.counters["unknown"] += 1
+                continue
+            self.book.update_spot(name, price)
+            greeks = self.book.underlying_greeks(name)
+            value, delta = greeks[_PRICE], greeks[_DELTA]
+            if self.updates[row]:
+                self.pnl[row] += value - self.value[row] + self.hedge[row] * (price - self.spot[row])
+            self.spot[row], self.value[row], self.delta[row], self.hedge[row] = price, value, delta, -delta
+            self.updates[row] += 1
+            now_latencies.append(time.perf_counter() - received[name])
+        self.counters["updates"] += len(now_latencies)
+        self.latency.record(now_latencies)
+
+    async def _produce(self, queue: asyncio.Queue) -> None:
+        # None marks the end of the source; an error is handed over to the consumer, which raises it
+        try:
+            async for batch in self.source.batches():
+                await queue.put(batch)
+                # a file source never waits: hand over to the pricer between batches
+                await asyncio.sleep(0)
+        except Exception as error:
+            await queue.put(error)
+        else:
+            await queue.put(None)
+
+    async def _consume(self, queue: asyncio.Queue) -> None:
+        done = False
+        while not done:
+            batches = [await queue.get()]
+            while not queue.empty():
+                batches.append(queue.get_nowait())
+            self.counters["max_queue"] = max(self.counters["max_queue"], len(batches))
+            prices, received, ticks, error = {}, {}, 0, None
+            for batch in batches:
+                if isinstance(batch, Exception):
+                    # raised once the ticks read before it are applied
+                    error, done = batch, True
+                    break
+                if batch is None:
+                    done = True
+                    break
+                # later ticks overwrite earlier ones: only the latest price per instrument is kept
+                prices.update(zip(batch.instruments, batch.prices))
+                received.update(dict.fromkeys(batch.instruments, batch.received))
+                ticks += len(batch.prices)
+            self.counters["ticks"] += ticks
+            self.counters["batches"] += len(batches) - done
+            self.counters["coalesced"] += ticks - len(prices)
+            self._update(prices, received)
+            if error is not None:
+                raise error
+
+    async def run(self) -> Dict[str, object]:
+        """Consume the source until it is exhausted and return stats()."""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        start = time.perf_counter()
+        producer = asyncio.ensure_future(self._produce(queue))
+        try:
+            await self._consume(queue)
+        finally:
+            producer.cancel()
+            self.elapsed += time.perf_counter() - start
+        return self.stats()
+
+    def stats(self) -> Dict[str, object]:
+        """Counters, ticks per second over the runs and the latency summary (seconds)."""
+        return {
+            **self.counters,
+            "elapsed": self.elapsed,
+            "ticks_per_second": self.counters["ticks"] / self.elapsed if self.elapsed else float("nan"),
+            "latency": self.latency.summary(),
+        }
+
+    def snapshot(self) -> Dict[str, object]:
+        """Current state per underlying (arrays in book.underlyings order)."""
+        return {"underlyings": self.book.underlyings, "spot": self.spot.copy(), "value": self.value.copy(),
+                "delta": self.delta.copy(), "hedge": self.hedge.copy(), "pnl": self.pnl.copy(),
+                "updates": self.updates.copy()}
@@ -0,0 +1,225 @@
+"""
+Rolling historical volatility estimators for many tickers at once.
+
+Bars are arrays of shape (n_bars,) or (n_bars, n_tickers). Every estimator
+returns annualized volatilities aligned on the bars. Missing bars (NaN, e.g.
+the leading NaNs of a MarketDataStore.load_panel column for a ticker with a
+shorter history) are skipped: each window is normalised by its number of
+valid observations, and is NaN while it holds fewer than `min_periods`
+(default: the full window). EWMA starts at the first valid return of each
+ticker and keeps its variance over missing ones. Rolling windows use
+cumulative sums, so the cost is O(n) whatever the window length.
+VolatilityTracker keeps the same estimators up to date one bar at a time,
+and historical_sigma turns stored prices into the constant `sigma` expected
+by the pricers and simulators.
+
+Estimators: close-to-close (sample standard deviation of log returns),
+Parkinson (high/low range), Garman-Klass (open/high/low/close) and EWMA
+(RiskMetrics recursion on squared log returns).
+"""
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from scipy.signal import lfilter
+
+TRADING_DAYS = 252
+ESTIMATORS = ("close_to_close", "parkinson", "garman_klass", "ewma")
+_LOG2 = np.log(2.0)
+
+
+def _as_2d(x) -> np.ndarray:
+    x = np.asarray(x, dtype=np.float64)
+    return x[:, None] if x.ndim == 1 else x
+
+
+def _rolling_sum(x: np.ndarray, window: int, min_periods: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    # sum and count of the finite values among the last `window` rows, for every row;
+    # the sum is NaN where the window holds fewer than min_periods (default window) of them
+    valid = np.isfinite(x)
+    total = np.cumsum(np.where(valid, x, 0.0), axis=0)
+    count = np.cumsum(valid, axis=0)
+    total[window:] -= total[:-window].copy()
+    count[window:] -= count[:-window].copy()
+    total[count < (window if min_periods is None else min_periods)] = np.nan
+    return total, count
+
+
+def _shape_like(result: np.ndarray, reference) -> np.ndarray:
+    return result[:, 0] if np.ndim(reference) == 1 else result
+
+
+def log_returns(close) -> np.ndarray:
+    close = _as_2d(close)
+    returns = np.full(close.shape, np.nan)
+    returns[1:] = np.diff(np.log(close), axis=0)
+    return returns
+
+
+def parkinson_terms(high, low) -> np.ndarray:
+    return np.log(_as_2d(high) / _as_2d(low)) ** 2 / (4.0 * _LOG2)
+
+
+def garman_klass_terms(open, high, low, close) -> np.ndarray:
+    range_term = 0.5 * np.log(_as_2d(high) / _as_2d(low)) ** 2
+    body_term = (2.0 * _LOG2 - 1.0) * np.log(_as_2d(close) / _as_2d(open)) ** 2
+    return range_term - body_term
+
+
+def close_to_close(close, window: int = 21, periods_per_year: int = TRADING_DAYS,
+                   min_periods: Optional[int] = None) -> np.ndarray:
+    """Rolling sample standard deviation of the valid log returns among the last `window` returns."""
+    if min_periods is not None and min_periods < 2:
+        raise ValueError("close_to_close needs min_periods >= 2")
+    returns = log_returns(close)[1:]
+    # centring by the column mean keeps the cumulative sums well conditioned
+    valid = np.isfinite(returns)
+    observations = valid.sum(axis=0)
+    mean = np.where(valid, returns, 0.0).sum(axis=0) / np.maximum(observations, 1)
+    returns = returns - mean
+    variance = np.full((returns.shape[0] + 1, returns.shape[1]), np.nan)
+    total, n = _rolling_sum(returns, window, min_periods)
+    total_sq, _ = _rolling_sum(returns ** 2, window, min_periods)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        variance[1:] = np.maximum(total_sq - total ** 2 / n, 0.0) / (n - 1)
+    return _shape_like(np.sqrt(variance * periods_per_year), close)
+
+
+def parkinson(high, low, window: int = 21, periods_per_year: int = TRADING_DAYS,
+              min_periods: Optional[int] = None) -> np.ndarray:
+    """Rolling Parkinson (high/low range) volatility."""
+    total, n = _rolling_sum(parkinson_terms(high, low), window, min_periods)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        variance = total / n
+    return _shape_like(np.sqrt(variance * periods_per_year), high)
+
+
+def garman_klass(open, high, low, close, window: int = 21, periods_per_year: int = TRADING_DAYS,
+                 min_periods: Optional[int] = None) -> np.ndarray:
+    """Rolling Garman-Klass volatility."""
+    total, n = _rolling_sum(garman_klass_terms(open, high, low, close), window, min_periods)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        variance = total / n
+    return _shape_like(np.sqrt(np.maximum(variance, 0.0) * periods_per_year), close)
+
+
+def ewma(close, decay: float = 0.94, periods_per_year: int = TRADING_DAYS,
+         initial_variance: Optional[np.ndarray] = None) -> np.ndarray:
+    """EWMA volatility: var_t = decay * var_(t-1) + (1 - decay) * r_t ** 2.
+
+    The recursion of each ticker starts at its first valid return, from
+    `initial_variance` (per-period) or, by default, from that squared return.
+    It is NaN before and keeps its value over missing returns.
+    """
+    squared = log_returns(close)[1:] ** 2
+    variance = np.full((squared.shape[0] + 1, squared.shape[1]), np.nan)
+    initial = None if initial_variance is None else np.broadcast_to(initial_variance, squared.shape[1:])
+    valid = np.isfinite(squared)
+    if valid.all():
+        if squared.shape[0]:
+            start = squared[0] if initial is None else initial
+            variance[1:], _ = lfilter([1.0 - decay], [1.0, -decay], squared, axis=0, zi=decay * start[None, :])
+        return _shape_like(np.sqrt(variance * periods_per_year), close)
+    # missing returns: filter the valid ones of each ticker, then carry the variance forward
+    for j in np.flatnonzero(valid.any(axis=0)):
+        rows = np.flatnonzero(valid[:, j])
+        values = squared[rows, j]
+        start = values[0] if initial is None else initial[j]
+        filtered, _ = lfilter([1.0 - decay], [1.0, -decay], values, zi=[decay * start])
+        last_valid = np.maximum.accumulate(np.where(valid[:, j], np.arange(len(valid)), -1))
+        column = np.full(len(valid), np.nan)
+        column[rows] = filtered
+        variance[1:, j] = np.where(last_valid >= 0, column[last_valid], np.nan)
+    return _shape_like(np.sqrt(variance * periods_per_year), close)
+
+
+class VolatilityTracker:
+    """Incremental version of the estimators: update() with one new bar per
+    ticker costs O(n_tickers), independently of the window length."""
+
+    def __init__(self, num_tickers: int, window: int = 21, decay: float = 0.94,
+                 periods_per_year: int = TRADING_DAYS):
+        self.num_tickers = num_tickers
+        self.window = window
+        self.decay = decay
+        self.periods_per_year = periods_per_year
+        # ring buffers of per-bar terms: log return, squared log return, Parkinson, Garman-Klass
+        self._terms = np.zeros((4, window, num_tickers))
+        self._sums = np.zeros((4, num_tickers))
+        self._bars = 0  # bars pushed into the ring buffers
+        self._returns = 0
+        self._last_close: Optional[np.ndarray] = None
+        self._ewma_variance: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_history(cls, open, high, low, close, window: int = 21, decay: float = 0.94,
+                     periods_per_year: int = TRADING_DAYS) -> "VolatilityTracker":
+        """Build a tracker whose state matches having seen all the given bars."""
+        open, high, low, close = (_as_2d(x) for x in (open, high, low, close))
+        tracker = cls(close.shape[1], window, decay, periods_per_year)
+        first = max(close.shape[0] - window - 1, 0)
+        for i in range(first, close.shape[0]):
+            tracker.update(open[i], high[i], low[i], close[i])
+        if close.shape[0] > 1:
+            tracker._ewma_variance = ewma(close, decay, 1)[-1] ** 2
+        return tracker
+
+    def _slide(self, rows: slice, count: int, values: np.ndarray) -> None:
+        # replace the oldest entry of the ring buffer and update the running sums
+        slot = count % self.window
+        self._sums[rows] += values - self._terms[rows, slot]
+        self._terms[rows, slot] = values
+        if slot == self.window - 1:
+            # resynchronise once per window so rounding errors do not accumulate
+            self._sums[rows] = self._terms[rows].sum(axis=1)
+
+    def update(self, open, high, low, close) -> Dict[str, np.ndarray]:
+        """Add one bar (arrays of n_tickers) and return the current volatilities."""
+        open, high, low, close = (np.asarray(x, dtype=np.float64).reshape(1, -1) for x in (open, high, low, close))
+        ranges = np.concatenate((parkinson_terms(high, low), garman_klass_terms(open, high, low, close)))
+        self._slide(slice(2, 4), self._bars, ranges)
+        self._bars += 1
+        if self._last_close is not None:
+            log_return = np.log(close[0] / self._last_close)
+            self._slide(slice(0, 2), self._returns, np.stack((log_return, log_return ** 2)))
+            self._returns += 1
+            squared = log_return ** 2
+            if self._ewma_variance is None:
+                self._ewma_variance = np.full(self.num_tickers, np.nan)
+            # start at the first valid return of each ticker, keep the variance over missing ones
+            blended = np.where(np.isnan(self._ewma_variance), squared,
+                               self.decay * self._ewma_variance + (1.0 - self.decay) * squared)
+            self._ewma_variance = np.where(np.isfinite(squared), blended, self._ewma_variance)
+        self._last_close = close[0]
+        return self.current()
+
+    def current(self) -> Dict[str, np.ndarray]:
+        """Latest annualized volatility of every estimator (NaN until the window is full)."""
+        result = {name: np.full(self.num_tickers, np.nan) for name in ESTIMATORS}
+        total, total_sq, park, gk = self._sums
+        if self._returns >= self.window:
+            variance = np.maximum(total_sq - total ** 2 / self.window, 0.0) / (self.window - 1)
+            result["close_to_close"] = np.sqrt(variance * self.periods_per_year)
+        if self._bars >= self.window:
+            result["parkinson"] = np.sqrt(park / self.window * self.periods_per_year)
+            result["garman_klass"] = np.sqrt(np.maximum(gk, 0.0) / self.window * self.periods_per_year)
+        if self._ewma_variance is not None:
+            result["ewma"] = np.sqrt(self._ewma_variance * self.periods_per_year)
+        return result
+
+
+def historical_sigma(store, ticker: str, start=None, end=None, estimator: str = "close_to_close",
+                     window: int = 63, decay: float = 0.94) -> float:
+    """Latest annualized volatility of a ticker of a market_data.MarketDataStore,
+    ready to be passed as `sigma` to the pricers and simulators."""
+    bars = store.load(ticker, start, end)
+    if estimator == "close_to_close":
+        series = close_to_close(bars["close"], window)
+    elif estimator == "parkinson":
+        series = parkinson(bars["high"], bars["low"], window)
+    elif estimator == "garman_klass":
+        series = garman_klass(bars["open"], bars["high"], bars["low"], bars["close"], window)
+    elif estimator == "ewma":
+        series = ewma(bars["close"], decay)
+    else:
+        raise ValueError(f"unknown estimator {estimator!r}, expected one of {ESTIMATORS}")
+    return float(series[-1])